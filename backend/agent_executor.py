@@ -0,0 +1,64 @@
+# agent_executor.py
+import os
+import asyncio
+import functools
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator
+
+# The agents talk to Groq, Google CSE and Reddit through blocking SDKs. Instead of
+# calling them directly from async handlers (which stalls the event loop), every
+# agent call is handed to this bounded pool so one worker can serve many clients.
+MAX_AGENT_WORKERS = int(os.getenv("AGENT_MAX_WORKERS", "16"))
+
+_executor = ThreadPoolExecutor(max_workers=MAX_AGENT_WORKERS, thread_name_prefix="agent")
+
+
+async def run_agent_call(func, *args, **kwargs):
+    """Runs a blocking agent call on the shared executor and awaits its result."""
+    loop = asyncio.get_running_loop()
+    # Carry the caller's context (e.g. the run trace) into the worker thread
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, functools.partial(context.run, func, *args, **kwargs))
+
+
+async def stream_agent_call(func, *args, **kwargs) -> AsyncIterator:
+    """
+    Runs a blocking generator (e.g. an LLM token stream) on the shared executor
+    and yields its items on the event loop as they are produced.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in func(*args, **kwargs):
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, (done, e))
+            return
+        loop.call_soon_threadsafe(queue.put_nowait, (done, None))
+
+    producer = loop.run_in_executor(_executor, contextvars.copy_context().run, produce)
+    try:
+        while True:
+            item, error = await queue.get()
+            if error is not None:
+                raise error
+            if item is done:
+                break
+            yield item
+    finally:
+        # If the consumer goes away (e.g. the websocket closed), stop the producer early
+        stop.set()
+    await producer
+
+
+def shutdown_executor(wait: bool = False):
+    """Stops the shared executor, e.g. when the server shuts down."""
+    _executor.shutdown(wait=wait, cancel_futures=True)
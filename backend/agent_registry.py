@@ -0,0 +1,111 @@
+# agent_registry.py
+import threading
+from typing import Callable, Dict, List, Optional
+
+_env_lock = threading.Lock()
+_env_loaded = False
+
+
+def load_env():
+    """Loads .env into the environment once per process; every agent calls this instead of load_dotenv()."""
+    global _env_loaded
+    with _env_lock:
+        if not _env_loaded:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _env_loaded = True
+
+
+# Agent modules are only imported when the agent is first needed, and the SDKs
+# behind them (praw, googleapiclient, groq, textstat) only on their first call.
+def _topic_agent():
+    from topic_search_agent import TopicSearchAgent
+    return TopicSearchAgent()
+
+
+def _gap_agent():
+    from content_gap_agent import ContentGapAgent
+    return ContentGapAgent()
+
+
+def _outline_agent():
+    from outline_agent import OutlineAgent
+    return OutlineAgent()
+
+
+def _writing_agent():
+    from writing_agent import WritingAgent
+    return WritingAgent()
+
+
+def _seo_agent():
+    from seo_agent import SEOAgent
+    return SEOAgent()
+
+
+AGENT_FACTORIES: Dict[str, Callable] = {
+    "topic": _topic_agent,
+    "gap": _gap_agent,
+    "outline": _outline_agent,
+    "writing": _writing_agent,
+    "seo": _seo_agent,
+}
+
+
+class AgentRegistry:
+    """
+    Creates each agent on first use and hands the same instance to every caller,
+    so the server, the job workers and the LangGraph nodes share one set of agents
+    (and through them one Groq client, one search client and one Reddit pool).
+    """
+    def __init__(self, factories: Optional[Dict[str, Callable]] = None):
+        self.factories = dict(factories or AGENT_FACTORIES)
+        self._agents: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str):
+        agent = self._agents.get(name)
+        if agent is None:
+            with self._lock:
+                agent = self._agents.get(name)
+                if agent is None:
+                    agent = self._agents[name] = self.factories[name]()
+        return agent
+
+    def loaded(self) -> List[str]:
+        return sorted(self._agents)
+
+    def close(self):
+        """Releases what the loaded agents hold open (e.g. the Reddit fetch threads)."""
+        for agent in list(self._agents.values()):
+            close = getattr(agent, "close", None)
+            if close is not None:
+                close()
+
+    @property
+    def topic_agent(self):
+        return self.get("topic")
+
+    @property
+    def gap_agent(self):
+        return self.get("gap")
+
+    @property
+    def outline_agent(self):
+        return self.get("outline")
+
+    @property
+    def writing_agent(self):
+        return self.get("writing")
+
+    @property
+    def seo_agent(self):
+        return self.get("seo")
+
+
+_registry = AgentRegistry()
+
+
+def get_agents() -> AgentRegistry:
+    """The process-wide agent registry."""
+    return _registry
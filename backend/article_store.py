@@ -0,0 +1,153 @@
+# article_store.py
+import os
+import re
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from typing import Dict, Optional
+
+from cache_store import data_path
+
+WORD_RE = re.compile(r"\w+")
+# Page size cap for list and search endpoints
+MAX_PAGE_SIZE = 100
+
+SUMMARY_COLUMNS = "id, topic_id, title, subreddit, source, word_count, created_at"
+
+
+class ArticleStore:
+    """
+    SQLite repository of generated articles, with their outline, gap report, SEO
+    report and topic metadata. Articles are indexed by topic id for instant reuse
+    and by title and body in an FTS5 table for full-text search.
+    """
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("ARTICLE_DB_PATH") or data_path("articles.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS articles (
+                id TEXT PRIMARY KEY,
+                topic_id TEXT,
+                title TEXT NOT NULL,
+                subreddit TEXT,
+                topic TEXT NOT NULL,
+                article TEXT NOT NULL,
+                outline TEXT,
+                gap_report TEXT,
+                seo_report TEXT,
+                source TEXT,
+                word_count INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS articles_topic ON articles(topic_id, created_at);
+            CREATE INDEX IF NOT EXISTS articles_created_at ON articles(created_at);
+
+            -- External-content FTS index over the articles table, kept in sync by triggers
+            CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+                title, article, content='articles', content_rowid='rowid', tokenize='porter unicode61'
+            );
+            CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+                INSERT INTO articles_fts(rowid, title, article) VALUES (new.rowid, new.title, new.article);
+            END;
+            CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+                INSERT INTO articles_fts(articles_fts, rowid, title, article)
+                VALUES ('delete', old.rowid, old.title, old.article);
+            END;
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def _row_to_article(row: sqlite3.Row) -> Dict:
+        article = dict(row)
+        for key in ('topic', 'gap_report', 'seo_report'):
+            if key in article:
+                article[key] = json.loads(article[key]) if article[key] else None
+        return article
+
+    def save(self, topic: Dict, article: str, outline: Optional[str] = None, gap_report: Optional[Dict] = None,
+             seo_report: Optional[Dict] = None, source: Optional[str] = None) -> str:
+        """Stores a finished article and returns its id. `source` is the job or run that produced it."""
+        article_id = uuid.uuid4().hex[:16]
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO articles (id, topic_id, title, subreddit, topic, article, outline, gap_report, "
+                "seo_report, source, word_count, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (article_id, topic.get('id'), topic.get('title') or "", topic.get('subreddit'), json.dumps(topic),
+                 article, outline, json.dumps(gap_report) if gap_report else None,
+                 json.dumps(seo_report) if seo_report else None, source, len(article.split()), time.time()),
+            )
+            self._conn.commit()
+        return article_id
+
+    def get(self, article_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM articles WHERE id = ?", (article_id,)).fetchone()
+        return self._row_to_article(row) if row else None
+
+    def find_for_topic(self, topic: Dict) -> Optional[Dict]:
+        """
+        The latest article for this topic: same topic id and title (ids from a
+        topics file are only unique within that file), or None.
+        """
+        if not topic.get('id'):
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM articles WHERE topic_id = ? AND title = ? ORDER BY created_at DESC LIMIT 1",
+                (topic['id'], topic.get('title') or ""),
+            ).fetchone()
+        return self._row_to_article(row) if row else None
+
+    def list(self, limit: int = 20, offset: int = 0, topic_id: Optional[str] = None) -> Dict:
+        """A page of article summaries, newest first, optionally for one topic id."""
+        limit, offset = min(max(limit, 1), MAX_PAGE_SIZE), max(offset, 0)
+        where, params = ("WHERE topic_id = ?", (topic_id,)) if topic_id else ("", ())
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM articles {where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {SUMMARY_COLUMNS} FROM articles {where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                params + (limit, offset),
+            ).fetchall()
+        return {"items": [dict(row) for row in rows], "total": total, "limit": limit, "offset": offset}
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Dict:
+        """
+        A page of articles matching every word of `query` (title matches rank
+        higher), best first, each with a highlighted snippet of the body.
+        """
+        limit, offset = min(max(limit, 1), MAX_PAGE_SIZE), max(offset, 0)
+        # Quote each word so user input can't be parsed as FTS5 query syntax
+        match = " ".join(f'"{word}"' for word in WORD_RE.findall(query))
+        if not match:
+            return {"items": [], "total": 0, "limit": limit, "offset": offset, "query": query}
+        columns = ", ".join(f"a.{column.strip()}" for column in SUMMARY_COLUMNS.split(","))
+        with self._lock:
+            total = self._conn.execute(
+                "SELECT COUNT(*) FROM articles_fts WHERE articles_fts MATCH ?", (match,)
+            ).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {columns}, snippet(articles_fts, 1, '**', '**', ' … ', 24) AS snippet "
+                "FROM articles_fts JOIN articles a ON a.rowid = articles_fts.rowid "
+                "WHERE articles_fts MATCH ? ORDER BY bm25(articles_fts, 5.0, 1.0) LIMIT ? OFFSET ?",
+                (match, limit, offset),
+            ).fetchall()
+        return {"items": [dict(row) for row in rows], "total": total, "limit": limit, "offset": offset,
+                "query": query}
+
+
+_shared_store: Optional[ArticleStore] = None
+_shared_lock = threading.Lock()
+
+
+def get_article_store() -> ArticleStore:
+    """Returns the process-wide article store, creating it on first use."""
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = ArticleStore()
+        return _shared_store
@@ -0,0 +1,247 @@
+# benchmarks/bench_end_to_end.py
+"""
+Offline end-to-end benchmark: the real server, job queue, graph, rate limiters,
+caches and page fetcher, with Groq, Google Custom Search, Reddit and the
+competitor pages replaced by the local fakes in benchmarks/fakes.py
+(configurable latency, token rate and error rate).
+
+- ws:    serves main.app in-process and drives N concurrent /ws/generate clients,
+         while sampling how long the event loop is blocked.
+- batch: runs main_langgraph.run_batch over N topics.
+
+Reports p50/p95/p99 latency, time to first token (ws), articles/minute and failures.
+Run from the backend directory:
+    python -m benchmarks.bench_end_to_end --mode ws --articles 20 --concurrency 8
+    python -m benchmarks.bench_end_to_end --mode batch --articles 10 --concurrency 4 --llm-error-rate 0.05
+"""
+import os
+import io
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import contextlib
+from typing import Dict, List, Optional
+
+from benchmarks.fakes import COUNTERS, FakeConfig, install_fakes
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile; None for an empty sample."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return round(ordered[min(rank, len(ordered) - 1)], 3)
+
+
+def summarize(latencies: List[float], failures: int, wall_seconds: float) -> Dict:
+    return {
+        "articles": len(latencies),
+        "failures": failures,
+        "wall_seconds": round(wall_seconds, 2),
+        "articles_per_minute": round(len(latencies) / wall_seconds * 60, 2) if wall_seconds else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+    }
+
+
+class LoopLagMonitor:
+    """
+    Sleeps `interval` seconds in a loop and records how late each wake-up is.
+    Lateness means something held the event loop: sync work in a handler, a
+    blocking call or a long callback.
+    """
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(time.perf_counter() - started - self.interval, 0.0))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+
+    def report(self) -> Dict:
+        # Lateness under a couple of milliseconds is scheduler noise
+        blocked = [lag for lag in self.lags if lag > 0.002]
+        return {
+            "loop_lag_max": round(max(self.lags, default=0.0), 4),
+            "loop_lag_p99": percentile(self.lags, 99),
+            "loop_blocked_seconds": round(sum(blocked), 3),
+            "loop_blocked_intervals": len(blocked),
+        }
+
+
+def make_topics(count: int) -> List[Dict]:
+    """Ranked topics from the fake Reddit, repeated with unique ids to reach `count`."""
+    from agent_registry import get_agents
+    ranked = get_agents().topic_agent.fetch_trending_topics() or [{"title": "Benchmark topic", "subreddit": "technology"}]
+    return [dict(ranked[i % len(ranked)], id=f"bench-{i + 1}") for i in range(count)]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def generate_over_websocket(url: str, topic: Dict) -> Dict:
+    import websockets
+    started = time.perf_counter()
+    first_token = None
+    async with websockets.connect(url, max_size=None) as ws:
+        await ws.send(json.dumps(topic))
+        async for message in ws:
+            frame = json.loads(message)
+            if "delta" in frame and first_token is None:
+                first_token = time.perf_counter() - started
+            if "error" in frame:
+                return {"ok": False, "error": frame["error"]}
+            if frame.get("article"):
+                return {"ok": True, "seconds": time.perf_counter() - started, "first_token": first_token}
+    return {"ok": False, "error": "Connection closed before the article arrived."}
+
+
+async def bench_websocket(articles: int, concurrency: int) -> Dict:
+    import uvicorn
+    import main
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    topics = await asyncio.to_thread(make_topics, articles)
+    url = f"ws://127.0.0.1:{port}/ws/generate"
+    gate = asyncio.Semaphore(concurrency)
+
+    async def client(topic: Dict) -> Dict:
+        async with gate:
+            try:
+                return await generate_over_websocket(url, topic)
+            except Exception as e:
+                return {"ok": False, "error": str(e)}
+
+    monitor = LoopLagMonitor()
+    monitor.start()
+    started = time.perf_counter()
+    results = await asyncio.gather(*(client(topic) for topic in topics))
+    wall = time.perf_counter() - started
+    await monitor.stop()
+
+    server.should_exit = True
+    await server_task
+
+    succeeded = [r for r in results if r["ok"]]
+    report = summarize([r["seconds"] for r in succeeded], len(results) - len(succeeded), wall)
+    first_tokens = [r["first_token"] for r in succeeded if r["first_token"] is not None]
+    report.update(first_token_p50=percentile(first_tokens, 50), first_token_p95=percentile(first_tokens, 95))
+    report.update(monitor.report())
+    report["errors"] = sorted({r["error"] for r in results if not r["ok"]})[:5]
+    return report
+
+
+def bench_batch(articles: int, concurrency: int, output_dir: str) -> Dict:
+    from main_langgraph import run_batch
+    topics = make_topics(articles)
+    started = time.perf_counter()
+    manifest = run_batch(topics, concurrency, output_dir, os.path.join(output_dir, "manifest.json"))
+    wall = time.perf_counter() - started
+    succeeded = [t["seconds"] for t in manifest["topics"] if t["status"] == "succeeded"]
+    report = summarize(succeeded, manifest["failed"], wall)
+    report["errors"] = sorted({t["error"] for t in manifest["topics"] if t["status"] != "succeeded"})[:5]
+    return report
+
+
+def print_report(mode: str, report: Dict):
+    print(f"\n{mode} benchmark: {report['articles']} articles, {report['failures']} failed, "
+          f"{report['wall_seconds']}s wall, {report['articles_per_minute']} articles/min")
+    print(f"{'latency':<14}{'p50':>8}{'p95':>8}{'p99':>8}")
+    print(f"{'article (s)':<14}{report['latency_p50'] or 0:>8}{report['latency_p95'] or 0:>8}{report['latency_p99'] or 0:>8}")
+    if "first_token_p50" in report:
+        print(f"{'first token':<14}{report['first_token_p50'] or 0:>8}{report['first_token_p95'] or 0:>8}")
+        print(f"Event loop: blocked {report['loop_blocked_seconds']}s over {report['loop_blocked_intervals']} "
+              f"wake-ups, max lag {report['loop_lag_max']}s, p99 lag {report['loop_lag_p99']}s")
+    print(f"Fake provider calls: {report['provider_calls']}")
+    print(f"Rate-limit waits: {report['rate_limit_wait_seconds']}")
+    for error in report["errors"]:
+        print(f"  error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("ws", "batch"), default="ws")
+    parser.add_argument("--articles", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=FakeConfig.llm_latency, help="Seconds before the first token.")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=FakeConfig.llm_tokens_per_second)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--search-latency", type=float, default=FakeConfig.search_latency)
+    parser.add_argument("--search-error-rate", type=float, default=0.0)
+    parser.add_argument("--reddit-latency", type=float, default=FakeConfig.reddit_latency)
+    parser.add_argument("--reddit-error-rate", type=float, default=0.0)
+    parser.add_argument("--page-latency", type=float, default=FakeConfig.page_latency)
+    parser.add_argument("--page-error-rate", type=float, default=0.0)
+    parser.add_argument("--article-words", type=int, default=FakeConfig.article_words)
+    parser.add_argument("--llm-rpm", type=float, default=6000.0,
+                        help="Groq requests/minute budget for the run (default is high enough to measure the pipeline, not the limiter).")
+    parser.add_argument("--llm-tpm", type=float, default=10_000_000.0)
+    parser.add_argument("--llm-cache", action="store_true", help="Keep the LLM response cache on (off by default).")
+    parser.add_argument("--json", help="Also write the report to this file.")
+    parser.add_argument("--verbose", action="store_true", help="Show the agents' own logging.")
+    args = parser.parse_args()
+
+    # Caches, job store and articles go to a scratch directory; set before the
+    # project modules are imported, since they read these at import time.
+    scratch = tempfile.mkdtemp(prefix="blog-bench-")
+    os.environ["CACHE_DIR"] = os.path.join(scratch, "cache")
+    os.environ["DATA_DIR"] = os.path.join(scratch, "data")
+    os.environ.setdefault("JOB_WORKERS", str(args.concurrency))
+    os.environ.setdefault("JOB_MAX_QUEUE", str(max(args.articles, 50)))
+    if not args.llm_cache:
+        os.environ["LLM_CACHE_ENABLED"] = "0"
+
+    install_fakes(FakeConfig(
+        llm_latency=args.llm_latency, llm_tokens_per_second=args.llm_tokens_per_second,
+        llm_error_rate=args.llm_error_rate, search_latency=args.search_latency,
+        search_error_rate=args.search_error_rate, reddit_latency=args.reddit_latency,
+        reddit_error_rate=args.reddit_error_rate, page_latency=args.page_latency,
+        page_error_rate=args.page_error_rate, article_words=args.article_words,
+    ))
+    from rate_limiter import configure_rate_limit, rate_limit_stats
+    configure_rate_limit("groq", args.llm_rpm, args.llm_tpm)
+
+    print(f"Running the {args.mode} benchmark: {args.articles} articles, {args.concurrency} at a time "
+          f"(scratch dir {scratch})...")
+    log = sys.stdout if args.verbose else io.StringIO()
+    with contextlib.redirect_stdout(log):
+        if args.mode == "ws":
+            report = asyncio.run(bench_websocket(args.articles, args.concurrency))
+        else:
+            report = bench_batch(args.articles, args.concurrency, os.path.join(scratch, "articles"))
+
+    report["provider_calls"] = dict(sorted(COUNTERS.values.items()))
+    report["rate_limit_wait_seconds"] = {name: stats["wait_seconds_total"] for name, stats in rate_limit_stats().items()}
+    print_report(args.mode, report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(dict(report, mode=args.mode, config=vars(args)), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
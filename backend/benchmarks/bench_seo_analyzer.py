@@ -0,0 +1,99 @@
+# benchmarks/bench_seo_analyzer.py
+"""
+Micro-benchmark: the original SEO inspector (one regex scan of the article per
+keyword, plus textstat's own pass) versus SEOAnalyzer's single tokenized pass.
+
+Run from the backend directory:
+    python -m benchmarks.bench_seo_analyzer --words 1000 10000 100000 --keywords 5 50 500
+"""
+import re
+import time
+import random
+import argparse
+from typing import Dict, List
+
+import textstat
+
+from seo_analyzer import SEOAnalyzer
+
+VOCABULARY = (
+    "model data system agent search article machine learning network cloud python market policy "
+    "energy climate security privacy startup research design product customer growth analysis "
+    "the a of and to in is for with on that this it as are be by from"
+).split()
+
+
+def make_article(words: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    lines = ["# Synthetic Benchmark Article", ""]
+    written = 0
+    while written < words:
+        if rng.random() < 0.05:
+            lines += [f"## {' '.join(rng.choices(VOCABULARY, k=4)).title()}", ""]
+        sentence_words = rng.choices(VOCABULARY, k=rng.randint(8, 24))
+        lines.append(" ".join(sentence_words).capitalize() + ".")
+        written += len(sentence_words)
+    return "\n".join(lines)
+
+
+def make_keywords(n: int, seed: int = 11) -> List[str]:
+    rng = random.Random(seed)
+    keywords = list(dict.fromkeys(w for w in VOCABULARY if len(w) > 4))
+    while len(keywords) < n:
+        keywords.append(" ".join(rng.sample(VOCABULARY, 2)))
+        keywords = list(dict.fromkeys(keywords))
+    return keywords[:n]
+
+
+def regex_inspector(article_text: str, keywords: List[str]) -> Dict:
+    # The inspector as it was before SEOAnalyzer
+    word_count = len(article_text.split())
+    readability_score = textstat.flesch_reading_ease(article_text)
+    keyword_density = {}
+    for keyword in keywords:
+        count = len(re.findall(r'\b' + re.escape(keyword) + r'\b', article_text, re.IGNORECASE))
+        keyword_density[keyword] = f"{(count / word_count) * 100 if word_count else 0:.2f}%"
+    return {"word_count": word_count, "readability_score": readability_score, "keyword_density": keyword_density}
+
+
+def best_of(func, articles: List[str], keywords: List[str]) -> float:
+    # A different article each repeat: textstat caches its results by text, which would flatter the baseline
+    timings = []
+    for article in articles:
+        started = time.perf_counter()
+        func(article, keywords)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--keywords", type=int, nargs="+", default=[5, 50, 500])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    analyzer = SEOAnalyzer()
+    print(f"{'words':>8} {'keywords':>9} {'regex ms':>10} {'analyzer ms':>12} {'speedup':>8}")
+    seeds = iter(range(7, 10 ** 6))
+    for words in args.words:
+        for n in args.keywords:
+            keywords = make_keywords(n)
+            articles = [make_article(words, seed=next(seeds)) for _ in range(args.repeats)]
+            baseline = best_of(regex_inspector, articles, keywords)
+            single_pass = best_of(analyzer.analyze, articles, keywords)
+            article = articles[0]
+
+            # Word counts and densities must match the regex inspector
+            expected = regex_inspector(article, keywords)
+            actual = analyzer.analyze(article, keywords)
+            assert expected["word_count"] == actual["word_count"], f"word count mismatch at {words} words"
+            assert expected["keyword_density"] == actual["keyword_density"], \
+                f"keyword density mismatch at {words} words, {n} keywords"
+
+            print(f"{words:>8} {n:>9} {baseline * 1000:>10.2f} {single_pass * 1000:>12.2f} "
+                  f"{baseline / single_pass:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/bench_startup.py
+"""
+Startup benchmark: in fresh interpreters, times `import main` (what every server
+worker pays before serving) and the first creation of all five agents, and lists
+which heavy SDKs the import pulled in. No network calls are made.
+
+Exits non-zero when the median import time exceeds --max-import-seconds or the
+import loads any of the deferred SDKs, so it can guard against regressions in CI.
+
+Run from the backend directory:
+    python -m benchmarks.bench_startup --repeats 5 --max-import-seconds 1.0
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+from typing import Dict, List
+
+# SDKs that must only be imported on first use, never by `import main`
+DEFERRED_MODULES = ("praw", "googleapiclient.discovery", "groq", "textstat", "numpy", "langgraph")
+
+CHILD_SCRIPT = """
+import sys, time, json
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+loaded = [name for name in {modules!r} if name in sys.modules]
+for name in sorted(main.agents.factories):
+    main.agents.get(name)
+ready = time.perf_counter()
+print(json.dumps({{"import_seconds": imported - started, "agents_seconds": ready - imported, "deferred_loaded": loaded}}))
+"""
+
+
+def run_child(env: Dict[str, str]) -> Dict:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT.format(modules=DEFERRED_MODULES)],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    # Agents print while they start up; the measurement is the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def interpreter_seconds(env: Dict[str, str]) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], env=env, check=True)
+    return time.perf_counter() - started
+
+
+def summarize(values: List[float]) -> str:
+    return f"median {statistics.median(values):.3f}s  min {min(values):.3f}s  max {max(values):.3f}s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--max-import-seconds", type=float, help="Fail when the median `import main` time is above this.")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="blog-startup-")
+    env = dict(os.environ, CACHE_DIR=os.path.join(scratch, "cache"), DATA_DIR=os.path.join(scratch, "data"))
+    for key in ("GROQ_API_KEY", "SEARCH_API_KEY", "SEARCH_ENGINE_ID",
+                "REDDIT_CLIENT_ID", "REDDIT_CLIENT_SECRET", "REDDIT_USER_AGENT"):
+        env.setdefault(key, "benchmark")
+
+    results = [run_child(env) for _ in range(args.repeats)]
+    imports = [r["import_seconds"] for r in results]
+    agents = [r["agents_seconds"] for r in results]
+    deferred_loaded = sorted({name for r in results for name in r["deferred_loaded"]})
+
+    print(f"Python interpreter start: {interpreter_seconds(env):.3f}s")
+    print(f"import main:              {summarize(imports)}")
+    print(f"first use of all agents:  {summarize(agents)}")
+    print(f"SDKs loaded by import:    {', '.join(deferred_loaded) or 'none'}")
+
+    failures = []
+    if deferred_loaded:
+        failures.append(f"`import main` loaded {', '.join(deferred_loaded)}, which should only load on first use.")
+    if args.max_import_seconds and statistics.median(imports) > args.max_import_seconds:
+        failures.append(f"`import main` took {statistics.median(imports):.3f}s, over the {args.max_import_seconds}s budget.")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/bench_topic_scoring.py
+"""
+Micro-benchmark: per-dict topic scoring + full sort (the original path) versus
+TopicScorer's vectorized scoring + top-k selection.
+
+Run from the backend directory:
+    python -m benchmarks.bench_topic_scoring --sizes 1000 10000 100000 --k 12
+"""
+import time
+import random
+import argparse
+from types import SimpleNamespace
+from typing import Dict, List
+
+from topic_scoring import TopicScorer, WEIGHT_PROFILES
+from topic_search_agent import TopicSearchAgent
+
+
+def make_candidates(n: int, seed: int = 42) -> List[Dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            'id': str(i),
+            'title': f"Synthetic topic {i}",
+            'score': rng.randint(0, 50000),
+            'num_comments': rng.randint(0, 5000),
+            'upvote_ratio': rng.uniform(0.5, 1.0),
+            'freshness': rng.uniform(0, 400),
+        }
+        for i in range(n)
+    ]
+
+
+def per_dict_top_k(candidates: List[Dict], weights: Dict[str, float], k: int) -> List[Dict]:
+    # calculate_topic_score only needs the weights, so no Reddit client is required
+    agent = SimpleNamespace(weights=weights)
+    for topic in candidates:
+        topic['blog_score'] = TopicSearchAgent.calculate_topic_score(agent, topic)
+    return sorted(candidates, key=lambda x: x['blog_score'], reverse=True)[:k]
+
+
+def best_of(repeats: int, func, *args) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--k", type=int, default=12)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    scorer = TopicScorer()
+    print(f"{'candidates':>10} {'profile':>9} {'per-dict ms':>12} {'vectorized ms':>14} {'(score only)':>13} {'speedup':>8}")
+    for n in args.sizes:
+        candidates = make_candidates(n)
+        columns = TopicScorer.to_columns(candidates)
+        for profile, weights in WEIGHT_PROFILES.items():
+            baseline = best_of(args.repeats, per_dict_top_k, candidates, weights, args.k)
+            vectorized = best_of(args.repeats, scorer.rank, candidates, args.k, weights)
+            score_only = best_of(args.repeats, lambda: scorer.top_k_indices(scorer.score_columns(columns, weights), args.k))
+
+            # Both paths must agree on the ranking
+            expected = [t['id'] for t in per_dict_top_k(candidates, weights, args.k)]
+            actual = [t['id'] for t in scorer.rank(candidates, args.k, weights)]
+            assert expected == actual, f"ranking mismatch for {profile} at n={n}"
+
+            print(f"{n:>10} {profile:>9} {baseline * 1000:>12.2f} {vectorized * 1000:>14.2f} "
+                  f"{score_only * 1000:>13.2f} {baseline / vectorized:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
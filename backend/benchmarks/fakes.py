@@ -0,0 +1,261 @@
+# benchmarks/fakes.py
+"""
+Local stand-ins for Groq, Google Custom Search, Reddit and the competitor pages
+with configurable latency, token rate and error injection. They mimic the SDK
+objects the agents use, so the real rate limiter, caches, retries and parsing
+all run unchanged.
+
+install_fakes() patches the points where the SDK clients are created
+(llm_client.get_groq_client, CustomSearchClient._service and
+TopicSearchAgent._create_reddit_client) and starts a local HTTP server that the
+fake search results link to, so the page fetcher downloads and extracts real
+HTML. Call it before any agent is created.
+"""
+import json
+import time
+import zlib
+import random
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional
+
+from token_budget import count_tokens
+
+
+@dataclass
+class FakeConfig:
+    llm_latency: float = 0.3             # seconds before the first token
+    llm_tokens_per_second: float = 400.0
+    llm_error_rate: float = 0.0          # fraction of calls failing with a retryable 503/429
+    search_latency: float = 0.15
+    search_error_rate: float = 0.0
+    reddit_latency: float = 0.2
+    reddit_error_rate: float = 0.0
+    page_latency: float = 0.1
+    page_error_rate: float = 0.0
+    article_words: int = 900
+    seed: int = 7
+
+
+class FakeAPIError(Exception):
+    """Retryable provider error; carries a status code like the real SDK errors."""
+    def __init__(self, provider: str, status_code: int):
+        super().__init__(f"fake {provider} error {status_code}")
+        self.status_code = status_code
+
+
+class FakeCounters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.values: Dict[str, int] = {}
+
+    def inc(self, name: str):
+        with self._lock:
+            self.values[name] = self.values.get(name, 0) + 1
+
+
+COUNTERS = FakeCounters()
+_rng = random.Random(FakeConfig.seed)
+_rng_lock = threading.Lock()
+# Where fake search results link to; install_fakes() points it at the local page server
+PAGE_BASE_URL = "http://127.0.0.1:9"
+
+
+def _maybe_fail(provider: str, error_rate: float):
+    with _rng_lock:
+        failed = _rng.random() < error_rate
+        status = _rng.choice((429, 503))
+    if failed:
+        COUNTERS.inc(f"{provider}_errors")
+        raise FakeAPIError(provider, status)
+
+
+WORDS = ("model data system platform research market policy energy growth customer security cloud "
+         "network adoption cost risk team product design analysis insight trend strategy").split()
+
+
+def _prose(words: int, seed: int) -> str:
+    rng = random.Random(seed)
+    sentences = []
+    written = 0
+    while written < words:
+        sentence = rng.choices(WORDS, k=rng.randint(8, 16))
+        sentences.append(" ".join(sentence).capitalize() + ".")
+        written += len(sentence)
+    paragraphs = [" ".join(sentences[i:i + 3]) for i in range(0, len(sentences), 3)]
+    return "\n\n".join(paragraphs)
+
+
+def fake_reply(prompt: str, config: FakeConfig) -> str:
+    """A plausible completion for each agent prompt, recognised by its instructions."""
+    seed = len(prompt)
+    if "Senior Content Strategist" in prompt:
+        gaps = [{"topic": f"Gap {i}", "description": _prose(30, seed + i)} for i in range(4)]
+        return "```json\n" + json.dumps({"summary": "Coverage is shallow.", "gaps": gaps}) + "\n```"
+    if "Chief Content Architect" in prompt:
+        sections = "\n".join(f"## H2: Section {i}\n- point one\n- point two" for i in range(1, 5))
+        return f"# H1: Benchmark Article\nHook and promise.\n{sections}\n## Conclusion\n- takeaway"
+    if "ONE section" in prompt:
+        return "## Section\n\n" + _prose(config.article_words // 5, seed)
+    if "editor joining" in prompt:
+        boundaries = prompt.count("Boundary ")
+        return "\n".join(f"{i}: That leads to the next point." for i in range(1, boundaries + 1))
+    if "SEO Copyeditor" in prompt or "world-class blog writer" in prompt:
+        return "# Benchmark Article\n\n" + _prose(config.article_words, seed)
+    return _prose(80, seed)
+
+
+class FakeCompletions:
+    def __init__(self, config: FakeConfig):
+        self.config = config
+
+    def create(self, messages: List[Dict], model: str, stream: bool = False, **params):
+        COUNTERS.inc("groq_calls")
+        time.sleep(self.config.llm_latency)
+        _maybe_fail("groq", self.config.llm_error_rate)
+        prompt = "".join(message.get("content") or "" for message in messages)
+        text = fake_reply(prompt, self.config)
+        if (params.get("response_format") or {}).get("type") == "json_object":
+            # JSON mode: the API returns the bare object
+            text = text.strip().removeprefix("```json").removesuffix("```").strip()
+        usage = SimpleNamespace(prompt_tokens=count_tokens(prompt), completion_tokens=count_tokens(text))
+        usage.total_tokens = usage.prompt_tokens + usage.completion_tokens
+        if stream:
+            return self._stream(text, usage)
+        time.sleep(usage.completion_tokens / self.config.llm_tokens_per_second)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))], usage=usage)
+
+    def _stream(self, text: str, usage) -> Iterator:
+        words = text.split(" ")
+        for i in range(0, len(words), 4):
+            delta = " ".join(words[i:i + 4]) + (" " if i + 4 < len(words) else "")
+            time.sleep(count_tokens(delta) / self.config.llm_tokens_per_second)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))], x_groq=None)
+        yield SimpleNamespace(choices=[], x_groq=SimpleNamespace(usage=usage))
+
+
+class FakeGroq:
+    def __init__(self, config: FakeConfig, api_key: Optional[str] = None, **kwargs):
+        self.chat = SimpleNamespace(completions=FakeCompletions(config))
+
+
+class FakeSearchRequest:
+    def __init__(self, config: FakeConfig, q: str, num: int):
+        self.config = config
+        self.query = q
+        self.num = num
+
+    def execute(self) -> Dict:
+        COUNTERS.inc("cse_calls")
+        time.sleep(self.config.search_latency)
+        _maybe_fail("cse", self.config.search_error_rate)
+        return {"items": [
+            {"title": f"{self.query} result {i}", "link": f"{PAGE_BASE_URL}/{zlib.crc32(self.query.encode())}/{i}",
+             "snippet": _prose(25, hash((self.query, i)) % 10000).replace("\n\n", " ")}
+            for i in range(self.num)
+        ]}
+
+
+class FakeSearchService:
+    def __init__(self, config: FakeConfig):
+        self.config = config
+
+    def cse(self):
+        return self
+
+    def list(self, q: str, cx: str, num: int = 5):
+        return FakeSearchRequest(self.config, q, num)
+
+
+class FakePageHandler(BaseHTTPRequestHandler):
+    """Serves an article page (with navigation and footer to strip) per path, with an ETag."""
+    config = FakeConfig()
+
+    def do_GET(self):
+        COUNTERS.inc("page_calls")
+        time.sleep(self.config.page_latency)
+        with _rng_lock:
+            failed = _rng.random() < self.config.page_error_rate
+        if failed:
+            COUNTERS.inc("page_errors")
+            self.send_error(503)
+            return
+        etag = f'"{zlib.crc32(self.path.encode())}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        paragraphs = _prose(600, zlib.crc32(self.path.encode()) % 10000).split("\n\n")
+        body = (
+            f"<html><head><title>Page {self.path}</title></head><body>"
+            "<nav><a href='/'>Home</a> <a href='/about'>About</a></nav>"
+            f"<article><h1>Page {self.path}</h1>" + "".join(f"<p>{p}</p>" for p in paragraphs) + "</article>"
+            "<footer>Copyright Benchmark Media</footer></body></html>"
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_page_server(config: FakeConfig) -> str:
+    """Serves fake competitor pages on a free local port, in a daemon thread; returns the base URL."""
+    handler = type("ConfiguredPageHandler", (FakePageHandler,), {"config": config})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-pages", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class FakeSubreddit:
+    def __init__(self, config: FakeConfig, name: str):
+        self.config = config
+        self.display_name = name
+
+    def hot(self, limit: int = 15) -> Iterator:
+        COUNTERS.inc("reddit_calls")
+        time.sleep(self.config.reddit_latency)
+        _maybe_fail("reddit", self.config.reddit_error_rate)
+        rng = random.Random(hash(self.display_name) % 10000)
+        now = time.time()
+        for i in range(limit):
+            yield SimpleNamespace(
+                id=f"{self.display_name}-{i}", title=" ".join(rng.sample(WORDS, 6)).capitalize(),
+                subreddit=self, url=f"https://reddit.com/r/{self.display_name}/{i}", is_self=False,
+                stickied=i == 0, created_utc=now - rng.uniform(1, 200) * 3600, score=rng.randint(10, 20000),
+                num_comments=rng.randint(0, 3000), upvote_ratio=rng.uniform(0.6, 1.0),
+            )
+
+
+class FakeReddit:
+    def __init__(self, config: FakeConfig, **kwargs):
+        self.config = config
+
+    def subreddit(self, name: str) -> FakeSubreddit:
+        return FakeSubreddit(self.config, name)
+
+
+def install_fakes(config: FakeConfig):
+    """Points the Groq, CSE and PRAW entry points at the fakes, starts the page server and fills in dummy credentials."""
+    import os
+    global PAGE_BASE_URL
+    for key in ("GROQ_API_KEY", "SEARCH_API_KEY", "SEARCH_ENGINE_ID",
+                "REDDIT_CLIENT_ID", "REDDIT_CLIENT_SECRET", "REDDIT_USER_AGENT"):
+        os.environ.setdefault(key, "benchmark")
+
+    import llm_client
+    import search_client
+    import topic_search_agent
+
+    llm_client.get_groq_client = lambda api_key: FakeGroq(config, api_key)
+    search_client.CustomSearchClient._service = lambda self: FakeSearchService(config)
+    topic_search_agent.TopicSearchAgent._create_reddit_client = lambda self: FakeReddit(config)
+    PAGE_BASE_URL = start_page_server(config)
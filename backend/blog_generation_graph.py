@@ -3,8 +3,12 @@ from langgraph.graph import StateGraph, START, END
 from state_schema import BlogGenerationState
 from langgraph_nodes import LangGraphNodes
 
-def create_blog_generation_graph():
-    """Creates and returns the compiled LangGraph workflow"""
+def create_blog_generation_graph(checkpointer=None):
+    """
+    Creates and returns the compiled LangGraph workflow. With a checkpointer
+    (see graph_checkpoints.py) the state is saved after every node, so runs
+    need a run id in their config and can be resumed.
+    """
 
     nodes = LangGraphNodes()
     graph = StateGraph(BlogGenerationState)
@@ -13,17 +17,31 @@ def create_blog_generation_graph():
     graph.add_node("topic_search", nodes.topic_search_node)
     graph.add_node("topic_selection", nodes.topic_selection_node)
     graph.add_node("content_gap", nodes.content_gap_node)
+    graph.add_node("briefing", nodes.factual_briefing_node)
     graph.add_node("outline_generation", nodes.outline_generation_node)
     graph.add_node("writing", nodes.writing_node)
-    graph.add_node("seo_optimization", nodes.seo_optimization_node) # Add the new node
+    graph.add_node("seo_inspection", nodes.seo_inspection_node)
+    graph.add_node("seo_rewrite", nodes.seo_rewrite_node)
+    graph.add_node("finalize", nodes.finalize_node)
 
     # Define the graph's edges
     graph.add_edge(START, "topic_search")
     graph.add_edge("topic_search", "topic_selection")
+    # Gap analysis and factual briefing are independent, so they run as parallel
+    # branches and join before the outline is generated.
     graph.add_edge("topic_selection", "content_gap")
-    graph.add_edge("content_gap", "outline_generation")
+    graph.add_edge("topic_selection", "briefing")
+    graph.add_edge(["content_gap", "briefing"], "outline_generation")
     graph.add_edge("outline_generation", "writing")
-    graph.add_edge("writing", "seo_optimization") # The writer now hands off to the SEO agent
-    graph.add_edge("seo_optimization", END) # The SEO agent produces the final output
+    graph.add_edge("writing", "seo_inspection") # The writer now hands off to the SEO agent
+    # The rewrite LLM call only runs while the article misses the SEO targets,
+    # at most SEO_MAX_REWRITES times; each rewrite is inspected again.
+    graph.add_conditional_edges(
+        "seo_inspection",
+        nodes.route_after_seo_inspection,
+        {"seo_rewrite": "seo_rewrite", "finalize": "finalize"},
+    )
+    graph.add_edge("seo_rewrite", "seo_inspection")
+    graph.add_edge("finalize", END) # Publishes the best article we have
 
-    return graph.compile()
\ No newline at end of file
+    return graph.compile(checkpointer=checkpointer)
\ No newline at end of file
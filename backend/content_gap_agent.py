@@ -1,18 +1,18 @@
 import os
-import json
-import requests
-import re
 from typing import List, Dict, Optional
-from dotenv import load_dotenv
-from groq import Groq
-from googleapiclient.discovery import build
-from langchain.prompts import PromptTemplate
+from agent_registry import load_env
+from llm_client import LLMClient
+from page_fetcher import PAGE_FETCH_ENABLED, get_page_fetcher
+from search_client import get_search_client
+from structured_output import validate_gap_report
+from token_budget import compact_search_results, compact_snippets, condense_extract, render_prompt
 
-class ContentGapAgent:
-    LLM_MODEL_NAME = 'llama-3.1-8b-instant'  
+# Estimated tokens of each competitor page's main text given to the gap analysis
+PAGE_EXTRACT_TOKENS = int(os.getenv("PAGE_EXTRACT_TOKENS", "250"))
 
-    def __init__(self):
-        load_dotenv()
+class ContentGapAgent:
+    def __init__(self, use_llm_cache: bool = True):
+        load_env()
         groq_api_key = os.getenv("GROQ_API_KEY")
         self.search_api_key = os.getenv("SEARCH_API_KEY")
         self.search_engine_id = os.getenv("SEARCH_ENGINE_ID")
@@ -20,42 +20,52 @@ class ContentGapAgent:
         if not all([groq_api_key, self.search_api_key, self.search_engine_id]):
             raise ValueError("One or more API keys are missing. Please check your .env file.")
 
-        self.llm_client = Groq(api_key=groq_api_key)
+        self.llm_client = LLMClient(api_key=groq_api_key, use_cache=use_llm_cache)
+        # Shared, cached CSE client: the discovery service is built once and repeated queries skip the API
+        self.search_client = get_search_client(self.search_api_key, self.search_engine_id)
 
     def _find_related_articles(self, query: str, num_results: int = 5) -> List[Dict]:
         try:
-            service = build("customsearch", "v1", developerKey=self.search_api_key)
-            result = service.cse().list(q=query, cx=self.search_engine_id, num=num_results).execute()
-
-            articles = []
-            if 'items' in result and result['items']:
-                for item in result['items']:
-                    articles.append({
-                        'title': item.get('title'),
-                        'snippet': item.get('snippet'),
-                        'link': item.get('link')
-                    })
-                return articles
-            return []
+            return self.search_client.search(query, num_results=num_results)
         except Exception as e:
-            # In a production environment, you might want to log this error.
+            # Retryable errors were already retried by the shared CSE rate limiter
+            print(f"Error searching related articles: {e}")
             return []
-        
+
+    def _attach_page_extracts(self, articles: List[Dict]) -> List[Dict]:
+        """
+        Adds a condensed 'extract' of each result's full page, fetched concurrently.
+        Pages that can't be fetched keep just their snippet.
+        """
+        try:
+            pages = get_page_fetcher().fetch_all([a.get('link') for a in articles])
+        except Exception as e:
+            print(f"Error fetching competitor pages: {e}")
+            return articles
+        texts = {page['url']: page['text'] for page in pages}
+        print(f"Fetched {sum(1 for text in texts.values() if text)}/{len(articles)} competitor pages")
+        return [dict(a, extract=condense_extract(texts.get(a.get('link')) or "", PAGE_EXTRACT_TOKENS))
+                for a in articles]
+
     def _analyze_collective_gaps(self, articles: List[Dict]) -> Dict:
-        search_results_str = "\n\n".join([f"Title: {a['title']}\nSnippet: {a['snippet']}" for a in articles])
+        articles = compact_search_results(articles, stage="gap")
+        search_results_str = "\n\n".join([
+            f"Title: {a['title']}\nSnippet: {a['snippet']}" + (f"\nPage extract: {a['extract']}" if a.get('extract') else "")
+            for a in articles
+        ])
 
         template_string = """
         You are a Senior Content Strategist with 15 years of experience in identifying profitable content opportunities.
-        Your mission is to analyze a collection of search result snippets for a given topic and identify what is critically MISSING.
+        Your mission is to analyze a collection of search results for a given topic (their snippets and, where available, an extract of the page itself) and identify what is critically MISSING.
 
         **Your Analysis Must Uncover:**
-        1.  **Unanswered Questions:** What questions are readers likely asking that these snippets fail to address?
+        1.  **Unanswered Questions:** What questions are readers likely asking that these pages fail to address?
         2.  **Lack of Depth:** Where is the information superficial? What key details or data are missing?
         3.  **Missed Angles:** What unique perspectives or expert viewpoints are not being considered?
         4.  **Actionability:** Is there a lack of practical advice, how-to steps, or actionable takeaways?
 
         **Output Format:**
-        Your final output MUST be a clean JSON object, enclosed in markdown ```json tags. Do not include any other text or commentary.
+        Your final output MUST be a single JSON object. Do not include any other text or commentary.
         The JSON object must have two keys:
         - "summary": A brief, one-sentence overview of the *existing* content's focus.
         - "gaps": A list of JSON objects, where each object has two keys: "topic" (a short title for the gap) and "description" (a detailed explanation of what is missing and why it's important).
@@ -66,55 +76,47 @@ class ContentGapAgent:
         ---
         """
 
-        prompt_template = PromptTemplate(
-            template=template_string,
-            input_variables=['search_results']
-        )
-
-        final_prompt = prompt_template.format(search_results=search_results_str)
+        final_prompt = render_prompt("gap", template_string, trim=['search_results'], search_results=search_results_str)
 
         try:
-            response = self.llm_client.chat.completions.create(
+            # JSON mode where the model supports it; fenced, unfenced or truncated replies are still parsed
+            return self.llm_client.complete_json(
                 messages=[{"role": "user", "content": final_prompt}],
-                model=self.LLM_MODEL_NAME
+                validate=validate_gap_report,
+                stage="gap"
             )
-
-            raw_response_content = response.choices[0].message.content
-            json_match = re.search(r'```json\n(.*?)\n```', raw_response_content, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(1).strip()
-                return json.loads(json_str)
-            else:
-                return {"error": "LLM response did not contain a valid JSON block."}
-
+        except ValueError as e:
+            return {"error": f"LLM response did not contain a valid gap report: {e}"}
         except Exception as e:
             return {"error": f"LLM analysis failed: {e}"}
 
     def analyze_topic(self, topic: Dict) -> Dict:
+        """A validated GapReport for the topic, or {"error": ...} if none could be produced."""
         articles = self._find_related_articles(query=topic['title'])
         if not articles:
             return {"error": "Could not find any related articles to analyze."}
 
+        if PAGE_FETCH_ENABLED:
+            articles = self._attach_page_extracts(articles)
         return self._analyze_collective_gaps(articles=articles)
     
+    def search_stats(self) -> Dict:
+        """Cache hit ratio and daily quota usage of the Custom Search client, plus competitor page fetches."""
+        return dict(self.search_client.stats(), pages=get_page_fetcher().stats())
+
     def get_factual_briefing(self, query: str) -> str:
         """Performs a targeted search to get a concise, factual summary of a topic."""
         print(f"Getting factual briefing for: {query}")
         try:
-            service = build("customsearch", "v1", developerKey=self.search_api_key)
-            result = service.cse().list(q=f"fact check {query}", cx=self.search_engine_id, num=5).execute()
-
-            snippets = []
-            if 'items' in result and result['items']:
-                for item in result['items']:
-                    snippets.append(item.get('snippet'))
+            results = self.search_client.search(f"fact check {query}", num_results=5)
+            snippets = compact_snippets((item.get('snippet') for item in results), stage="briefing")
 
             context = "\n".join(snippets)
 
             if not context:
                 return "No factual information could be retrieved."
 
-            prompt = f"""
+            template_string = """
             Based on the following search result snippets, provide a brief, factual summary of the topic: "{query}".
             Focus ONLY on verifiable facts, outcomes, and key data points. Ignore opinions or speculation.
 
@@ -125,12 +127,12 @@ class ContentGapAgent:
 
             Concise Factual Briefing:
             """
+            prompt = render_prompt("briefing", template_string, trim=['context'], query=query, context=context)
 
-            response = self.llm_client.chat.completions.create(
+            return self.llm_client.complete(
                 messages=[{"role": "user", "content": prompt}],
-                model=self.LLM_MODEL_NAME
+                stage="briefing"
             )
-            return response.choices[0].message.content
 
         except Exception as e:
             print(f"Error getting factual briefing: {e}")
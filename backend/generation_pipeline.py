@@ -0,0 +1,151 @@
+# generation_pipeline.py
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+
+from agent_executor import run_agent_call, stream_agent_call
+from agent_registry import AgentRegistry
+from article_store import ArticleStore, get_article_store
+from metrics import current_trace, mark_stage_error, track_stage
+from seo_analyzer import SEO_MAX_REWRITES, extract_keywords
+from speculative_precompute import SpeculativePrecompute
+
+# Upper bound for the opt-in pacing a client can request between steps
+MAX_PACE_SECONDS = 2.0
+
+Emit = Callable[[Dict], Awaitable[None]]
+
+
+class GenerationPipeline:
+    """
+    The async article pipeline behind /ws/generate and the job workers.
+    Progress is reported through an `emit` callback as the same JSON frames the
+    websocket protocol uses: {"text", "progress"} steps, {"stream", "delta"} tokens
+    and a final {"text": "Done", "progress": 100, "article", "article_id"} frame.
+    Agents come from the registry, so each is only created when a job first needs it.
+    Finished articles are saved to the article store. With speculative precompute,
+    a topic whose gap analysis and briefing were already run skips those stages.
+    """
+    def __init__(self, agents: AgentRegistry, articles: Optional[ArticleStore] = None,
+                 precompute: Optional[SpeculativePrecompute] = None):
+        self.agents = agents
+        self.articles = articles or get_article_store()
+        self.precompute = precompute
+
+    async def _call(self, stage: str, func, *args):
+        """Runs one agent call on the agent executor as a traced stage."""
+        with track_stage(stage):
+            return await run_agent_call(func, *args)
+
+    async def _stream(self, emit: Emit, stream_name: str, func, *args) -> str:
+        """
+        Forwards an agent's token stream as {"stream", "delta"} frames and returns the full text.
+        The first frame carries "restart": true so clients drop any earlier pass of the same stream.
+        """
+        parts = []
+        async for delta in stream_agent_call(func, *args):
+            frame = {"stream": stream_name, "delta": delta}
+            if not parts:
+                frame["restart"] = True
+            parts.append(delta)
+            await emit(frame)
+        return "".join(parts)
+
+    async def run(self, selected_topic: Dict, emit: Emit, pace_seconds: float = 0.0) -> str:
+        """Runs every stage for `selected_topic` and returns the final article. Raises on failure."""
+        topic_title = selected_topic.get('title', '')
+        # Optional client-side pacing: a short pause after each step so progress
+        # messages stay readable. Off by default.
+        pace_seconds = min(max(float(pace_seconds or 0), 0.0), MAX_PACE_SECONDS)
+
+        async def pace():
+            if pace_seconds:
+                await asyncio.sleep(pace_seconds)
+
+        # Every agent call runs on the bounded agent executor so the event loop
+        # stays free for other clients while we wait on the LLM. That includes
+        # looking the agents up: the first lookup creates them and imports their SDKs.
+        gap_agent, outline_agent, writing_agent, seo_agent = await run_agent_call(
+            lambda: (self.agents.gap_agent, self.agents.outline_agent, self.agents.writing_agent, self.agents.seo_agent))
+
+        # Step 1: Content Gap Analysis
+        await emit({"text": "Analyzing content gaps...", "progress": 25})
+        # Gap analysis and factual briefing are independent, so run them concurrently
+        async def analyze_gaps():
+            with track_stage("content_gap"):
+                report = await run_agent_call(gap_agent.analyze_topic, selected_topic)
+                if "error" in report:
+                    raise Exception(report["error"])
+                return report
+
+        precomputed = None
+        if self.precompute is not None and self.precompute.enabled:
+            with track_stage("precomputed"):
+                precomputed = await self.precompute.take(selected_topic)
+        if precomputed is not None:
+            gap_report, factual_briefing = precomputed["gap_report"], precomputed["factual_briefing"]
+        else:
+            gap_report, factual_briefing = await asyncio.gather(
+                analyze_gaps(),
+                self._call("briefing", gap_agent.get_factual_briefing, topic_title),
+            )
+        await pace()
+
+        # Step 2: Outline Generation
+        await emit({"text": "Generating strategic outline...", "progress": 50})
+        with track_stage("outline"):
+            blog_outline = await run_agent_call(outline_agent.create_outline, topic_title, gap_report, factual_briefing)
+            if not blog_outline:
+                raise Exception("Failed to generate blog outline.")
+        await pace()
+
+        # Step 3: Writing First Draft
+        await emit({"text": "Writing first draft...", "progress": 75})
+        with track_stage("writing"):
+            try:
+                first_draft = await self._stream(emit, "draft", writing_agent.stream_article, blog_outline, factual_briefing)
+            except Exception as e:
+                raise Exception(f"Failed to write the first draft: {e}") from e
+            if not first_draft:
+                raise Exception("Failed to write the first draft.")
+        await pace()
+
+        # Step 4: SEO Optimization. The rewrite only runs while the article misses
+        # the SEO targets, at most SEO_MAX_REWRITES times.
+        await emit({"text": "Optimizing for SEO & finalizing...", "progress": 90})
+        keywords = extract_keywords(topic_title)
+        final_article = first_draft
+        seo_report = await self._call("seo_inspection", seo_agent.inspector, final_article, keywords)
+        rewrites = 0
+        while not seo_report["passes"] and rewrites < SEO_MAX_REWRITES:
+            rewrites += 1
+            with track_stage("seo_rewrite"):
+                try:
+                    rewritten = await self._stream(emit, "final", seo_agent.stream_rewrite, final_article, seo_report)
+                    error = None if rewritten else "The rewrite came back empty."
+                except Exception as e:
+                    error = f"Rewrite failed: {e}"
+                if error:
+                    # Keep the current article rather than retrying a failing rewrite, as the graph does
+                    print(f"SEO rewrite failed, keeping the current article: {error}")
+                    mark_stage_error(error)
+            if error:
+                await emit({"text": "SEO rewrite failed; keeping the current article.", "progress": 95})
+                break
+            final_article = rewritten
+            seo_report = await self._call("seo_inspection", seo_agent.inspector, final_article, keywords)
+        if rewrites == 0:
+            await emit({"text": "Draft already meets the SEO targets, skipping the rewrite.", "progress": 95})
+        await pace()
+
+        # --- Pipeline Complete ---
+        # Stored with everything that went into it, so the topic can be served again without regenerating
+        trace = current_trace()
+        # The article is finished either way: a storage error is logged rather than failing the job
+        try:
+            article_id = await run_agent_call(self.articles.save, selected_topic, final_article, blog_outline,
+                                              gap_report, seo_report, trace.run_id if trace else None)
+        except Exception as e:
+            print(f"Could not store the article: {e}")
+            article_id = None
+        await emit({"text": "Done", "progress": 100, "article": final_article, "article_id": article_id})
+        return final_article
@@ -0,0 +1,70 @@
+# graph_checkpoints.py
+import os
+import uuid
+import sqlite3
+from typing import Dict, List, Optional
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from cache_store import data_path
+
+
+def create_checkpointer(path: Optional[str] = None) -> SqliteSaver:
+    """
+    SQLite checkpoint store for the LangGraph workflow. The state is saved after
+    every node, per run id, so a failed run can resume from its last good stage.
+    """
+    path = path or os.getenv("GRAPH_CHECKPOINT_DB") or data_path("checkpoints.sqlite3")
+    return SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def run_config(run_id: str) -> Dict:
+    """The graph config selecting a run's checkpoints (LangGraph calls the run id a thread id)."""
+    return {"configurable": {"thread_id": run_id}}
+
+
+def run_summary(app, run_id: str) -> Optional[Dict]:
+    """Where a run stands: its topic, the stages still to run and whether it produced an article."""
+    snapshot = app.get_state(run_config(run_id))
+    if not snapshot.values:
+        return None
+    values = snapshot.values
+    return {
+        "run_id": run_id,
+        "title": values.get('topic_title'),
+        "next": list(snapshot.next),
+        "finished": not snapshot.next,
+        "has_article": bool(values.get('final_article')),
+        "step": (snapshot.metadata or {}).get('step'),
+        "updated_at": snapshot.created_at,
+    }
+
+
+def list_runs(app, limit: int = 20) -> List[Dict]:
+    """The most recently updated runs in the checkpoint store, newest first."""
+    with app.checkpointer.cursor(transaction=False) as cur:
+        # Checkpoint ids are time-ordered, so the largest one is a run's latest checkpoint
+        rows = cur.execute(
+            "SELECT thread_id FROM checkpoints WHERE checkpoint_ns = '' "
+            "GROUP BY thread_id ORDER BY MAX(checkpoint_id) DESC LIMIT ?", (limit,)
+        ).fetchall()
+    return [summary for (run_id,) in rows if (summary := run_summary(app, run_id))]
+
+
+def resume_config(app, run_id: str, from_stage: Optional[str] = None) -> Dict:
+    """
+    The config to continue a run from: its latest checkpoint, or with `from_stage`
+    the last checkpoint taken just before that stage ran (replaying it and every
+    stage after it on a new branch of the run's history).
+    """
+    config = run_config(run_id)
+    if not from_stage:
+        return config
+    for snapshot in app.get_state_history(config):
+        if from_stage in snapshot.next:
+            return snapshot.config
+    raise KeyError(f"Run {run_id} has no checkpoint before the '{from_stage}' stage.")
@@ -0,0 +1,206 @@
+# job_queue.py
+import os
+import uuid
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+from agent_executor import run_agent_call
+from article_store import ArticleStore, get_article_store
+from generation_pipeline import GenerationPipeline
+from job_store import JobStore, FINISHED_STATUSES
+from metrics import start_trace
+
+
+def mark_topic_covered(topic: Dict, source: str):
+    """Adds a generated topic to the covered-topic index so it isn't offered again."""
+    # Imported here: topic_dedup loads NumPy, which server startup defers until first use
+    from topic_dedup import get_covered_index
+    try:
+        get_covered_index().add(topic, source=source)
+    except Exception as e:
+        print(f"Could not record topic '{topic.get('title')}' as covered: {e}")
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class JobManager:
+    """
+    Runs article generations as background jobs on a bounded pool of async workers.
+    Jobs outlive the client that submitted them: their state is persisted in a
+    JobStore, and any number of clients can subscribe (or re-subscribe) to a job's
+    progress while it runs or after it has finished.
+    """
+    def __init__(self, pipeline: GenerationPipeline, store: Optional[JobStore] = None,
+                 workers: Optional[int] = None, max_queue: Optional[int] = None,
+                 articles: Optional[ArticleStore] = None):
+        self.pipeline = pipeline
+        self.store = store or JobStore()
+        self.articles = articles or get_article_store()
+        self.workers = workers or int(os.getenv("JOB_WORKERS", "4"))
+        self.max_queue = max_queue or int(os.getenv("JOB_MAX_QUEUE", "50"))
+
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._worker_tasks: List[asyncio.Task] = []
+        self._running: Set[str] = set()
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        # Token frames aren't persisted; keep the text streamed so far for late subscribers
+        self._live_text: Dict[str, Dict] = {}
+        # Job store calls are SQLite commits, so they run off the event loop; a single
+        # thread runs them in the order they were made, which subscribe() relies on
+        self._store_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-store")
+
+    async def _store_call(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._store_executor, func, *args)
+
+    def start(self):
+        """Re-queues jobs interrupted by a restart and starts the workers."""
+        for job in self.store.unfinished_jobs():
+            self.store.requeue(job['id'])
+            self._queue.put_nowait(job['id'])
+        for _ in range(self.workers):
+            self._worker_tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._store_executor.shutdown(wait=True)
+
+    async def submit(self, topic: Dict, pace_seconds: float = 0.0) -> Dict:
+        """
+        Queues a generation for `topic` and returns the job record. Raises QueueFullError when at capacity.
+        A topic that already has a stored article gets a job that finishes at once with that article,
+        unless the topic asks to "regenerate".
+        """
+        pace_seconds = float(pace_seconds or 0)
+        # Article store reads and writes are SQLite calls, so they run off the event loop
+        stored = None if topic.get('regenerate') else await run_agent_call(self.articles.find_for_topic, topic)
+        if stored is not None:
+            return await self._store_call(self._serve_stored, topic, stored)
+
+        if self._queue.qsize() >= self.max_queue:
+            raise QueueFullError(f"The generation queue is full ({self.max_queue} jobs). Please try again shortly.")
+        job_id = uuid.uuid4().hex
+        job = await self._store_call(self.store.create, job_id, topic, pace_seconds)
+        self._queue.put_nowait(job_id)
+        job['queue_position'] = self._queue.qsize()
+        return job
+
+    def _serve_stored(self, topic: Dict, stored: Dict) -> Dict:
+        job_id = uuid.uuid4().hex
+        self.store.create(job_id, topic)
+        self.store.append_event(job_id, {"text": "Done", "progress": 100, "article": stored['article'],
+                                         "article_id": stored['id'], "stored": True})
+        self.store.mark_succeeded(job_id, stored['article'])
+        job = self.store.get(job_id)
+        job['queue_position'] = 0
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        return await self._store_call(self.store.get, job_id)
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = await self.get(job_id)
+                if job is not None:
+                    await self._run_job(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job: Dict):
+        job_id = job['id']
+        self._running.add(job_id)
+        await self._store_call(self.store.mark_running, job_id)
+
+        async def emit(event: Dict):
+            await self._publish(job_id, event)
+
+        trace = None
+        try:
+            with start_trace(job_id, kind="job") as trace:
+                article = await self.pipeline.run(job['topic'], emit, job['pace_seconds'])
+            await self._store_call(self.store.mark_succeeded, job_id, article, trace.to_dict())
+            await run_agent_call(mark_topic_covered, job['topic'], job_id)
+        except asyncio.CancelledError:
+            # Shutting down: the job stays "running" in the store and is re-queued on the next start
+            raise
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            await self._store_call(self.store.mark_failed, job_id, str(e), trace.to_dict() if trace else None)
+            await self._publish(job_id, {"error": str(e)})
+        finally:
+            self._running.discard(job_id)
+            self._live_text.pop(job_id, None)
+            for queue in self._subscribers.get(job_id, ()):
+                queue.put_nowait(None)
+
+    async def _publish(self, job_id: str, event: Dict):
+        if "stream" in event:
+            live = self._live_text.get(job_id)
+            if live is None or live["stream"] != event["stream"] or event.get("restart"):
+                live = self._live_text[job_id] = {"stream": event["stream"], "delta": "", "restart": True}
+            live["delta"] += event.get("delta", "")
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait(event)
+        if "stream" not in event:
+            # Current subscribers got the event above; later ones read it from the store,
+            # since their read is queued behind this write
+            await self._store_call(self.store.append_event, job_id, event)
+
+    async def subscribe(self, job_id: str) -> AsyncIterator[Dict]:
+        """
+        Yields a job's progress events: first everything recorded so far (including
+        the text streamed so far), then live events until the job finishes.
+        Raises KeyError for an unknown job.
+        """
+        # Register, snapshot the streamed text and queue the history read without awaiting
+        # in between, so every event is seen exactly once: either in the snapshot or on the
+        # queue (events published before this point are written to the store before the read).
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        live = self._live_text.get(job_id)
+        live = dict(live) if live is not None else None
+        try:
+            job, history = await self._store_call(self._snapshot, job_id)
+            if job is None:
+                raise KeyError(job_id)
+            if live is not None:
+                history.append(live)
+            for event in history:
+                yield event
+            if job['status'] in FINISHED_STATUSES:
+                return
+
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[job_id]
+
+    def _snapshot(self, job_id: str):
+        return self.store.get(job_id), self.store.events(job_id)
+
+    def busy(self) -> bool:
+        """True while jobs are waiting or every worker is generating."""
+        return self._queue.qsize() > 0 or len(self._running) >= self.workers
+
+    async def metrics(self) -> Dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "running": len(self._running),
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "jobs_by_status": await self._store_call(self.store.count_by_status),
+        }
@@ -0,0 +1,127 @@
+# job_store.py
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+from cache_store import data_path
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+FINISHED_STATUSES = (SUCCEEDED, FAILED)
+
+
+class JobStore:
+    """
+    SQLite-backed record of generation jobs and their progress events, so a job's
+    state and result survive both a dropped client and a server restart.
+    Token frames are not stored here; only step, result and error events are.
+    """
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("JOB_DB_PATH") or data_path("jobs.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                pace_seconds REAL NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                article TEXT,
+                error TEXT,
+                trace TEXT
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status);
+            CREATE TABLE IF NOT EXISTS job_events (
+                job_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                event TEXT NOT NULL,
+                PRIMARY KEY (job_id, seq)
+            );
+        """)
+        # Stores created before run traces were recorded lack the column
+        columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if 'trace' not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN trace TEXT")
+        self._conn.commit()
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict:
+        job = dict(row)
+        job['topic'] = json.loads(job['topic'])
+        job['trace'] = json.loads(job['trace']) if job['trace'] else None
+        return job
+
+    def create(self, job_id: str, topic: Dict, pace_seconds: float = 0.0) -> Dict:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, topic, pace_seconds, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(topic), pace_seconds, time.time()),
+            )
+            self._conn.commit()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def mark_running(self, job_id: str):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = ?, started_at = ? WHERE id = ?",
+                               (RUNNING, time.time(), job_id))
+            self._conn.commit()
+
+    def mark_succeeded(self, job_id: str, article: str, trace: Optional[Dict] = None):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = ?, finished_at = ?, article = ?, trace = ? WHERE id = ?",
+                               (SUCCEEDED, time.time(), article, json.dumps(trace) if trace else None, job_id))
+            self._conn.commit()
+
+    def mark_failed(self, job_id: str, error: str, trace: Optional[Dict] = None):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = ?, finished_at = ?, error = ?, trace = ? WHERE id = ?",
+                               (FAILED, time.time(), error, json.dumps(trace) if trace else None, job_id))
+            self._conn.commit()
+
+    def requeue(self, job_id: str):
+        """Puts an interrupted job back in the queue and forgets its partial progress."""
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = ?, started_at = NULL WHERE id = ?", (QUEUED, job_id))
+            self._conn.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+            self._conn.commit()
+
+    def append_event(self, job_id: str, event: Dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO job_events (job_id, seq, event) "
+                "SELECT ?, COALESCE(MAX(seq), 0) + 1, ? FROM job_events WHERE job_id = ?",
+                (job_id, json.dumps(event), job_id),
+            )
+            self._conn.commit()
+
+    def events(self, job_id: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT event FROM job_events WHERE job_id = ? ORDER BY seq", (job_id,)
+            ).fetchall()
+        return [json.loads(row['event']) for row in rows]
+
+    def unfinished_jobs(self) -> List[Dict]:
+        """Jobs that were queued or running when the previous process stopped, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING)
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def count_by_status(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row['status']: row['n'] for row in rows}
@@ -1,69 +1,152 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from state_schema import BlogGenerationState
-from topic_search_agent import TopicSearchAgent
-from content_gap_agent import ContentGapAgent
-from writing_agent import WritingAgent
-from outline_agent import OutlineAgent
-from seo_agent import SEOAgent
+from agent_registry import AgentRegistry, get_agents
+from seo_agent import REWRITE_ERROR_PREFIX
+from seo_analyzer import SEO_MAX_REWRITES, extract_keywords
+from metrics import current_trace, mark_stage_error, traced_stage
+from topic_dedup import get_covered_index
+from article_store import get_article_store
 
 class LangGraphNodes:
-    def __init__(self):
-        self.topic_agent = TopicSearchAgent()
-        self.gap_agent = ContentGapAgent()
-        self.outline_agent = OutlineAgent()
-        self.writing_agent = WritingAgent()
-        self.seo_agent = SEOAgent()
+    def __init__(self, agents: Optional[AgentRegistry] = None):
+        # Shared with the server and every other graph in the process; agents are created on first use
+        self.agents = agents or get_agents()
 
+    @traced_stage("topic_search")
     def topic_search_node(self, state: BlogGenerationState) -> BlogGenerationState:
-        topics = self.topic_agent.fetch_trending_topics()
+        # Batch runs and the API pass the topic in; only search when none was given
+        if state.get('selected_topic'):
+            return state
+        topics = self.agents.topic_agent.fetch_trending_topics()
         state['all_topics'] = topics
         return state
 
+    @traced_stage("topic_selection")
     def topic_selection_node(self, state: BlogGenerationState) -> BlogGenerationState:
-        # In the FastAPI app, the topic will be passed in the initial state.
-        # This node can be adapted or bypassed depending on the final workflow.
+        selected_topic = state.get('selected_topic')
+        if not selected_topic:
+            # Pick the user's choice from the ranked topics, or the top-ranked one
+            topics = state.get('all_topics') or []
+            choice = state.get('user_choice') or 0
+            if choice < len(topics):
+                selected_topic = topics[choice]
+                state['selected_topic'] = selected_topic
+            else:
+                state['error_message'] = "No trending topic was available to select."
+                return state
+
+        if not state.get('topic_title'):
+            state['topic_title'] = selected_topic['title']
+        print(f"Selected topic: {state['topic_title']}")
         return state
 
-    def content_gap_node(self, state: BlogGenerationState) -> BlogGenerationState:
+    @traced_stage("content_gap")
+    def content_gap_node(self, state: BlogGenerationState) -> Dict[str, Any]:
+        # Runs in parallel with factual_briefing_node, so it only returns the keys it owns.
+        # Failures raise, so a checkpointed run stops here and can be resumed from this stage.
         selected_topic = state.get('selected_topic')
         if selected_topic:
-            gap_report = self.gap_agent.analyze_topic(selected_topic)
-            if gap_report and 'error' not in gap_report:
-                state['gap_analysis'] = gap_report
-                
-            factual_briefing = self.gap_agent.get_factual_briefing(selected_topic['title'])
-            state['factual_briefing'] = factual_briefing
+            gap_report = self.agents.gap_agent.analyze_topic(selected_topic)
+            if not gap_report or 'error' in gap_report:
+                raise Exception(gap_report.get('error') if gap_report else "No gap analysis was produced.")
+            return {'gap_analysis': gap_report}
+        return {}
+
+    @traced_stage("briefing")
+    def factual_briefing_node(self, state: BlogGenerationState) -> Dict[str, Any]:
+        # Independent of the gap analysis (its own search + LLM call), so the graph fans out to both.
+        selected_topic = state.get('selected_topic')
+        if selected_topic:
+            factual_briefing = self.agents.gap_agent.get_factual_briefing(selected_topic['title'])
             print(f"--- Factual Briefing ---\n{factual_briefing}\n--------------------")
-            
-        return state
+            return {'factual_briefing': factual_briefing}
+        return {}
 
+    @traced_stage("outline")
     def outline_generation_node(self, state: BlogGenerationState) -> BlogGenerationState:
         topic_title = state.get('topic_title')
         gap_analysis = state.get('gap_analysis')
+        factual_briefing = state.get('factual_briefing') or ""
 
         if topic_title and gap_analysis:
-            outline = self.outline_agent.create_outline(topic_title, gap_analysis)
-            if outline:
-                state['blog_outline'] = outline
+            outline = self.agents.outline_agent.create_outline(topic_title, gap_analysis, factual_briefing)
+            if not outline:
+                raise Exception("Failed to generate blog outline.")
+            state['blog_outline'] = outline
         return state
 
+    @traced_stage("writing")
     def writing_node(self, state: dict) -> dict:
         outline = state.get('blog_outline')
         if outline:
-            first_draft = self.writing_agent.write_article(outline)
-            if first_draft:
-                state['first_draft'] = first_draft
+            first_draft = self.agents.writing_agent.write_article(outline, state.get('factual_briefing') or "")
+            if not first_draft:
+                raise Exception("Failed to write the first draft.")
+            state['first_draft'] = first_draft
         return state
 
-    def seo_optimization_node(self, state: BlogGenerationState) -> BlogGenerationState:
-        first_draft = state.get('first_draft')
+    @traced_stage("seo_inspection")
+    def seo_inspection_node(self, state: BlogGenerationState) -> BlogGenerationState:
+        # Inspects the latest rewrite if there is one, otherwise the first draft
+        article = state.get('final_article') or state.get('first_draft')
         topic_title = state.get('topic_title')
 
-        if first_draft and topic_title:
-            keywords = [word for word in topic_title.split() if len(word) > 4]
-            seo_report = self.seo_agent.inspector(first_draft, keywords)
+        if article and topic_title:
+            keywords = extract_keywords(topic_title)
+            seo_report = self.agents.seo_agent.inspector(article, keywords)
             state['seo_report'] = seo_report
-            final_article = self.seo_agent.rewrite_article(first_draft, seo_report)
-            if final_article:
-                state['final_article'] = final_article
-        return state
\ No newline at end of file
+            state['seo_passed'] = seo_report['passes']
+            if seo_report['issues']:
+                print(f"SEO issues: {' '.join(seo_report['issues'])}")
+        return state
+
+    def route_after_seo_inspection(self, state: BlogGenerationState) -> str:
+        """Rewrites only while the article misses the SEO targets and rewrites are left."""
+        seo_report = state.get('seo_report')
+        if not seo_report or seo_report['passes']:
+            return "finalize"
+        if (state.get('seo_rewrites') or 0) >= SEO_MAX_REWRITES:
+            return "finalize"
+        return "seo_rewrite"
+
+    @traced_stage("seo_rewrite")
+    def seo_rewrite_node(self, state: BlogGenerationState) -> BlogGenerationState:
+        article = state.get('final_article') or state.get('first_draft')
+        state['seo_rewrites'] = (state.get('seo_rewrites') or 0) + 1
+
+        rewritten = self.agents.seo_agent.rewrite_article(article, state['seo_report'])
+        if rewritten and not rewritten.startswith(REWRITE_ERROR_PREFIX):
+            state['final_article'] = rewritten
+        else:
+            mark_stage_error(rewritten or "The rewrite came back empty.")
+            # Keep the current article rather than retrying a failing rewrite
+            state['seo_rewrites'] = SEO_MAX_REWRITES
+        return state
+
+    @traced_stage("finalize")
+    def finalize_node(self, state: BlogGenerationState) -> BlogGenerationState:
+        # A draft that already meets the targets is published as is
+        if not state.get('final_article') and state.get('first_draft'):
+            state['final_article'] = state['first_draft']
+        print(f"SEO rewrites: {state.get('seo_rewrites') or 0}, targets met: {bool(state.get('seo_passed'))}")
+        if state.get('final_article') and state.get('selected_topic') and not state.get('article_id'):
+            # The article is finished either way: a storage error is logged rather than failing the run
+            try:
+                state['article_id'] = get_article_store().save(
+                    state['selected_topic'], state['final_article'], state.get('blog_outline'),
+                    state.get('gap_analysis'), state.get('seo_report'), source=state.get('run_id'),
+                )
+            except Exception as e:
+                print(f"Could not store the article: {e}")
+            # Keeps this story (and rewordings of it) out of later topic searches
+            try:
+                get_covered_index().add(state['selected_topic'], source=state.get('run_id'))
+            except Exception as e:
+                print(f"Could not record topic '{state['selected_topic'].get('title')}' as covered: {e}")
+        # Attach the run's trace (every stage up to this one) when the caller started one
+        trace = current_trace()
+        if trace is not None:
+            if not state.get('final_article'):
+                trace.status = "failed"
+            state['trace'] = trace.to_dict()
+        return state
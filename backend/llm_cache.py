@@ -0,0 +1,95 @@
+# llm_cache.py
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from cache_store import SQLiteCache, cache_path
+
+
+def make_cache_key(model: str, messages: List[Dict], params: Optional[Dict] = None) -> str:
+    """Content-addressed key: a hash of the model, the exact prompt and the sampling parameters."""
+    payload = json.dumps({"model": model, "messages": messages, "params": params or {}},
+                         sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache for LLM completions: an in-memory LRU in front of a SQLite store
+    that persists across restarts and is shared by every worker on the host.
+    """
+    def __init__(self, memory_entries: Optional[int] = None, persistent: Optional[SQLiteCache] = None):
+        self.memory_entries = memory_entries or int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256"))
+        self.persistent = persistent or SQLiteCache(
+            cache_path("llm_cache.sqlite3"),
+            table="llm_responses",
+            ttl_seconds=float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600))),
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000")),
+        )
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+
+        value = self.persistent.get(key)
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.disk_hits += 1
+            self._remember(key, value)
+        return value
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._remember(key, value)
+        self.persistent.set(key, value)
+
+    def delete(self, key: str):
+        """Forgets a completion, e.g. one that turned out to be unusable."""
+        with self._lock:
+            self._memory.pop(key, None)
+        self.persistent.delete(key)
+
+    def _remember(self, key: str, value: str):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict:
+        total = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "disk_entries": len(self.persistent),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.memory_hits + self.disk_hits) / total, 3) if total else 0.0,
+        }
+
+
+_shared_cache: Optional[LLMResponseCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Returns the process-wide LLM response cache, creating it on first use."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = LLMResponseCache()
+        return _shared_cache
@@ -0,0 +1,273 @@
+# llm_client.py
+import os
+import time
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from metrics import LLM_FALLBACKS, LLM_JSON_REPLIES, record_cache, record_llm_call
+from llm_cache import LLMResponseCache, get_llm_cache, make_cache_key
+from model_router import ModelRoute, ModelRouter, get_model_router
+from rate_limiter import CircuitOpenError, get_rate_limiter, is_retryable
+from structured_output import parse_json_object
+from token_budget import count_tokens
+
+
+# Rough output size assumed when reserving Groq tokens-per-minute budget
+DEFAULT_COMPLETION_TOKENS = 1024
+# Retries a stage's primary model gets before its fallback model is tried
+FALLBACK_AFTER_RETRIES = int(os.getenv("LLM_FALLBACK_AFTER_RETRIES", "1"))
+# Extra (uncached) attempts a structured-output call gets when the reply can't be parsed or validated
+JSON_RETRIES = max(0, int(os.getenv("LLM_JSON_RETRIES", "1")))
+
+
+def estimate_tokens(text: str) -> int:
+    """Token estimate used for rate budgeting; the same estimate the prompt budgets use."""
+    return count_tokens(text) + 1
+
+
+_groq_clients: Dict[str, object] = {}
+_groq_lock = threading.Lock()
+
+
+def get_groq_client(api_key: str):
+    """
+    Returns the process-wide Groq client for `api_key`, creating it on first use.
+    Every agent shares it, and with it one pooled HTTP connection pool.
+    """
+    with _groq_lock:
+        client = _groq_clients.get(api_key)
+        if client is None:
+            from groq import Groq
+            # The shared Groq limiter owns retries; SDK retries would multiply its attempts unseen
+            client = _groq_clients[api_key] = Groq(api_key=api_key, max_retries=0)
+        return client
+
+
+def _failed_generation(error: Exception) -> Optional[str]:
+    """The output Groq rejected with `json_validate_failed` in JSON mode, if the error carries it."""
+    body = getattr(error, "body", None)
+    if isinstance(body, dict):
+        body = body.get("error", body)
+    return body.get("failed_generation") if isinstance(body, dict) else None
+
+
+def _cache_disabled_stages() -> set:
+    value = os.getenv("LLM_CACHE_DISABLED_STAGES", "")
+    return {stage.strip() for stage in value.split(",") if stage.strip()}
+
+
+class LLMClient:
+    """
+    Thin wrapper around the Groq chat API used by every agent.
+    Each stage's model, max_tokens, temperature, timeout and fallback model come
+    from the model router. Completions are looked up in the shared response cache
+    first; stages that need fresh output can opt out with `use_cache=False` or
+    LLM_CACHE_DISABLED_STAGES. Calls that do reach the API go through the
+    process-wide Groq limiter, which enforces the request/token budget and retries
+    rate-limit and server errors. When a stage has a fallback model, the primary
+    gets FALLBACK_AFTER_RETRIES retries (none after a timeout) and then the
+    fallback is tried instead.
+    """
+    def __init__(self, api_key: str, use_cache: bool = True, cache: Optional[LLMResponseCache] = None,
+                 router: Optional[ModelRouter] = None):
+        self.client = get_groq_client(api_key)
+        self.use_cache = use_cache and os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+        self.cache = cache or (get_llm_cache() if self.use_cache else None)
+        self.router = router or get_model_router()
+
+    def cache_enabled_for(self, stage: str) -> bool:
+        return self.use_cache and stage not in _cache_disabled_stages()
+
+    def _estimate_request_tokens(self, messages: List[Dict], params: Dict) -> int:
+        prompt_tokens = sum(estimate_tokens(message.get("content") or "") for message in messages)
+        return prompt_tokens + params.get("max_tokens", DEFAULT_COMPLETION_TOKENS)
+
+    def _record(self, stage: str, model: str, seconds: float, prompt_tokens: int = 0, completion_tokens: int = 0,
+                error: bool = False, fallback: bool = False):
+        record_llm_call(stage, model, seconds, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                        error=error)
+        self.router.record(stage, model, seconds, prompt_tokens, completion_tokens, error=error, fallback=fallback)
+
+    def _cached(self, stage: str, model: str, messages: List[Dict], params: Dict) -> Optional[str]:
+        cached = self.cache.get(make_cache_key(model, messages, params))
+        record_cache("llm", cached is not None)
+        if cached is not None:
+            record_llm_call(stage, model, 0.0, cached=True)
+        return cached
+
+    @staticmethod
+    def _retry_options(route: ModelRoute, model: str) -> Dict:
+        """
+        A primary model with a fallback gets FALLBACK_AFTER_RETRIES retries, and
+        none after a timeout: a slow model goes straight to its fallback.
+        """
+        if model == route.model and route.fallback_model:
+            return {"max_retries": FALLBACK_AFTER_RETRIES, "retry_timeouts": False}
+        return {}
+
+    @staticmethod
+    def _should_fall_back(route: ModelRoute, error: Exception) -> bool:
+        # Slow (timed out), rate-limited, overloaded or paused by its breaker; a bad request would fail on any model
+        return bool(route.fallback_model) and (is_retryable(error) or isinstance(error, CircuitOpenError))
+
+    def _fall_back(self, route: ModelRoute, error: Exception, started: float):
+        print(f"LLM [{route.stage}]: {route.model} failed ({error}); falling back to {route.fallback_model}")
+        self._record(route.stage, route.model, time.perf_counter() - started, error=True, fallback=True)
+        LLM_FALLBACKS.inc(stage=route.stage, model=route.model, fallback=route.fallback_model)
+
+    def complete(self, messages: List[Dict], model: Optional[str] = None, stage: str = "default", **params) -> str:
+        """
+        Returns the completion text for `messages` from the stage's routed model (or
+        `model`), serving repeats of the same prompt from the cache. Explicit `params`
+        override the route's.
+        """
+        route = self.router.route(stage, model)
+        params = dict(route.params(), **params)
+        started = time.perf_counter()
+        try:
+            return self._complete(messages, route, route.model, params)
+        except Exception as e:
+            if not self._should_fall_back(route, e):
+                raise
+            self._fall_back(route, e, started)
+        return self._complete(messages, route, route.fallback_model, params)
+
+    def complete_json(self, messages: List[Dict], validate: Optional[Callable[[Dict], Any]] = None,
+                      model: Optional[str] = None, stage: str = "default", **params) -> Any:
+        """
+        Returns the JSON object the stage's model replies with, checked by `validate`
+        (which raises ValueError for a reply that doesn't fit its schema). Routes
+        with `json_mode` ask for a JSON object response; if the provider rejects
+        that, the call is repeated without it. Replies are parsed tolerantly (see
+        structured_output.parse_json_object); one that still can't be used is
+        dropped from the cache and asked for again, up to JSON_RETRIES times.
+        """
+        route = self.router.route(stage, model)
+        if route.json_mode and "response_format" not in params:
+            params["response_format"] = {"type": "json_object"}
+        for attempt in range(JSON_RETRIES + 1):
+            try:
+                text = self.complete(messages, model=model, stage=stage, **params)
+            except Exception as e:
+                if "response_format" not in params or getattr(e, "status_code", None) != 400:
+                    raise
+                # The model has no JSON mode, or its output failed the provider's JSON check
+                print(f"LLM [{stage}]: JSON mode request failed ({e}); parsing a plain reply instead")
+                del params["response_format"]
+                text = _failed_generation(e) or self.complete(messages, model=model, stage=stage, **params)
+            try:
+                data = parse_json_object(text)
+                result = validate(data) if validate else data
+            except ValueError as e:
+                LLM_JSON_REPLIES.inc(stage=stage, result="invalid")
+                error = e
+                self._forget(route, messages, params)
+                print(f"LLM [{stage}]: unusable JSON reply ({e}); attempt {attempt + 1} of {JSON_RETRIES + 1}")
+                continue
+            LLM_JSON_REPLIES.inc(stage=stage, result="valid")
+            return result
+        raise ValueError(f"No usable JSON reply: {error}")
+
+    def _forget(self, route: ModelRoute, messages: List[Dict], params: Dict):
+        if not self.cache_enabled_for(route.stage):
+            return
+        params = dict(route.params(), **params)
+        for model in filter(None, (route.model, route.fallback_model)):
+            self.cache.delete(make_cache_key(model, messages, params))
+
+    def _complete(self, messages: List[Dict], route: ModelRoute, model: str, params: Dict) -> str:
+        stage = route.stage
+        use_cache = self.cache_enabled_for(stage)
+        if use_cache:
+            cached = self._cached(stage, model, messages, params)
+            if cached is not None:
+                return cached
+
+        limiter = get_rate_limiter("groq")
+        estimated_tokens = self._estimate_request_tokens(messages, params)
+        started = time.perf_counter()
+        try:
+            response = limiter.call(self.client.chat.completions.create, messages=messages, model=model,
+                                    tokens=estimated_tokens, circuit=model, **self._retry_options(route, model),
+                                    **route.client_options(), **params)
+        except Exception as e:
+            if not (model == route.model and self._should_fall_back(route, e)):
+                self._record(stage, model, time.perf_counter() - started, error=True)
+            raise
+        content = response.choices[0].message.content if response.choices else None
+        content = content or ""
+
+        usage = getattr(response, "usage", None)
+        if usage is not None and getattr(usage, "total_tokens", None):
+            limiter.record_tokens(usage.total_tokens - estimated_tokens)
+        self._record(stage, model, time.perf_counter() - started,
+                     prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+                     completion_tokens=getattr(usage, "completion_tokens", 0) or 0)
+
+        if use_cache and content:
+            self.cache.set(make_cache_key(model, messages, params), content)
+        return content
+
+    def stream(self, messages: List[Dict], model: Optional[str] = None, stage: str = "default",
+               **params) -> Iterator[str]:
+        """
+        Yields the completion as it is generated. A cached completion is yielded in
+        one piece. Falls back to the stage's fallback model only if the primary
+        fails before its first token.
+        """
+        route = self.router.route(stage, model)
+        params = dict(route.params(), **params)
+        started = time.perf_counter()
+        streamed = False
+        try:
+            for delta in self._stream(messages, route, route.model, params):
+                streamed = True
+                yield delta
+            return
+        except Exception as e:
+            if streamed or not self._should_fall_back(route, e):
+                raise
+            self._fall_back(route, e, started)
+        yield from self._stream(messages, route, route.fallback_model, params)
+
+    def _stream(self, messages: List[Dict], route: ModelRoute, model: str, params: Dict) -> Iterator[str]:
+        stage = route.stage
+        use_cache = self.cache_enabled_for(stage)
+        if use_cache:
+            cached = self._cached(stage, model, messages, params)
+            if cached is not None:
+                yield cached
+                return
+
+        # Only opening the stream is retried; once tokens have been yielded a failure propagates
+        limiter = get_rate_limiter("groq")
+        estimated_tokens = self._estimate_request_tokens(messages, params)
+        started = time.perf_counter()
+        parts = []
+        usage = None
+        try:
+            completion = limiter.call(self.client.chat.completions.create, messages=messages, model=model,
+                                      stream=True, tokens=estimated_tokens, circuit=model,
+                                      **self._retry_options(route, model), **route.client_options(), **params)
+            for chunk in completion:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                # Groq reports usage on the last chunk of a stream
+                usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or usage
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        except Exception as e:
+            # A failure the caller falls back from is recorded once, as the fallback
+            if parts or not (model == route.model and self._should_fall_back(route, e)):
+                self._record(stage, model, time.perf_counter() - started, error=True)
+            raise
+
+        # Only a stream that ran to completion is worth caching
+        content = "".join(parts)
+        prompt_tokens = estimated_tokens - params.get("max_tokens", DEFAULT_COMPLETION_TOKENS)
+        limiter.record_tokens(prompt_tokens + estimate_tokens(content) - estimated_tokens)
+        self._record(stage, model, time.perf_counter() - started,
+                     prompt_tokens=getattr(usage, "prompt_tokens", None) or prompt_tokens,
+                     completion_tokens=getattr(usage, "completion_tokens", None) or estimate_tokens(content))
+        if use_cache and content:
+            self.cache.set(make_cache_key(model, messages, params), content)
@@ -1,28 +1,61 @@
 # backend/main.py
 
 import os
-import asyncio
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from typing import Dict, Optional
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from starlette.websockets import WebSocketState
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 import uvicorn
-import uuid
-
-# Import your existing agent logic
-from topic_search_agent import TopicSearchAgent
-from content_gap_agent import ContentGapAgent
-from outline_agent import OutlineAgent
-from writing_agent import WritingAgent
-from seo_agent import SEOAgent
-
-# Initialize Agents
-topic_agent = TopicSearchAgent()
-gap_agent = ContentGapAgent()
-outline_agent = OutlineAgent()
-writing_agent = WritingAgent()
-seo_agent = SEOAgent()
-
-app = FastAPI()
+from contextlib import asynccontextmanager
+
+from agent_executor import run_agent_call, shutdown_executor
+from agent_registry import get_agents
+from page_fetcher import shutdown_page_fetcher
+from article_store import get_article_store
+from rate_limiter import rate_limit_stats
+from model_router import get_model_router
+from metrics import JOB_QUEUE_DEPTH, JOBS_RUNNING, REGISTRY
+from token_budget import prompt_stats
+from topic_cache import TopicCache
+from generation_pipeline import GenerationPipeline
+from speculative_precompute import SpeculativePrecompute
+from job_queue import JobManager, QueueFullError
+
+# Agents (and the SDKs behind them) are created on first use rather than at
+# import, so workers start serving quickly.
+agents = get_agents()
+
+# Ranked topics change slowly, so /api/topics serves them from a TTL'd cache
+# that a background task keeps warm instead of hitting Reddit on every request.
+topic_cache = TopicCache(lambda: agents.topic_agent.fetch_trending_topics())
+
+# Generations run as background jobs on a bounded worker pool; clients submit
+# them and subscribe to progress, so a dropped connection doesn't lose the work.
+# Opt-in (SPECULATIVE_PRECOMPUTE=1): gap analyses for the top topics just served
+# are run ahead of time, only while no generation is waiting for a worker.
+precompute = SpeculativePrecompute(agents, is_busy=lambda: job_manager.busy())
+pipeline = GenerationPipeline(agents, precompute=precompute)
+job_manager = JobManager(pipeline)
+
+# Finished articles, served back by id, topic id or full-text search
+article_store = get_article_store()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    topic_cache.start()
+    job_manager.start()
+    precompute.start()
+    yield
+    await precompute.stop()
+    await job_manager.stop()
+    await topic_cache.stop()
+    agents.close()
+    shutdown_page_fetcher()
+    shutdown_executor()
+
+app = FastAPI(lifespan=lifespan)
 
 # --- CORS Middleware ---
 app.add_middleware(
@@ -37,8 +70,9 @@ app.add_middleware(
 
 @app.get("/api/topics")
 async def get_topics():
-    print("API: Fetching trending topics...")
-    topics = topic_agent.get_top_topics(limit=12)
+    topics, cache_info = await topic_cache.get(limit=12)
+    print(f"API: Served {len(topics)} topics (cache hit: {cache_info['hit']}, age: {cache_info['age_seconds']}s)")
+    precompute.schedule(topics)
     frontend_topics = [
         {
             "id": topic.get('id'), 
@@ -49,7 +83,119 @@ async def get_topics():
         }
         for topic in topics
     ]
-    return {"topics": frontend_topics}
+    return {"topics": frontend_topics, "cache": cache_info, "fetch_report": agents.topic_agent.last_fetch_report}
+
+
+@app.get("/api/search/stats")
+async def get_search_stats():
+    return agents.gap_agent.search_stats()
+
+
+def job_summary(job: Dict) -> Dict:
+    return {
+        "job_id": job['id'],
+        "status": job['status'],
+        "topic": job['topic'],
+        "created_at": job['created_at'],
+        "started_at": job['started_at'],
+        "finished_at": job['finished_at'],
+        "article": job['article'],
+        "error": job['error'],
+        "trace": job['trace'],
+    }
+
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(selected_topic: Dict):
+    if not selected_topic.get('title'):
+        raise HTTPException(status_code=422, detail="The topic must have a title.")
+    try:
+        job = await job_manager.submit(selected_topic, selected_topic.get('pace_seconds', 0))
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=422, detail="pace_seconds must be a number.")
+    return {"job_id": job['id'], "status": job['status'], "queue_position": job['queue_position']}
+
+
+@app.get("/api/jobs/metrics")
+async def get_job_metrics():
+    return await job_manager.metrics()
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job_summary(job)
+
+
+@app.get("/api/articles")
+async def list_articles(limit: int = 20, offset: int = 0, topic_id: Optional[str] = None):
+    return await run_agent_call(article_store.list, limit, offset, topic_id)
+
+
+@app.get("/api/articles/search")
+async def search_articles(q: str, limit: int = 20, offset: int = 0):
+    return await run_agent_call(article_store.search, q, limit, offset)
+
+
+@app.get("/api/articles/{article_id}")
+async def get_article(article_id: str):
+    article = await run_agent_call(article_store.get, article_id)
+    if article is None:
+        raise HTTPException(status_code=404, detail="Article not found.")
+    return article
+
+
+async def forward_job_events(websocket: WebSocket, job_id: str):
+    """Sends a job's progress frames to the client until the job finishes."""
+    async for event in job_manager.subscribe(job_id):
+        await websocket.send_json(event)
+
+
+async def close_websocket(websocket: WebSocket):
+    # Only try to close if the connection is still open
+    if websocket.client_state != WebSocketState.DISCONNECTED:
+        try:
+            await websocket.close()
+            print("WS: Connection closed gracefully.")
+        except RuntimeError:
+            # This can happen in rare race conditions, safe to ignore
+            pass
+
+
+@app.get("/api/rate-limits")
+async def get_rate_limits():
+    return rate_limit_stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus scrape endpoint: stage latencies, LLM tokens, cache hits, provider waits and job gauges."""
+    job_metrics = await job_manager.metrics()
+    JOB_QUEUE_DEPTH.set(job_metrics["queue_depth"])
+    JOBS_RUNNING.set(job_metrics["running"])
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/precompute")
+async def get_precompute_stats():
+    """Speculative precompute: hit rate, budget use, and tokens spent, used and wasted."""
+    return precompute.stats()
+
+
+@app.get("/api/models")
+async def get_models():
+    """The model route of each LLM stage, and API calls, latency, tokens and fallbacks per stage and model."""
+    return get_model_router().stats()
+
+
+@app.get("/api/token-budget")
+async def get_token_budget():
+    """Prompt tokens sent and saved by compaction, per LLM stage."""
+    return prompt_stats.stats()
 
 
 @app.websocket("/ws/generate")
@@ -58,46 +204,12 @@ async def generate_article_ws(websocket: WebSocket):
     try:
         selected_topic = await websocket.receive_json()
         print(f"WS: Received topic: {selected_topic.get('title')}")
-        
-        topic_title = selected_topic.get('title', '')
-
-        # --- Start the LangGraph-like Pipeline ---
-
-        # Step 1: Content Gap Analysis
-        await websocket.send_json({"text": "Analyzing content gaps...", "progress": 25})
-        gap_report = gap_agent.analyze_topic(selected_topic)
-        if "error" in gap_report:
-            raise Exception(gap_report["error"])
-        await asyncio.sleep(2) # Add a 2-second delay for UX
-        
-        factual_briefing = gap_agent.get_factual_briefing(topic_title)
-        await asyncio.sleep(1) # Add a 1-second delay for UX
-
-        # Step 2: Outline Generation
-        await websocket.send_json({"text": "Generating strategic outline...", "progress": 50})
-        blog_outline = outline_agent.create_outline(topic_title, gap_report, factual_briefing)
-        if not blog_outline:
-            raise Exception("Failed to generate blog outline.")
-        await asyncio.sleep(2) # Add a 2-second delay for UX
-
-        # Step 3: Writing First Draft
-        await websocket.send_json({"text": "Writing first draft...", "progress": 75})
-        first_draft = writing_agent.write_article(blog_outline)
-        if not first_draft:
-            raise Exception("Failed to write the first draft.")
-        await asyncio.sleep(2) # Add a 2-second delay for UX
-
-        # Step 4: SEO Optimization
-        await websocket.send_json({"text": "Optimizing for SEO & finalizing...", "progress": 90})
-        keywords = [word for word in selected_topic['title'].split() if len(word) > 4]
-        seo_report = seo_agent.inspector(first_draft, keywords)
-        final_article = seo_agent.rewrite_article(first_draft, seo_report)
-        if not final_article:
-            raise Exception("Failed to finalize the article with SEO optimization.")
-        await asyncio.sleep(1) # Add a 1-second delay for UX
-
-        # --- Pipeline Complete ---
-        await websocket.send_json({"text": "Done", "progress": 100, "article": final_article})
+
+        # The generation runs as a job, so it carries on if this socket drops;
+        # the client can pick it up again on /ws/jobs/{job_id}.
+        job = await job_manager.submit(selected_topic, selected_topic.get('pace_seconds', 0))
+        await websocket.send_json({"text": "Queued...", "progress": 0, "job_id": job['id']})
+        await forward_job_events(websocket, job['id'])
 
     except WebSocketDisconnect:
         print("WS: Client disconnected.")
@@ -105,14 +217,20 @@ async def generate_article_ws(websocket: WebSocket):
         print(f"Error during generation: {e}")
         await websocket.send_json({"error": str(e)})
     finally:
-        # Only try to close if the connection is still open
-        if websocket.client_state != WebSocketState.DISCONNECTED:
-            try:
-                await websocket.close()
-                print("WS: Connection closed gracefully.")
-            except RuntimeError:
-                # This can happen in rare race conditions, safe to ignore
-                pass
+        await close_websocket(websocket)
+
+
+@app.websocket("/ws/jobs/{job_id}")
+async def job_progress_ws(websocket: WebSocket, job_id: str):
+    await websocket.accept()
+    try:
+        await forward_job_events(websocket, job_id)
+    except KeyError:
+        await websocket.send_json({"error": "Job not found."})
+    except WebSocketDisconnect:
+        print("WS: Client disconnected.")
+    finally:
+        await close_websocket(websocket)
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
@@ -1,6 +1,15 @@
+import os
 import re
+import json
 import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
 from blog_generation_graph import create_blog_generation_graph
+from graph_checkpoints import create_checkpointer, list_runs, new_run_id, resume_config, run_config, run_summary
+from metrics import start_trace
+from rate_limiter import configure_rate_limit
+from agent_registry import get_agents
 
 def create_safe_filename(title):
     """Creates a safe, short filename from an article title."""
@@ -10,24 +19,74 @@ def create_safe_filename(title):
     safe_title = re.sub(r'[^\w\s-]', '', clean_title).strip().replace(' ', '_').lower()
     return f"{safe_title[:50]}.md"
 
-def main():
-    """Main execution function using a simplified LangGraph workflow"""
-    print("Starting Blog Generation")
-    print("=" * 60)
-
-    app = create_blog_generation_graph()
-
-    initial_state = {
+def build_initial_state(selected_topic: Optional[Dict] = None, run_id: Optional[str] = None) -> Dict:
+    return {
+        "run_id": run_id,
         "all_topics": None,
-        "selected_topic": None,
-        "topic_title": None,
+        "selected_topic": selected_topic,
+        "topic_title": selected_topic['title'] if selected_topic else None,
         "gap_analysis": None,
+        "factual_briefing": None,
         "blog_outline": None,
         "final_article": None,
+        "seo_passed": None,
+        "seo_rewrites": 0,
     }
 
+def save_article(final_article: str, output_dir: str = ".") -> str:
+    """Writes the article to a new file named after its title, never overwriting an earlier one."""
+    title_line = final_article.splitlines()[0] if final_article else "untitled_blog"
+    base, ext = os.path.splitext(create_safe_filename(title_line))
+    counter = 1
+    while True:
+        suffix = f"_{counter}" if counter > 1 else ""
+        path = os.path.join(output_dir, f"{base}{suffix}{ext}")
+        try:
+            # Exclusive create, so concurrent batch workers can't claim the same name
+            with open(path, 'x', encoding='utf-8') as f:
+                f.write(final_article)
+            return path
+        except FileExistsError:
+            counter += 1
+
+def main(resume_run_id: Optional[str] = None, from_stage: Optional[str] = None, output_dir: str = "."):
+    """
+    Main execution function using a simplified LangGraph workflow.
+    With `resume_run_id`, continues a checkpointed run from its last completed
+    stage instead (or re-runs it from `from_stage`).
+    """
+    print("Starting Blog Generation")
+    print("=" * 60)
+
+    app = create_blog_generation_graph(create_checkpointer())
+
+    if resume_run_id:
+        run_id = resume_run_id
+        summary = run_summary(app, run_id)
+        if summary is None:
+            print(f"No checkpoints found for run {run_id}.")
+            return
+        if summary['finished'] and not from_stage:
+            print(f"Run {run_id} already finished. Use --from-stage to run part of it again.")
+            return
+        try:
+            config = resume_config(app, run_id, from_stage)
+        except KeyError as e:
+            print(e.args[0])
+            return
+        inputs = None
+        print(f"Resuming run {run_id} ({summary['title']}) at: {from_stage or ', '.join(summary['next'])}")
+    else:
+        run_id = new_run_id()
+        config = run_config(run_id)
+        inputs = build_initial_state(run_id=run_id)
+        print(f"Run id: {run_id}")
+
     try:
-        final_state = app.invoke(initial_state)
+        with start_trace(run_id, kind="graph") as trace:
+            final_state = app.invoke(inputs, config)
+            if not final_state.get('final_article'):
+                trace.status = "failed"
 
         print("\n" + "=" * 60)
         print("WORKFLOW COMPLETED")
@@ -37,19 +96,151 @@ def main():
         if final_article:
             print("SUCCESS: Final article generated!")
             # Save the final article to a file
-            title_line = final_article.splitlines()[0] if final_article else "untitled_blog"
-            filename = create_safe_filename(title_line)
-
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write(final_article)
-
-            print(f"\nBlog saved to: {filename}")
+            os.makedirs(output_dir, exist_ok=True)
+            filename = save_article(final_article, output_dir)
+            print(f"\nBlog saved to: {filename} (article id: {final_state.get('article_id')})")
         else:
             print("WORKFLOW FAILED: No final article was generated.")
+        print_trace(trace.to_dict())
 
     except Exception as e:
         print(f"\nCRITICAL ERROR during graph execution: {e}")
         print("Please check your API keys, internet connection, and agent logic.")
+        print(f"Completed stages are checkpointed; resume with: python main_langgraph.py --resume {run_id}")
+
+def print_runs(limit: int = 20):
+    """Lists the most recent checkpointed runs and where each one stopped."""
+    runs = list_runs(create_blog_generation_graph(create_checkpointer()), limit)
+    if not runs:
+        print("No checkpointed runs yet.")
+        return
+    for run in runs:
+        status = "finished" if run['finished'] else f"stopped before {', '.join(run['next'])}"
+        if run['finished'] and not run['has_article']:
+            status = "finished without an article"
+        print(f"  {run['run_id']}  {run['updated_at'][:19]}  {status:<34}  {run['title'] or '(no topic selected yet)'}")
+
+def print_trace(trace: Dict):
+    """Prints where the run's time and tokens went, stage by stage."""
+    print("\nStage timings:")
+    for span in trace['spans']:
+        error = f"  ERROR: {span['error']}" if span['error'] else ""
+        print(f"  {span['stage']:<16} {span['seconds']:>7.2f}s  wait {span['wait_seconds']:>6.2f}s  "
+              f"llm {span['llm_calls']} ({span['cache_hits']} cached)  "
+              f"tokens {span['prompt_tokens']}+{span['completion_tokens']}{error}")
+    totals = trace['totals']
+    print(f"  {'total':<16} {trace['seconds']:>7.2f}s  wait {totals['wait_seconds']:>6.2f}s  "
+          f"llm {totals['llm_calls']} ({totals['cache_hits']} cached)  "
+          f"tokens {totals['prompt_tokens']}+{totals['completion_tokens']}")
+
+def load_topics_file(path: str) -> List[Dict]:
+    """Reads topics from a JSON list (of topic dicts or titles) or a text file with one title per line."""
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.json'):
+            entries = json.load(f)
+        else:
+            entries = [line.strip() for line in f if line.strip()]
+
+    topics = []
+    for i, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            entry = {"title": str(entry).strip()}
+        entry.setdefault("id", f"file-{i + 1}")
+        topics.append(entry)
+    return topics
+
+def run_topic(app, topic: Dict, output_dir: str) -> Dict:
+    """Runs the checkpointed graph for one topic and returns its manifest entry."""
+    started = time.time()
+    run_id = new_run_id()
+    result = {"run_id": run_id, "topic_id": topic.get('id'), "title": topic.get('title'), "subreddit": topic.get('subreddit')}
+    if not result["title"]:
+        # A bad topics-file entry fails on its own instead of aborting the batch
+        result.update(status="failed", error="The topic has no title.", seconds=0.0)
+        return result
+    final_state = {}
+    try:
+        with start_trace(run_id, kind="graph") as trace:
+            final_state = app.invoke(build_initial_state(topic, run_id), run_config(run_id))
+            if not final_state.get('final_article'):
+                trace.status = "failed"
+    except Exception as e:
+        result.update(status="failed", error=str(e))
+    else:
+        final_article = final_state.get('final_article')
+        if final_article:
+            result.update(status="succeeded", file=save_article(final_article, output_dir),
+                          article_id=final_state.get('article_id'))
+        else:
+            result.update(status="failed", error=final_state.get('error_message') or "No final article was generated.")
+    result["seconds"] = round(time.time() - started, 2)
+    result["trace"] = trace.to_dict()
+    return result
+
+def run_batch(topics: List[Dict], concurrency: int, output_dir: str, manifest_path: str) -> Dict:
+    """Generates an article per topic, `concurrency` at a time, and writes a manifest of the results."""
+    os.makedirs(output_dir, exist_ok=True)
+    app = create_blog_generation_graph(create_checkpointer())
+    manifest = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "concurrency": concurrency,
+        "topics": [],
+    }
+    started = time.time()
+
+    print(f"Generating {len(topics)} articles, {concurrency} at a time...")
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(run_topic, app, topic, output_dir) for topic in topics]
+        for future in as_completed(futures):
+            result = future.result()
+            manifest["topics"].append(result)
+            print(f"[{result['status'].upper()}] {result['title']} ({result['seconds']}s)")
+
+    manifest["finished_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    manifest["seconds"] = round(time.time() - started, 2)
+    manifest["succeeded"] = sum(1 for r in manifest["topics"] if r["status"] == "succeeded")
+    manifest["failed"] = len(manifest["topics"]) - manifest["succeeded"]
+
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"\nBatch finished: {manifest['succeeded']} succeeded, {manifest['failed']} failed. Manifest: {manifest_path}")
+    if manifest['failed']:
+        print("Failed runs can be resumed from their last completed stage with --resume <run_id> (run ids are in the manifest).")
+    return manifest
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate blog articles with the LangGraph workflow.")
+    parser.add_argument("--batch", type=int, metavar="N",
+                        help="Generate articles for the top N trending topics.")
+    parser.add_argument("--topics-file", help="Generate articles for the topics in this file (.json or one title per line).")
+    parser.add_argument("--concurrency", type=int, default=3, help="Articles generated at the same time (default: 3).")
+    parser.add_argument("--llm-rpm", type=float,
+                        help="Groq requests per minute shared by the whole batch (default: GROQ_REQUESTS_PER_MINUTE).")
+    parser.add_argument("--output-dir", default=".", help="Where to write the articles (default: current directory).")
+    parser.add_argument("--manifest", help="Path of the batch manifest (default: <output-dir>/batch_manifest_<timestamp>.json).")
+    parser.add_argument("--resume", metavar="RUN_ID", help="Resume a checkpointed run from its last completed stage.")
+    parser.add_argument("--from-stage", metavar="STAGE",
+                        help="With --resume, re-run the run from this stage (e.g. writing) using the state saved before it.")
+    parser.add_argument("--list-runs", action="store_true", help="List recent checkpointed runs and where they stopped.")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    if args.llm_rpm:
+        configure_rate_limit("groq", args.llm_rpm)
+
+    if args.list_runs:
+        print_runs()
+    elif args.resume:
+        main(args.resume, args.from_stage, args.output_dir)
+    elif args.batch or args.topics_file:
+        if args.topics_file:
+            batch_topics = load_topics_file(args.topics_file)
+            if args.batch:
+                batch_topics = batch_topics[:args.batch]
+        else:
+            batch_topics = get_agents().topic_agent.get_top_topics(limit=args.batch)
+        manifest_path = args.manifest or os.path.join(args.output_dir, f"batch_manifest_{int(time.time())}.json")
+        run_batch(batch_topics, max(args.concurrency, 1), args.output_dir, manifest_path)
+    else:
+        main(output_dir=args.output_dir)
@@ -0,0 +1,310 @@
+# metrics.py
+import time
+import functools
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; covers cache hits through multi-minute article runs
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _format_labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    parts = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        parts.append(f'{name}="{escaped}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """The metric's exposition lines, one per label set (and bucket)."""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        super().__init__(name, help_text, label_names)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+                    for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, Dict] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series["buckets"]):
+                    labels = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.label_names, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {series['count']}")
+                labels = _format_labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(series['sum'])}")
+                lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics)
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = Histogram("blog_stage_duration_seconds", "Wall time of each pipeline stage.", ["stage"])
+STAGE_ERRORS = Counter("blog_stage_errors_total", "Pipeline stages that failed.", ["stage"])
+LLM_SECONDS = Histogram("blog_llm_request_duration_seconds",
+                        "Wall time of LLM calls that reached the API, including rate-limit waits.", ["stage", "model"])
+LLM_TOKENS = Counter("blog_llm_tokens_total", "Tokens reported by the LLM API.", ["stage", "model", "kind"])
+LLM_ERRORS = Counter("blog_llm_errors_total", "LLM calls that raised.", ["stage", "model"])
+LLM_FALLBACKS = Counter("blog_llm_fallbacks_total",
+                        "LLM calls retried on the stage's fallback model.", ["stage", "model", "fallback"])
+LLM_JSON_REPLIES = Counter("blog_llm_json_replies_total",
+                           "Structured-output replies that parsed and validated (valid) or didn't (invalid).",
+                           ["stage", "result"])
+CACHE_REQUESTS = Counter("blog_cache_requests_total", "Cache lookups by outcome.", ["cache", "result"])
+PROVIDER_WAIT = Histogram("blog_provider_wait_seconds",
+                          "Time spent waiting for a provider's rate limit or retry backoff.", ["provider", "reason"])
+RUNS = Counter("blog_runs_total", "Finished article runs.", ["kind", "status"])
+RUN_SECONDS = Histogram("blog_run_duration_seconds", "Wall time of whole article runs.", ["kind"])
+PAGE_FETCHES = Counter("blog_page_fetches_total",
+                       "Competitor page lookups by outcome (cached, fetched, not_modified, failed, timed_out).", ["result"])
+PAGE_FETCH_SECONDS = Histogram("blog_page_fetch_duration_seconds",
+                               "Wall time of competitor page downloads and text extraction.")
+SPECULATIVE_LOOKUPS = Counter("blog_speculative_lookups_total",
+                              "Generations that found (hit) or didn't find (miss) a precomputed gap analysis.", ["result"])
+SPECULATIVE_TOKENS = Counter("blog_speculative_tokens_total",
+                             "LLM tokens of speculative precomputes: spent, used by a generation, or wasted.", ["kind"])
+JOB_QUEUE_DEPTH = Gauge("blog_job_queue_depth", "Jobs waiting for a worker.")
+JOBS_RUNNING = Gauge("blog_jobs_running", "Jobs being generated right now.")
+
+
+class RunTrace:
+    """
+    Per-run record of every stage span: wall time, provider wait time, LLM calls,
+    tokens, cache hits and errors. Attached to the job or graph state at the end.
+    """
+    def __init__(self, run_id: Optional[str] = None, kind: str = "graph"):
+        self.run_id = run_id
+        self.kind = kind
+        self.status = "succeeded"
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.seconds: Optional[float] = None
+        self.spans: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def add_span(self, span: Dict):
+        with self._lock:
+            self.spans.append(span)
+
+    def finish(self):
+        self.seconds = round(time.perf_counter() - self._started, 3)
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            spans = [dict(span) for span in self.spans]
+        totals = {key: sum(span[key] for span in spans)
+                  for key in ("llm_calls", "prompt_tokens", "completion_tokens", "cache_hits")}
+        totals["wait_seconds"] = round(sum(span["wait_seconds"] for span in spans), 3)
+        seconds = self.seconds if self.seconds is not None else round(time.perf_counter() - self._started, 3)
+        return {
+            "run_id": self.run_id,
+            "status": self.status,
+            "started_at": self.started_at,
+            "seconds": seconds,
+            "spans": spans,
+            "totals": totals,
+        }
+
+
+_current_trace: ContextVar[Optional[RunTrace]] = ContextVar("run_trace", default=None)
+_current_span: ContextVar[Optional[Dict]] = ContextVar("trace_span", default=None)
+_span_lock = threading.Lock()
+
+
+def current_trace() -> Optional[RunTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def start_trace(run_id: Optional[str] = None, kind: str = "graph") -> Iterator[RunTrace]:
+    """
+    Collects the spans of one article run. Set `trace.status` to "failed" for runs
+    that fail without raising; an exception marks the run failed automatically.
+    """
+    trace = RunTrace(run_id, kind)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    except BaseException:
+        trace.status = "failed"
+        raise
+    finally:
+        _current_trace.reset(token)
+        trace.finish()
+        RUNS.inc(kind=kind, status=trace.status)
+        RUN_SECONDS.observe(trace.seconds, kind=kind)
+
+
+def _update_span(**deltas):
+    span = _current_span.get()
+    if span is None:
+        return
+    # Section writers and other helper threads share their parent stage's span
+    with _span_lock:
+        for key, value in deltas.items():
+            span[key] += value
+
+
+@contextmanager
+def track_stage(stage: str) -> Iterator[Dict]:
+    """Times a pipeline stage and collects everything recorded during it into one span."""
+    trace = _current_trace.get()
+    span = {
+        "stage": stage,
+        "offset_seconds": round(time.perf_counter() - trace._started, 3) if trace else 0.0,
+        "seconds": 0.0,
+        "wait_seconds": 0.0,
+        "llm_calls": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "cache_hits": 0,
+        "error": None,
+    }
+    token = _current_span.set(span)
+    started = time.perf_counter()
+    try:
+        yield span
+    except Exception as e:
+        span["error"] = str(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span["seconds"] = round(time.perf_counter() - started, 3)
+        span["wait_seconds"] = round(span["wait_seconds"], 3)
+        STAGE_SECONDS.observe(span["seconds"], stage=stage)
+        if span["error"]:
+            STAGE_ERRORS.inc(stage=stage)
+        if trace is not None:
+            trace.add_span(span)
+
+
+def traced_stage(stage: str):
+    """Decorator form of track_stage, for graph nodes."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track_stage(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def mark_stage_error(message: str):
+    """Flags the current stage as failed when it handles an error without raising."""
+    span = _current_span.get()
+    if span is not None:
+        span["error"] = message
+
+
+def record_llm_call(stage: str, model: str, seconds: float, prompt_tokens: int = 0, completion_tokens: int = 0,
+                    cached: bool = False, error: bool = False):
+    if cached:
+        _update_span(llm_calls=1, cache_hits=1)
+        return
+    LLM_SECONDS.observe(seconds, stage=stage, model=model)
+    if error:
+        LLM_ERRORS.inc(stage=stage, model=model)
+    LLM_TOKENS.inc(prompt_tokens, stage=stage, model=model, kind="prompt")
+    LLM_TOKENS.inc(completion_tokens, stage=stage, model=model, kind="completion")
+    _update_span(llm_calls=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+
+def record_wait(provider: str, seconds: float, reason: str = "rate_limit"):
+    PROVIDER_WAIT.observe(seconds, provider=provider, reason=reason)
+    if seconds:
+        _update_span(wait_seconds=seconds)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
@@ -0,0 +1,151 @@
+# model_router.py
+import os
+import json
+import threading
+from dataclasses import asdict, dataclass, replace
+from typing import Dict, Optional
+
+# LLM stages, as passed to LLMClient.complete/stream
+STAGES = ("gap", "briefing", "outline", "writing", "transitions", "seo")
+
+# Used by every stage that the config doesn't say otherwise for
+DEFAULT_ROUTE = {"model": "llama-3.1-8b-instant", "timeout": 60.0, "json_mode": True}
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    """
+    Which model a stage calls and how: sampling limits, request timeout, a fallback
+    model, and whether the model supports JSON mode (used for structured output).
+    """
+    stage: str
+    model: str
+    max_tokens: Optional[int] = None
+    temperature: Optional[float] = None
+    timeout: Optional[float] = None
+    fallback_model: Optional[str] = None
+    json_mode: Optional[bool] = None
+
+    def params(self) -> Dict:
+        """Chat API parameters set by the route; they are part of the response cache key."""
+        return {name: value for name, value in (("max_tokens", self.max_tokens), ("temperature", self.temperature))
+                if value is not None}
+
+    def client_options(self) -> Dict:
+        """Request options that don't change the completion (left out of the cache key)."""
+        return {"timeout": self.timeout} if self.timeout else {}
+
+
+# Route settings and how to read them from the config file or the environment
+def _flag(value) -> bool:
+    return value if isinstance(value, bool) else str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+ROUTE_FIELDS = {"model": str, "max_tokens": int, "temperature": float, "timeout": float, "fallback_model": str,
+                "json_mode": _flag}
+
+
+def _parse(name: str, value) -> object:
+    if value is None or value == "":
+        return None
+    return ROUTE_FIELDS[name](value)
+
+
+def _env_settings(suffix: str = "") -> Dict:
+    """LLM_MODEL, LLM_MAX_TOKENS, ... (with `suffix`, e.g. LLM_MODEL_WRITING)."""
+    settings = {}
+    for name in ROUTE_FIELDS:
+        value = os.getenv(f"LLM_{name.upper()}{suffix}")
+        if value is not None:
+            settings[name] = value
+    return settings
+
+
+def load_routes(path: Optional[str] = None) -> Dict[str, ModelRoute]:
+    """
+    The route of every stage. Settings are layered: the built-in default, the
+    "default" entry of the JSON file at MODEL_ROUTES_FILE, LLM_<FIELD> variables,
+    then per stage the file's "<stage>" entry and LLM_<FIELD>_<STAGE> variables.
+    For example LLM_MODEL_WRITING=llama-3.3-70b-versatile with
+    LLM_FALLBACK_MODEL_WRITING=llama-3.1-8b-instant.
+    """
+    path = path or os.getenv("MODEL_ROUTES_FILE")
+    config = {}
+    if path:
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+    unknown = set(config) - set(STAGES) - {"default"}
+    if unknown:
+        raise ValueError(f"Unknown stages in {path}: {', '.join(sorted(unknown))}")
+
+    default = dict(DEFAULT_ROUTE, **config.get("default", {}), **_env_settings())
+    routes = {}
+    for stage in ("default",) + STAGES:
+        settings = dict(default, **config.get(stage, {}), **_env_settings(f"_{stage.upper()}"))
+        unknown = set(settings) - set(ROUTE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown model route settings for {stage}: {', '.join(sorted(unknown))}")
+        routes[stage] = ModelRoute(stage=stage, **{name: _parse(name, value) for name, value in settings.items()})
+    return routes
+
+
+class ModelRouter:
+    """
+    Resolves each LLM stage to its route and keeps per-stage, per-model call
+    counts, latency, token usage and fallbacks, so each stage's model can be
+    tuned for cost and latency (served at /api/models).
+    """
+    def __init__(self, routes: Optional[Dict[str, ModelRoute]] = None):
+        self.routes = routes or load_routes()
+        self._lock = threading.Lock()
+        self._usage: Dict[tuple, Dict] = {}
+
+    def route(self, stage: str, model: Optional[str] = None) -> ModelRoute:
+        """The stage's route; an explicit `model` replaces the routed one (and its fallback)."""
+        route = self.routes.get(stage) or replace(self.routes["default"], stage=stage)
+        if model and model != route.model:
+            route = replace(route, model=model, fallback_model=None)
+        return route
+
+    def record(self, stage: str, model: str, seconds: float, prompt_tokens: int = 0, completion_tokens: int = 0,
+               error: bool = False, fallback: bool = False):
+        with self._lock:
+            usage = self._usage.setdefault((stage, model), {
+                "calls": 0, "errors": 0, "fallbacks": 0, "seconds_total": 0.0,
+                "prompt_tokens": 0, "completion_tokens": 0,
+            })
+            usage["calls"] += 1
+            usage["errors"] += int(error)
+            usage["fallbacks"] += int(fallback)
+            usage["seconds_total"] += seconds
+            usage["prompt_tokens"] += prompt_tokens
+            usage["completion_tokens"] += completion_tokens
+
+    def stats(self) -> Dict:
+        with self._lock:
+            usage = {key: dict(value) for key, value in self._usage.items()}
+        stages: Dict[str, Dict] = {}
+        for (stage, model), values in sorted(usage.items()):
+            answered = values["calls"] - values["errors"]
+            values["seconds_total"] = round(values["seconds_total"], 3)
+            values["avg_seconds"] = round(values["seconds_total"] / values["calls"], 3) if values["calls"] else 0.0
+            values["avg_completion_tokens"] = round(values["completion_tokens"] / answered, 1) if answered else 0.0
+            stages.setdefault(stage, {})[model] = values
+        return {
+            "routes": {stage: {k: v for k, v in asdict(route).items() if k != "stage"}
+                       for stage, route in self.routes.items()},
+            "usage": stages,
+        }
+
+
+_shared_router: Optional[ModelRouter] = None
+_shared_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """Returns the process-wide model router, loading the routes on first use."""
+    global _shared_router
+    with _shared_lock:
+        if _shared_router is None:
+            _shared_router = ModelRouter()
+        return _shared_router
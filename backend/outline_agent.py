@@ -1,19 +1,19 @@
-import json
 import os
-from dotenv import load_dotenv
-from groq import Groq
-from langchain.prompts import PromptTemplate
+from agent_registry import load_env
+from llm_client import LLMClient
+from state_schema import GapReport
+from token_budget import render_prompt
 
 class OutlineAgent:
-    def __init__(self):
-        load_dotenv()
+    def __init__(self, use_llm_cache: bool = True):
+        load_env()
         groq_api_key = os.getenv("GROQ_API_KEY")
         if not groq_api_key:
             raise ValueError("GROQ_API_KEY not found in .env file.")
 
-        self.client = Groq(api_key=groq_api_key)
+        self.client = LLMClient(api_key=groq_api_key, use_cache=use_llm_cache)
 
-    def create_outline(self, topic_title:str, gap_report:dict, factual_briefing: str = "") -> str:
+    def create_outline(self, topic_title:str, gap_report: GapReport, factual_briefing: str = "") -> str:
         template_string = """
         You are a Chief Content Architect, renowned for creating blog post outlines that dominate search engine results pages.
         Your task is to transform a simple topic and a gap analysis report into a strategic, comprehensive,factual briefing and highly-engaging blog post outline.
@@ -53,20 +53,16 @@ class OutlineAgent:
         Generate the complete blog post outline now.
         """
 
-        prompt_template = PromptTemplate(template=template_string, input_variables=['topic_title', 'gap_report', 'factual_briefing'])
-        report_string = json.dumps(gap_report, indent=2)
-        final_prompt = prompt_template.format(topic_title=topic_title, gap_report=report_string, factual_briefing=factual_briefing)
+        # The gap report goes in as minified JSON; the briefing is trimmed first if the prompt runs long
+        final_prompt = render_prompt("outline", template_string, trim=['factual_briefing'],
+                                     topic_title=topic_title, gap_report=gap_report, factual_briefing=factual_briefing)
 
         try:
-            response = self.client.chat.completions.create(
+            return self.client.complete(
                 messages=[{"role": "user", "content": final_prompt}],
-                model="llama-3.1-8b-instant"
+                stage="outline"
             )
-
-            if response.choices and response.choices[0].message.content:
-                return response.choices[0].message.content
-            else:
-                return ""
         except Exception as e:
-            # In a production environment, you might want to log this exception.
+            # Retryable errors were already retried by the shared Groq rate limiter
+            print(f"Error creating outline: {e}")
             return ""
\ No newline at end of file
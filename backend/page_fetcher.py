@@ -0,0 +1,240 @@
+# page_fetcher.py
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from cache_store import SQLiteCache, cache_path
+from metrics import PAGE_FETCHES, PAGE_FETCH_SECONDS, record_cache
+
+PAGE_FETCH_ENABLED = os.getenv("PAGE_FETCH_ENABLED", "1") != "0"
+# Per-URL budget for the whole download: connect, headers and body
+PAGE_FETCH_TIMEOUT = float(os.getenv("PAGE_FETCH_TIMEOUT", "6"))
+# Per-page budget for text extraction; the first pages also wait for the workers to start
+PAGE_EXTRACT_TIMEOUT = float(os.getenv("PAGE_EXTRACT_TIMEOUT", "10"))
+# Budget for a whole batch of pages; the gap analysis goes ahead with snippets for the rest
+PAGE_FETCH_DEADLINE = float(os.getenv("PAGE_FETCH_DEADLINE", "8"))
+# Longer pages are cut off here; the main text is almost always near the top
+PAGE_MAX_BYTES = int(os.getenv("PAGE_MAX_BYTES", str(2 * 1024 * 1024)))
+PAGE_FETCH_CONCURRENCY = int(os.getenv("PAGE_FETCH_CONCURRENCY", "8"))
+PAGE_EXTRACT_WORKERS = int(os.getenv("PAGE_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+# A cached extract is used without any request for this long, then revalidated with its ETag
+PAGE_CACHE_FRESH_SECONDS = float(os.getenv("PAGE_CACHE_FRESH_SECONDS", str(12 * 3600)))
+# Pages that failed (blocked, not HTML, timed out) are not retried before this
+PAGE_FAILURE_RETRY_SECONDS = float(os.getenv("PAGE_FAILURE_RETRY_SECONDS", "3600"))
+
+USER_AGENT = "Mozilla/5.0 (compatible; BloggingAgent/1.0)"
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+
+
+def _load_extractor():
+    import trafilatura  # noqa: F401
+
+
+def extract_main_text(html: str, url: str) -> str:
+    """The page's main text, without navigation, ads or comments. Runs in the extraction process pool."""
+    import trafilatura
+    return trafilatura.extract(html, url=url, include_comments=False, include_tables=False,
+                               favor_precision=True) or ""
+
+
+class PageFetcher:
+    """
+    Downloads competitor pages concurrently over one pooled HTTP client and pulls
+    out their main text with trafilatura in a process pool (extraction is CPU-bound
+    and would hold the GIL for the whole server). Extracts are cached by URL: fresh
+    ones are served without a request, older ones are revalidated with their ETag
+    or Last-Modified date, so an unchanged page only costs a 304.
+    """
+    def __init__(self, cache: Optional[SQLiteCache] = None, timeout: Optional[float] = None,
+                 max_bytes: Optional[int] = None, concurrency: Optional[int] = None,
+                 extract_workers: Optional[int] = None, extract_timeout: Optional[float] = None,
+                 deadline: Optional[float] = None):
+        self.timeout = timeout or PAGE_FETCH_TIMEOUT
+        self.extract_timeout = extract_timeout or PAGE_EXTRACT_TIMEOUT
+        self.deadline = deadline or PAGE_FETCH_DEADLINE
+        self.max_bytes = max_bytes or PAGE_MAX_BYTES
+        self.concurrency = concurrency or PAGE_FETCH_CONCURRENCY
+        self.extract_workers = extract_workers or PAGE_EXTRACT_WORKERS
+        self.cache = cache if cache is not None else SQLiteCache(
+            cache_path("page_cache.sqlite3"),
+            table="pages",
+            ttl_seconds=float(os.getenv("PAGE_CACHE_TTL", str(30 * 24 * 3600))),
+            max_entries=int(os.getenv("PAGE_CACHE_MAX_ENTRIES", "2000")),
+        )
+        self.counts = {"cached": 0, "fetched": 0, "not_modified": 0, "failed": 0, "timed_out": 0}
+        self._lock = threading.Lock()
+        # Created on first use, so importing this module stays cheap
+        self._client = None
+        self._fetch_pool: Optional[ThreadPoolExecutor] = None
+        self._extract_pool: Optional[ProcessPoolExecutor] = None
+
+    def _http(self):
+        with self._lock:
+            if self._client is None:
+                import httpx
+                self._client = httpx.Client(
+                    timeout=httpx.Timeout(self.timeout),
+                    limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+                    headers={"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml"},
+                    follow_redirects=True,
+                )
+                self._fetch_pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="page-fetch")
+            return self._client
+
+    def _extractor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._extract_pool is None:
+                # Spawned rather than forked: forking a process that runs threads can deadlock the child
+                self._extract_pool = ProcessPoolExecutor(max_workers=self.extract_workers,
+                                                         mp_context=multiprocessing.get_context("spawn"))
+                # Start every worker and import trafilatura now, while the first pages download
+                for _ in range(self.extract_workers):
+                    self._extract_pool.submit(_load_extractor)
+            return self._extract_pool
+
+    def _download(self, url: str, cached: Optional[Dict]) -> Optional[Dict]:
+        """The page's HTML and validators, or None when the cached copy is still current (304)."""
+        if urlparse(url).scheme not in ("http", "https"):
+            raise ValueError("not an http(s) URL")
+        headers = {}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        deadline = time.monotonic() + self.timeout
+        with self._http().stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and cached and "text" in cached:
+                return None
+            response.raise_for_status()
+            content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+            if content_type and content_type not in HTML_TYPES:
+                raise ValueError(f"not an HTML page ({content_type})")
+            body = bytearray()
+            for chunk in response.iter_bytes():
+                body += chunk
+                if len(body) >= self.max_bytes:
+                    del body[self.max_bytes:]
+                    break
+                # The client timeout only bounds each read; this bounds a slowly trickling page
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"download took longer than {self.timeout}s")
+            return {
+                "html": body.decode(response.encoding or "utf-8", errors="replace"),
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+            }
+
+    def _extract(self, html: str, url: str) -> str:
+        try:
+            return self._extractor().submit(extract_main_text, html, url).result(timeout=self.extract_timeout)
+        except BrokenProcessPool:
+            # A crashed worker breaks the whole pool; start a new one for the next page
+            with self._lock:
+                self._extract_pool = None
+            raise
+
+    def _finish(self, url: str, result: str, text: str, started: float, error: Optional[str] = None) -> Dict:
+        with self._lock:
+            self.counts[result] += 1
+        PAGE_FETCHES.inc(result=result)
+        if result != "cached":
+            PAGE_FETCH_SECONDS.observe(time.perf_counter() - started)
+        page = {"url": url, "status": result, "text": text}
+        if error:
+            page["error"] = error
+        return page
+
+    def fetch(self, url: str) -> Dict:
+        """
+        One page as {"url", "status", "text"}: status is cached, fetched, not_modified
+        or failed (with an "error" and empty text).
+        """
+        started = time.perf_counter()
+        cached = self.cache.get(url)
+        age = time.time() - cached["fetched_at"] if cached else None
+        if cached and cached.get("error") and age < PAGE_FAILURE_RETRY_SECONDS:
+            record_cache("page", True)
+            return self._finish(url, "failed", "", started, cached["error"])
+        if cached and not cached.get("error") and age < PAGE_CACHE_FRESH_SECONDS:
+            record_cache("page", True)
+            return self._finish(url, "cached", cached["text"], started)
+        record_cache("page", False)
+
+        try:
+            page = self._download(url, cached)
+            if page is None:
+                self.cache.set(url, dict(cached, fetched_at=time.time()))
+                return self._finish(url, "not_modified", cached["text"], started)
+            text = self._extract(page.pop("html"), url)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            self.cache.set(url, {"error": error, "fetched_at": time.time()})
+            return self._finish(url, "failed", "", started, error)
+        self.cache.set(url, dict(page, text=text, fetched_at=time.time()))
+        return self._finish(url, "fetched", text, started)
+
+    def fetch_all(self, urls: List[str]) -> List[Dict]:
+        """
+        Fetches the pages concurrently and returns them in input order (duplicates and
+        blanks dropped). Pages not done within the deadline come back timed_out with
+        empty text; ones already downloading still finish and are cached for next time.
+        """
+        urls = list(dict.fromkeys(url for url in urls if url))
+        if not urls:
+            return []
+        self._http()
+        self._extractor()
+        futures = [self._fetch_pool.submit(self.fetch, url) for url in urls]
+        done, _ = wait(futures, timeout=self.deadline)
+        pages = []
+        for url, future in zip(urls, futures):
+            if future in done:
+                pages.append(future.result())
+                continue
+            future.cancel()
+            with self._lock:
+                self.counts["timed_out"] += 1
+            PAGE_FETCHES.inc(result="timed_out")
+            pages.append({"url": url, "status": "timed_out", "text": "",
+                          "error": f"Not fetched within {self.deadline}s"})
+        return pages
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counts = dict(self.counts)
+        return {"cache": self.cache.stats(), "results": counts}
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._fetch_pool.shutdown(wait=False, cancel_futures=True)
+            if self._extract_pool is not None:
+                self._extract_pool.shutdown(wait=False, cancel_futures=True)
+            self._client = self._fetch_pool = self._extract_pool = None
+
+
+_shared_fetcher: Optional[PageFetcher] = None
+_shared_lock = threading.Lock()
+
+
+def get_page_fetcher() -> PageFetcher:
+    """Returns the process-wide page fetcher, creating it on first use."""
+    global _shared_fetcher
+    with _shared_lock:
+        if _shared_fetcher is None:
+            _shared_fetcher = PageFetcher()
+        return _shared_fetcher
+
+
+def shutdown_page_fetcher():
+    """Closes the shared HTTP client and stops the extraction processes, if they were started."""
+    with _shared_lock:
+        if _shared_fetcher is not None:
+            _shared_fetcher.close()
@@ -0,0 +1,305 @@
+# rate_limiter.py
+import os
+import time
+import random
+import threading
+from typing import Dict, Optional
+
+from metrics import record_wait
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. `rate_per_minute` tokens are added evenly over each
+    minute, up to `capacity`; acquire() blocks until enough tokens are available.
+    """
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity or max(rate_per_minute / 6.0, 1.0)  # allow ~10s worth of burst
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.total_wait_seconds = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate_per_second)
+        self._updated_at = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Takes `tokens` from the bucket, sleeping as long as needed. Returns the seconds waited."""
+        tokens = min(tokens, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self.total_wait_seconds += waited
+                    return waited
+                wait_for = (tokens - self._tokens) / self.rate_per_second
+            time.sleep(wait_for)
+            waited += wait_for
+
+    def consume(self, tokens: float):
+        """Takes tokens without waiting (the balance may go negative), e.g. to settle actual usage."""
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive retryable failures, fails fast for
+    `reset_seconds`, then lets a single trial call through (half-open).
+    """
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.reset_seconds:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._trial_in_flight:
+                    self.times_opened += 1
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = ("Timeout", "Connection", "RateLimit", "TooManyRequests", "ServerError", "InternalServerError")
+
+
+def _status_code(exc: Exception) -> Optional[int]:
+    """Finds the HTTP status of an SDK exception (Groq/httpx, googleapiclient, prawcore)."""
+    for value in (getattr(exc, "status_code", None),
+                  getattr(getattr(exc, "resp", None), "status", None),
+                  getattr(getattr(exc, "response", None), "status_code", None)):
+        try:
+            if value is not None:
+                return int(value)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def is_timeout(exc: Exception) -> bool:
+    return _status_code(exc) in (408, 504) or "Timeout" in type(exc).__name__
+
+
+def is_retryable(exc: Exception) -> bool:
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    return any(name in type(exc).__name__ for name in RETRYABLE_ERROR_NAMES)
+
+
+def _retry_after_seconds(exc: Exception) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if headers is None:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class ProviderLimiter:
+    """
+    Process-wide gatekeeper for one external provider: a request budget (and an
+    optional token budget), jittered exponential backoff on retryable errors, and
+    a circuit breaker so a failing provider is not hammered by every worker.
+    Calls can name their own `circuit` (e.g. the LLM model), so one failing model
+    doesn't pause calls to the others.
+    """
+    def __init__(self, name: str, requests_per_minute: float, tokens_per_minute: Optional[float] = None,
+                 max_retries: Optional[int] = None, base_delay: float = 1.0, max_delay: float = 30.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute, capacity=tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("RATE_LIMIT_MAX_RETRIES", "4"))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or self._new_breaker()
+        self._circuits: Dict[str, CircuitBreaker] = {}
+
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.backoff_seconds = 0.0
+        self.last_wait_seconds = 0.0
+
+    @staticmethod
+    def _new_breaker() -> CircuitBreaker:
+        return CircuitBreaker(
+            failure_threshold=int(os.getenv("CIRCUIT_BREAKER_FAILURES", "5")),
+            reset_seconds=float(os.getenv("CIRCUIT_BREAKER_RESET_SECONDS", "30")),
+        )
+
+    def _breaker(self, circuit: Optional[str]) -> CircuitBreaker:
+        if circuit is None:
+            return self.breaker
+        with self._stats_lock:
+            breaker = self._circuits.get(circuit)
+            if breaker is None:
+                breaker = self._circuits[circuit] = self._new_breaker()
+            return breaker
+
+    def acquire(self, tokens: float = 0) -> float:
+        """Waits for room in the request (and token) budget. Returns the seconds waited."""
+        waited = self.requests.acquire()
+        if self.tokens is not None and tokens:
+            waited += self.tokens.acquire(tokens)
+        with self._stats_lock:
+            self.wait_seconds += waited
+            self.last_wait_seconds = waited
+        return waited
+
+    def record_tokens(self, tokens: float):
+        """Settles the difference between estimated and actual token usage."""
+        if self.tokens is not None and tokens:
+            self.tokens.consume(tokens)
+
+    def _backoff_delay(self, attempt: int, exc: Exception) -> float:
+        retry_after = _retry_after_seconds(exc)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        # Full jitter: spreads retries from concurrent workers instead of re-synchronising them
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, func, *args, tokens: float = 0, max_retries: Optional[int] = None,
+             circuit: Optional[str] = None, retry_timeouts: bool = True, **kwargs):
+        """
+        Calls `func` within this provider's budget, retrying retryable errors with
+        jittered exponential backoff (up to `max_retries` times, if given, instead of
+        the limiter's own count; timeouts only if `retry_timeouts`). Raises
+        CircuitOpenError while the breaker (the provider's, or the named `circuit`'s) is open.
+        """
+        max_retries = self.max_retries if max_retries is None else max_retries
+        breaker = self._breaker(circuit)
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                with self._stats_lock:
+                    self.rejected += 1
+                name = f"{self.name} ({circuit})" if circuit else self.name
+                raise CircuitOpenError(f"{name} is failing repeatedly; calls are paused for a moment.")
+
+            record_wait(self.name, self.acquire(tokens))
+            with self._stats_lock:
+                self.calls += 1
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    # Not the provider's fault (bad request, auth...): don't retry or trip the breaker
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+                if attempt >= max_retries or breaker.state != "closed" or (not retry_timeouts and is_timeout(e)):
+                    with self._stats_lock:
+                        self.failures += 1
+                    raise
+                delay = self._backoff_delay(attempt, e)
+                print(f"{self.name}: retryable error ({e}); retrying in {delay:.1f}s")
+                with self._stats_lock:
+                    self.retries += 1
+                    self.backoff_seconds += delay
+                record_wait(self.name, delay, reason="backoff")
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            breaker.record_success()
+            return result
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "failures": self.failures,
+                "rejected_by_circuit_breaker": self.rejected,
+                "circuit": self.breaker.state,
+                "circuits": {name: breaker.state for name, breaker in self._circuits.items()},
+                "wait_seconds_total": round(self.wait_seconds, 3),
+                "last_wait_seconds": round(self.last_wait_seconds, 3),
+                "backoff_seconds_total": round(self.backoff_seconds, 3),
+            }
+
+
+# Budgets per provider, shared by every agent in the process
+PROVIDER_LIMITS = {
+    "groq": {
+        "requests_per_minute": float(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30")),
+        "tokens_per_minute": float(os.getenv("GROQ_TOKENS_PER_MINUTE", "20000")),
+    },
+    "cse": {"requests_per_minute": float(os.getenv("CSE_REQUESTS_PER_MINUTE", "100"))},
+    "reddit": {"requests_per_minute": float(os.getenv("REDDIT_REQUESTS_PER_MINUTE", "60"))},
+}
+
+_limiters: Dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> ProviderLimiter:
+    """Returns the process-wide limiter for `provider`, creating it on first use."""
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limiter = ProviderLimiter(provider, **PROVIDER_LIMITS.get(provider, {"requests_per_minute": 60.0}))
+            _limiters[provider] = limiter
+        return limiter
+
+
+def configure_rate_limit(provider: str, requests_per_minute: float, tokens_per_minute: Optional[float] = None):
+    """Replaces the budget for `provider`, e.g. from a CLI flag."""
+    limits = dict(PROVIDER_LIMITS.get(provider, {}))
+    limits["requests_per_minute"] = requests_per_minute
+    if tokens_per_minute is not None:
+        limits["tokens_per_minute"] = tokens_per_minute
+    with _limiters_lock:
+        _limiters[provider] = ProviderLimiter(provider, **limits)
+
+
+def rate_limit_stats() -> Dict[str, Dict]:
+    with _limiters_lock:
+        return {name: limiter.stats() for name, limiter in _limiters.items()}
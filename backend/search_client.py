@@ -0,0 +1,118 @@
+# search_client.py
+import os
+import time
+import threading
+from typing import Dict, List, Optional
+
+from cache_store import SQLiteCache, cache_path
+from metrics import record_cache
+from rate_limiter import get_rate_limiter
+
+
+def normalize_query(query: str) -> str:
+    """Normalizes a query so trivially different spellings share one cache entry."""
+    return " ".join(query.lower().split())
+
+
+class CustomSearchClient:
+    """
+    Long-lived Google Custom Search client shared by all agents.
+    The discovery service is built once per thread (httplib2 is not thread-safe),
+    results are cached on disk by normalized query, and daily API usage is tracked
+    against the CSE quota.
+    """
+    def __init__(self, api_key: str, engine_id: str, cache: Optional[SQLiteCache] = None,
+                 daily_quota: Optional[int] = None):
+        self.api_key = api_key
+        self.engine_id = engine_id
+        self.daily_quota = daily_quota or int(os.getenv("CSE_DAILY_QUOTA", "100"))
+        self.cache = cache if cache is not None else SQLiteCache(
+            cache_path("search_cache.sqlite3"),
+            table="search_results",
+            ttl_seconds=float(os.getenv("SEARCH_CACHE_TTL", str(24 * 3600))),
+            max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000")),
+        )
+        # Queries with no results may only be missing for now, so they are retried sooner
+        self.empty_cache = SQLiteCache(
+            self.cache.path,
+            table="search_empty_results",
+            ttl_seconds=float(os.getenv("SEARCH_EMPTY_CACHE_TTL", "1800")),
+            max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000")),
+        )
+        # Quota usage lives next to the cached results so it survives restarts
+        self.usage = SQLiteCache(self.cache.path, table="search_quota_usage", ttl_seconds=2 * 24 * 3600)
+        self._thread_local = threading.local()
+
+    def _service(self):
+        service = getattr(self._thread_local, "service", None)
+        if service is None:
+            # googleapiclient is slow to import, so it is only loaded by the first search
+            from googleapiclient.discovery import build
+            service = build("customsearch", "v1", developerKey=self.api_key, cache_discovery=False)
+            self._thread_local.service = service
+        return service
+
+    @staticmethod
+    def _today() -> str:
+        return time.strftime("%Y-%m-%d", time.gmtime())
+
+    def quota_used_today(self) -> int:
+        return self.usage.get(self._today()) or 0
+
+    def _reserve_api_call(self):
+        """Counts one API request against today's quota, or raises if it is used up (one atomic step)."""
+        if self.usage.increment(self._today(), limit=self.daily_quota) is None:
+            raise RuntimeError(f"Custom Search daily quota of {self.daily_quota} queries is used up.")
+
+    def search(self, query: str, num_results: int = 5) -> List[Dict]:
+        """Returns the CSE result items for a query, from the cache when possible."""
+        cache_key = f"{normalize_query(query)}|{num_results}"
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            cached = self.empty_cache.get(cache_key)
+        record_cache("search", cached is not None)
+        if cached is not None:
+            return cached
+
+        request = self._service().cse().list(q=query, cx=self.engine_id, num=num_results)
+
+        def execute():
+            # Counted per attempt: retries are billed against the quota too
+            self._reserve_api_call()
+            return request.execute()
+
+        result = get_rate_limiter("cse").call(execute)
+        items = [
+            {'title': item.get('title'), 'snippet': item.get('snippet'), 'link': item.get('link')}
+            for item in result.get('items') or []
+        ]
+        (self.cache if items else self.empty_cache).set(cache_key, items)
+        return items
+
+    def stats(self) -> Dict:
+        # A lookup only reaches the empty-result cache after missing the main one, so a
+        # hit there is a hit overall and only a miss there is a real miss
+        results, empty = self.cache.stats(), self.empty_cache.stats()
+        hits = results["hits"] + empty["hits"]
+        total = hits + empty["misses"]
+        cache = dict(results, hits=hits, misses=empty["misses"], hit_ratio=round(hits / total, 3) if total else 0.0,
+                     empty_entries=empty["entries"], empty_hits=empty["hits"])
+        return {
+            "cache": cache,
+            "quota_used_today": self.quota_used_today(),
+            "daily_quota": self.daily_quota,
+        }
+
+
+_shared_clients: Dict[tuple, CustomSearchClient] = {}
+_shared_lock = threading.Lock()
+
+
+def get_search_client(api_key: str, engine_id: str) -> CustomSearchClient:
+    """Returns the process-wide client for these credentials, creating it on first use."""
+    with _shared_lock:
+        client = _shared_clients.get((api_key, engine_id))
+        if client is None:
+            client = CustomSearchClient(api_key, engine_id)
+            _shared_clients[(api_key, engine_id)] = client
+        return client
@@ -1,47 +1,43 @@
 import os
-import re
-import json
-import textstat
-from groq import Groq
-from dotenv import load_dotenv
-from typing import Dict, List
+from llm_client import LLMClient
+from seo_analyzer import SEOAnalyzer, seo_issues
+from token_budget import render_prompt
+from agent_registry import load_env
+from typing import Dict, Iterator, List, Optional
+
+REWRITE_ERROR_PREFIX = "Error during rewrite"
 
 class SEOAgent:
-    def __init__(self):
-        load_dotenv()
+    def __init__(self, use_llm_cache: bool = True):
+        load_env()
         groq_api_key = os.getenv('GROQ_API_KEY')
         if not groq_api_key:
             raise ValueError("GROQ_API_KEY not found in .env file.")
-        self.client = Groq(api_key=groq_api_key)
-
-    def inspector(self, article_text: str, keywords: List[str]) -> Dict:
-        words = article_text.split()
-        word_count = len(words)
+        self.client = LLMClient(api_key=groq_api_key, use_cache=use_llm_cache)
+        self.analyzer = SEOAnalyzer()
 
-        readability_score = textstat.flesch_reading_ease(article_text)
-
-        keyword_density = {}
-        for keyword in keywords:
-            count = len(re.findall(r'\b' + re.escape(keyword) + r'\b', article_text, re.IGNORECASE))
-            density = (count / word_count) * 100 if word_count > 0 else 0
-            keyword_density[keyword] = f"{density:.2f}%"
+    def inspector(self, article_text: str, keywords: List[str], thresholds: Optional[Dict] = None) -> Dict:
+        analysis = self.analyzer.analyze(article_text, keywords)
+        issues = seo_issues(analysis, thresholds)
 
         report = {
-            "word_count": word_count,
-            "readability_score": f"{readability_score} (Higher is easier to read)",
-            "keyword_density": keyword_density
+            "word_count": analysis["word_count"],
+            "readability_score": f"{analysis['readability_score']} (Higher is easier to read)",
+            "keyword_density": analysis["keyword_density"],
+            "heading_coverage": analysis["heading_coverage"],
+            "sections": analysis["sections"],
+            "issues": issues,
+            "passes": not issues
         }
         return report
 
-    def rewrite_article(self, first_draft: str, seo_report: Dict) -> str:
-        report_string = json.dumps(seo_report, indent=2)
-
-        prompt = f"""
+    def _build_rewrite_prompt(self, first_draft: str, seo_report: Dict) -> str:
+        template_string = """
         You are an expert SEO Copyeditor with a surgeon's precision. Your task is to refine and polish a draft article based on a technical SEO report. The goal is optimization without sacrificing quality.
 
         **Technical SEO Report:**
         ---
-        {report_string}
+        {seo_report}
         ---
 
         **Draft Article for Refinement:**
@@ -52,17 +48,30 @@ class SEOAgent:
         **Your Surgical Mission:**
         1.  **Subtle Keyword Integration:** Analyze the keyword densities in the report. If any are too low, subtly weave them into the text. Your work should be invisible; do NOT "stuff" keywords. The integration must feel natural and add value to the sentence.
         2.  **Enhance Readability:** Improve the sentence structure and flow. Break up long, complex sentences. Vary sentence length. Replace passive voice with active voice where appropriate.
-        3.  **Preserve the Core:** Do not alter the core message, tone, or structure of the original draft. You are polishing, not rewriting from scratch.
-        4.  **Final Output:** Your final output MUST be ONLY the complete, rewritten, and SEO-optimized article. Your response must start directly with the article's title. Absolutely no commentary, notes, or analysis about your changes are allowed.
+        3.  **Fix the Listed Issues:** Every entry under "issues" in the report is a target the draft missed. Address each one.
+        4.  **Preserve the Core:** Do not alter the core message, tone, or structure of the original draft. You are polishing, not rewriting from scratch.
+        5.  **Final Output:** Your final output MUST be ONLY the complete, rewritten, and SEO-optimized article. Your response must start directly with the article's title. Absolutely no commentary, notes, or analysis about your changes are allowed.
 
         Execute the mission now.
         """
+        # The draft is never trimmed; the report goes in as minified JSON
+        return render_prompt("seo", template_string, first_draft=first_draft, seo_report=seo_report)
+
+    def rewrite_article(self, first_draft: str, seo_report: Dict) -> str:
+        prompt = self._build_rewrite_prompt(first_draft, seo_report)
 
         try:
-            response = self.client.chat.completions.create(
+            return self.client.complete(
                 messages=[{"role": "user", "content": prompt}],
-                model="llama-3.1-8b-instant"
+                stage="seo"
             )
-            return response.choices[0].message.content
         except Exception as e:
-            return f"Error during rewrite: {e}"
\ No newline at end of file
+            return f"{REWRITE_ERROR_PREFIX}: {e}"
+
+    def stream_rewrite(self, first_draft: str, seo_report: Dict) -> Iterator[str]:
+        """Same as rewrite_article, but yields the final article token by token."""
+        prompt = self._build_rewrite_prompt(first_draft, seo_report)
+        yield from self.client.stream(
+            messages=[{"role": "user", "content": prompt}],
+            stage="seo"
+        )
\ No newline at end of file
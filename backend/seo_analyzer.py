@@ -0,0 +1,287 @@
+# seo_analyzer.py
+import os
+import re
+from bisect import bisect_right
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+WORD_RE = re.compile(r"\w+")
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+SENTENCE_END_RE = re.compile(r"[.!?]+(?=\s|$)")
+# What str.splitlines() splits on
+LINE_BREAKS = "\r\n\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+
+# Targets a draft must meet to skip the SEO rewrite (densities in percent)
+SEO_THRESHOLDS = {
+    "min_readability": float(os.getenv("SEO_MIN_READABILITY", "50")),
+    "min_word_count": int(os.getenv("SEO_MIN_WORD_COUNT", "600")),
+    "min_keyword_density": float(os.getenv("SEO_MIN_KEYWORD_DENSITY", "0.5")),
+    "max_keyword_density": float(os.getenv("SEO_MAX_KEYWORD_DENSITY", "3.0")),
+}
+# Keyword counts at or below which per-keyword regexes are faster than the token automaton
+REGEX_MAX_KEYWORDS = 6
+
+# Upper bound on inspect -> rewrite rounds when a draft misses the targets
+SEO_MAX_REWRITES = int(os.getenv("SEO_MAX_REWRITES", "1"))
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "has", "have", "how", "in",
+    "into", "is", "it", "its", "of", "on", "or", "over", "that", "the", "their", "this", "to", "was",
+    "what", "when", "where", "which", "who", "why", "will", "with", "after", "before", "about",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return WORD_RE.findall(text.lower())
+
+
+@lru_cache(maxsize=50000)
+def syllables(word: str) -> int:
+    # textstat is slow to import, so it is only loaded by the first analysis
+    import textstat
+    return max(textstat.syllable_count(word), 1)
+
+
+def flesch_reading_ease(words: int, sentences: int, syllable_total: int) -> float:
+    if words == 0:
+        return 0.0
+    sentences = max(sentences, 1)
+    return round(206.835 - 1.015 * (words / sentences) - 84.6 * (syllable_total / words), 2)
+
+
+def extract_keywords(title: str, min_length: int = 5) -> List[str]:
+    """
+    Keywords to check for a title: every word of `min_length`+ characters (what the
+    pipeline always used) plus two-word phrases of adjacent non-stopwords.
+    """
+    words = [w.strip(".,:;!?\"'()[]") for w in title.split()]
+    keywords = [w for w in words if len(w) >= min_length]
+    for first, second in zip(words, words[1:]):
+        if first and second and first.lower() not in STOPWORDS and second.lower() not in STOPWORDS \
+                and max(len(first), len(second)) >= min_length:
+            keywords.append(f"{first} {second}")
+    return list(dict.fromkeys(keywords))
+
+
+class KeywordMatcher:
+    """
+    Counts keywords and multi-word phrases line by line. Matches are case-insensitive,
+    on whole words, non-overlapping per keyword and with a phrase's words separated
+    exactly as in the keyword, like the old per-keyword regex.
+    Up to REGEX_MAX_KEYWORDS keywords that regex is used as is (a few C-level scans
+    beat a Python loop over the tokens); above it an Aho-Corasick automaton over word
+    tokens counts every keyword in a single pass, however many there are.
+    """
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = []
+        self._lengths: List[int] = []
+        # What separates the words of each phrase; a match must be joined by the same text
+        self._separators: List[List[str]] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        for keyword in dict.fromkeys(keywords):
+            tokens = tokenize(keyword)
+            if not tokens:
+                continue
+            index = len(self.keywords)
+            self.keywords.append(keyword)
+            self._lengths.append(len(tokens))
+            spans = list(WORD_RE.finditer(keyword.lower()))
+            self._separators.append([keyword[a.end():b.start()].lower() for a, b in zip(spans, spans[1:])])
+            state = 0
+            for token in tokens:
+                next_state = self._goto[state].get(token)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][token] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(index)
+
+        self._patterns: Optional[List[re.Pattern]] = None
+        if len(self.keywords) <= REGEX_MAX_KEYWORDS:
+            self._patterns = [re.compile(r"\b" + re.escape(keyword) + r"\b", re.IGNORECASE)
+                              for keyword in self.keywords]
+            return
+
+        # Breadth-first construction of failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(token, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def step(self, state: int, token: str) -> Tuple[int, List[int]]:
+        """Advances the automaton by one token; returns the new state and the keywords ending here."""
+        while state and token not in self._goto[state]:
+            state = self._fail[state]
+        state = self._goto[state].get(token, 0)
+        return state, self._output[state]
+
+    def _joined(self, line: str, spans: List[Tuple[int, int]], index: int) -> bool:
+        """Whether the phrase ending at the last token is written with the keyword's separators, as the regex requires."""
+        separators = self._separators[index]
+        first = len(spans) - len(separators) - 1
+        return all(line[spans[first + i][1]:spans[first + i + 1][0]].lower() == separator
+                   for i, separator in enumerate(separators))
+
+    def matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yields (keyword index, start offset) for every keyword occurrence in `text`."""
+        if self._patterns is not None:
+            for index, pattern in enumerate(self._patterns):
+                for match in pattern.finditer(text):
+                    yield index, match.start()
+            return
+
+        offset = 0
+        for line in text.splitlines(keepends=True):
+            # Phrases don't span lines, so the automaton restarts on each one. Like the
+            # regex, a match overlapping the keyword's previous match isn't counted.
+            state = 0
+            last_end: Dict[int, int] = {}
+            spans: List[Tuple[int, int]] = []
+            for position, match in enumerate(WORD_RE.finditer(line)):
+                spans.append(match.span())
+                state, matched = self.step(state, match.group().lower())
+                for index in matched:
+                    if position - self._lengths[index] >= last_end.get(index, -1) \
+                            and self._joined(line, spans, index):
+                        last_end[index] = position
+                        yield index, offset + match.start()
+            offset += len(line)
+
+
+class Section:
+    def __init__(self, heading: str, level: int):
+        self.heading = heading
+        self.level = level
+        self.words = 0
+        self.tokens = 0
+        self.sentences = 0
+        self.syllables = 0
+        self.keyword_counts: Optional[List[int]] = None
+
+    def to_report(self, keywords: List[str]) -> Dict:
+        return {
+            "heading": self.heading,
+            "level": self.level,
+            "word_count": self.words,
+            "readability_score": flesch_reading_ease(self.tokens, self.sentences, self.syllables),
+            "keyword_density": {
+                keyword: f"{(count / self.words) * 100 if self.words else 0:.2f}%"
+                for keyword, count in zip(keywords, self.keyword_counts) if count
+            },
+        }
+
+
+class SEOAnalyzer:
+    """
+    Single-pass SEO analysis of a Markdown article: whole-article and per-section
+    word counts, keyword/phrase densities, heading coverage and Flesch readability.
+    """
+    def analyze(self, article_text: str, keywords: List[str]) -> Dict:
+        matcher = KeywordMatcher(keywords)
+        keywords = matcher.keywords
+        totals = [0] * len(keywords)
+        heading_hits = [0] * len(keywords)
+
+        sections = [Section("(introduction)", 0)]
+        sections[0].keyword_counts = [0] * len(keywords)
+        headings = 0
+        total_words = total_tokens = total_sentences = total_syllables = 0
+
+        line_starts: List[int] = []
+        line_owners: List[Tuple[Section, bool]] = []
+        offset = 0
+        for raw_line in article_text.splitlines(keepends=True):
+            line = raw_line.rstrip(LINE_BREAKS)
+            line_starts.append(offset)
+            offset += len(raw_line)
+            heading = HEADING_RE.match(line)
+            if heading:
+                headings += 1
+                section = Section(heading.group(2), len(heading.group(1)))
+                section.keyword_counts = [0] * len(keywords)
+                sections.append(section)
+            section = sections[-1]
+            line_owners.append((section, bool(heading)))
+
+            tokens = tokenize(line)
+            section.syllables += sum(syllables(token) for token in tokens)
+            words = len(line.split())
+            section.words += words
+            section.tokens += len(tokens)
+            if not heading and tokens:
+                # An unterminated line (list item, last line of a paragraph) still ends a sentence
+                section.sentences += len(SENTENCE_END_RE.findall(line)) or 1
+            elif heading:
+                section.sentences += 1
+
+        # Each keyword occurrence is credited to the section (and heading) of its line
+        headings_with_keyword = set()
+        for index, start in matcher.matches(article_text):
+            line_number = bisect_right(line_starts, start) - 1
+            section, is_heading = line_owners[line_number]
+            totals[index] += 1
+            section.keyword_counts[index] += 1
+            if is_heading and (index, line_number) not in headings_with_keyword:
+                headings_with_keyword.add((index, line_number))
+                heading_hits[index] += 1
+
+        for section in sections:
+            total_words += section.words
+            total_tokens += section.tokens
+            total_sentences += section.sentences
+            total_syllables += section.syllables
+
+        if sections[0].words == 0 and len(sections) > 1:
+            sections = sections[1:]
+
+        return {
+            "word_count": total_words,
+            "readability_score": flesch_reading_ease(total_tokens, total_sentences, total_syllables),
+            "keyword_density": {
+                keyword: f"{(count / total_words) * 100 if total_words else 0:.2f}%"
+                for keyword, count in zip(keywords, totals)
+            },
+            "keyword_counts": dict(zip(keywords, totals)),
+            "heading_coverage": {
+                "headings": headings,
+                "keywords_in_headings": {keyword: hits for keyword, hits in zip(keywords, heading_hits)},
+            },
+            "sections": [section.to_report(keywords) for section in sections],
+        }
+
+
+def seo_issues(analysis: Dict, thresholds: Optional[Dict] = None) -> List[str]:
+    """
+    Checks an analysis against the SEO targets. The primary keyword (the densest
+    one) must reach the minimum density and no keyword may exceed the maximum;
+    an empty list means the article passes.
+    """
+    thresholds = {**SEO_THRESHOLDS, **(thresholds or {})}
+    issues = []
+    if analysis["readability_score"] < thresholds["min_readability"]:
+        issues.append(f"Readability {analysis['readability_score']} is below {thresholds['min_readability']}.")
+    if analysis["word_count"] < thresholds["min_word_count"]:
+        issues.append(f"Word count {analysis['word_count']} is below {thresholds['min_word_count']}.")
+
+    word_count = analysis["word_count"]
+    densities = {keyword: (count / word_count) * 100 if word_count else 0.0
+                 for keyword, count in analysis["keyword_counts"].items()}
+    if densities and max(densities.values()) < thresholds["min_keyword_density"]:
+        issues.append(f"No keyword reaches {thresholds['min_keyword_density']}% density.")
+    for keyword, density in densities.items():
+        if density > thresholds["max_keyword_density"]:
+            issues.append(f"'{keyword}' is overused at {density:.2f}% (max {thresholds['max_keyword_density']}%).")
+    return issues
@@ -0,0 +1,216 @@
+# speculative_precompute.py
+import os
+import time
+import asyncio
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from agent_executor import run_agent_call
+from agent_registry import AgentRegistry
+from metrics import SPECULATIVE_LOOKUPS, SPECULATIVE_TOKENS, start_trace, track_stage
+
+SPECULATIVE_ENABLED = os.getenv("SPECULATIVE_PRECOMPUTE", "0") == "1"
+# How many of the topics served by /api/topics (best-ranked first) are precomputed
+SPECULATIVE_TOP_N = int(os.getenv("SPECULATIVE_TOP_N", "3"))
+# LLM tokens that precomputes may spend in any rolling hour
+SPECULATIVE_TOKENS_PER_HOUR = int(os.getenv("SPECULATIVE_TOKENS_PER_HOUR", "30000"))
+# Unclaimed results are dropped (and counted as wasted) after this
+SPECULATIVE_TTL = float(os.getenv("SPECULATIVE_TTL", "1800"))
+# Share of the daily Custom Search quota kept for real generations: precomputes stop once the rest is used
+SPECULATIVE_CSE_RESERVE = float(os.getenv("SPECULATIVE_CSE_RESERVE", "0.5"))
+MAX_RESULTS = 50
+# Assumed cost of one precompute until one has been measured
+DEFAULT_PRECOMPUTE_TOKENS = 3000
+
+
+def topic_key(topic: Dict) -> Tuple[str, str]:
+    return str(topic.get('id') or ""), topic.get('title') or ""
+
+
+class SpeculativePrecompute:
+    """
+    Opt-in speculative work for the topics a user is likely to pick: after a topic
+    list is served, the gap analysis and factual briefing of the top-ranked topics
+    are run in the background, one topic at a time and only while no generation
+    job is waiting and a worker is free. They stay within a rolling hourly token
+    budget and stop once the daily Custom Search quota is down to the share kept
+    for real generations. A generation for one of those topics takes the result
+    (or waits for it if it is still running) instead of calling the agents again.
+    Tokens spent on results nobody claims before they expire count as wasted.
+    """
+    def __init__(self, agents: AgentRegistry, enabled: Optional[bool] = None, top_n: Optional[int] = None,
+                 tokens_per_hour: Optional[int] = None, ttl_seconds: Optional[float] = None,
+                 cse_reserve: Optional[float] = None, is_busy: Optional[Callable[[], bool]] = None):
+        self.agents = agents
+        self.enabled = SPECULATIVE_ENABLED if enabled is None else enabled
+        self.top_n = top_n or SPECULATIVE_TOP_N
+        self.tokens_per_hour = tokens_per_hour or SPECULATIVE_TOKENS_PER_HOUR
+        self.ttl_seconds = ttl_seconds or SPECULATIVE_TTL
+        self.cse_reserve = SPECULATIVE_CSE_RESERVE if cse_reserve is None else cse_reserve
+        self.is_busy = is_busy or (lambda: False)
+
+        self._pending: "OrderedDict[Tuple[str, str], Dict]" = OrderedDict()
+        self._results: "OrderedDict[Tuple[str, str], Dict]" = OrderedDict()
+        self._spend: Deque[Tuple[float, int]] = deque()
+        self._wake: Optional[asyncio.Event] = None
+        self._worker_task: Optional[asyncio.Task] = None
+        self.counts = {"scheduled": 0, "precomputed": 0, "failed": 0, "skipped_budget": 0, "skipped_quota": 0,
+                       "expired": 0,
+                       "hits": 0, "misses": 0}
+        self.tokens = {"spent": 0, "used": 0, "wasted": 0}
+
+    def schedule(self, topics: List[Dict]):
+        """Queues the top-ranked topics that have no result yet; called after a topic list is served."""
+        if not self.enabled or self._wake is None:
+            return
+        self._expire()
+        for topic in topics[:self.top_n]:
+            key = topic_key(topic)
+            if key in self._results or key in self._pending:
+                continue
+            self._pending[key] = topic
+            self.counts["scheduled"] += 1
+        if self._pending:
+            self._wake.set()
+
+    async def take(self, topic: Dict) -> Optional[Dict]:
+        """
+        The precomputed {"gap_report", "factual_briefing"} for `topic`, waiting for
+        it if it is still running, or None. A result is handed out once.
+        """
+        if not self.enabled:
+            return None
+        self._expire()
+        key = topic_key(topic)
+        # Not started yet: the generation is about to do the same work itself
+        self._pending.pop(key, None)
+        entry = self._results.pop(key, None)
+        result = None
+        if entry is not None:
+            try:
+                result = await asyncio.shield(entry["task"])
+            except Exception:
+                result = None
+        if result is None:
+            self.counts["misses"] += 1
+            SPECULATIVE_LOOKUPS.inc(result="miss")
+            return None
+        self.counts["hits"] += 1
+        self.tokens["used"] += entry["tokens"]
+        SPECULATIVE_LOOKUPS.inc(result="hit")
+        SPECULATIVE_TOKENS.inc(entry["tokens"], kind="used")
+        return result
+
+    def _waste(self, entry: Dict):
+        self.tokens["wasted"] += entry["tokens"]
+        SPECULATIVE_TOKENS.inc(entry["tokens"], kind="wasted")
+
+    def _expire(self):
+        now = time.monotonic()
+        for key, entry in list(self._results.items()):
+            done = entry["task"].done()
+            if (done and now - entry["created_at"] > self.ttl_seconds) or (done and len(self._results) > MAX_RESULTS):
+                del self._results[key]
+                self.counts["expired"] += 1
+                self._waste(entry)
+
+    def _spent_last_hour(self) -> int:
+        cutoff = time.monotonic() - 3600
+        while self._spend and self._spend[0][0] < cutoff:
+            self._spend.popleft()
+        return sum(tokens for _, tokens in self._spend)
+
+    def _estimated_tokens(self) -> int:
+        finished = self.counts["precomputed"] + self.counts["failed"]
+        return round(self.tokens["spent"] / finished) if finished else DEFAULT_PRECOMPUTE_TOKENS
+
+    def _search_quota_left(self, gap_agent) -> bool:
+        """Whether precomputes may still search: each one spends CSE queries that real generations need."""
+        search_client = gap_agent.search_client
+        return search_client.quota_used_today() < search_client.daily_quota * (1 - self.cse_reserve)
+
+    async def _precompute(self, topic: Dict, entry: Dict, gap_agent) -> Dict:
+        with start_trace(kind="speculative") as trace:
+            try:
+                async def analyze_gaps():
+                    with track_stage("content_gap"):
+                        report = await run_agent_call(gap_agent.analyze_topic, topic)
+                        if "error" in report:
+                            raise Exception(report["error"])
+                        return report
+
+                async def briefing():
+                    with track_stage("briefing"):
+                        return await run_agent_call(gap_agent.get_factual_briefing, topic.get('title', ''))
+
+                gap_report, factual_briefing = await asyncio.gather(analyze_gaps(), briefing())
+            finally:
+                totals = trace.to_dict()["totals"]
+                entry["tokens"] = totals["prompt_tokens"] + totals["completion_tokens"]
+                self._spend.append((time.monotonic(), entry["tokens"]))
+                self.tokens["spent"] += entry["tokens"]
+                SPECULATIVE_TOKENS.inc(entry["tokens"], kind="spent")
+        return {"gap_report": gap_report, "factual_briefing": factual_briefing}
+
+    async def _run_next(self):
+        key, topic = self._pending.popitem(last=False)
+        if self._spent_last_hour() + self._estimated_tokens() > self.tokens_per_hour:
+            self.counts["skipped_budget"] += 1
+            return
+        gap_agent = await run_agent_call(lambda: self.agents.gap_agent)
+        if not await run_agent_call(self._search_quota_left, gap_agent):
+            self.counts["skipped_quota"] += 1
+            return
+        entry = {"created_at": time.monotonic(), "tokens": 0}
+        entry["task"] = asyncio.create_task(self._precompute(topic, entry, gap_agent))
+        self._results[key] = entry
+        try:
+            await entry["task"]
+            self.counts["precomputed"] += 1
+            print(f"Precomputed gap analysis for: {topic.get('title')} ({entry['tokens']} tokens)")
+        except Exception as e:
+            self.counts["failed"] += 1
+            self._results.pop(key, None)
+            self._waste(entry)
+            print(f"Precompute failed for {topic.get('title')}: {e}")
+
+    async def _worker(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            while self._pending:
+                # Real generations come first: wait while any are queued or every worker is taken
+                if self.is_busy():
+                    await asyncio.sleep(1.0)
+                    continue
+                await self._run_next()
+
+    def start(self):
+        """Starts the background worker (call from the app's startup); does nothing unless enabled."""
+        if self.enabled and self._worker_task is None:
+            self._wake = asyncio.Event()
+            self._worker_task = asyncio.create_task(self._worker())
+
+    async def stop(self):
+        if self._worker_task is not None:
+            self._worker_task.cancel()
+            self._worker_task = None
+        for entry in self._results.values():
+            entry["task"].cancel()
+
+    def stats(self) -> Dict:
+        lookups = self.counts["hits"] + self.counts["misses"]
+        spent = self.tokens["spent"]
+        return {
+            "enabled": self.enabled,
+            "top_n": self.top_n,
+            "tokens_per_hour": self.tokens_per_hour,
+            "tokens_spent_last_hour": self._spent_last_hour(),
+            "cse_reserve": self.cse_reserve,
+            "pending": len(self._pending),
+            "ready": sum(1 for entry in self._results.values() if entry["task"].done()),
+            **self.counts,
+            "hit_rate": round(self.counts["hits"] / lookups, 3) if lookups else 0.0,
+            "tokens": dict(self.tokens),
+            "wasted_ratio": round(self.tokens["wasted"] / spent, 3) if spent else 0.0,
+        }
@@ -1,6 +1,15 @@
 # state_schema.py
 from typing import Dict, List, TypedDict, Optional
 
+class ContentGap(TypedDict):
+    topic: str
+    description: str
+
+class GapReport(TypedDict):
+    """Content Gap Agent output, validated by structured_output.validate_gap_report"""
+    summary: str
+    gaps: List[ContentGap]
+
 class BlogGenerationState(TypedDict):
     """State schema for the blog generation"""
 
@@ -9,7 +18,8 @@ class BlogGenerationState(TypedDict):
     selected_topic: Optional[Dict]
 
     # Content Gap Agent outputs
-    gap_analysis: Optional[Dict]
+    gap_analysis: Optional[GapReport]
+    factual_briefing: Optional[str]
     related_article_url: Optional[str]
 
     # Outline Agent outputs
@@ -21,6 +31,17 @@ class BlogGenerationState(TypedDict):
     # SEO Agent outputs
     seo_report: Optional[Dict]
     final_article: Optional[str] # This will now be the SEO-optimized article
+    seo_passed: Optional[bool]
+    seo_rewrites: int
+
+    # Per-run instrumentation (stage timings, tokens, waits)
+    trace: Optional[Dict]
+
+    # Checkpoint key of the run: resume it with `main_langgraph.py --resume <run_id>`
+    run_id: Optional[str]
+
+    # Id of the finished article in the article store
+    article_id: Optional[str]
 
     # Control flow variables
     user_choice: Optional[int]
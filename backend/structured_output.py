@@ -0,0 +1,108 @@
+# structured_output.py
+import re
+import json
+from typing import Dict, List
+
+from state_schema import ContentGap, GapReport
+
+_FENCE = re.compile(r"```[a-zA-Z]*[ \t]*\n?(.*?)(?:```|$)", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+# How many trailing items a truncated object may lose before the repair gives up
+MAX_REPAIR_CUTS = 20
+
+
+def _scan(text: str):
+    """Open brackets and whether `text` ends inside a string; stops where the outermost value closes."""
+    stack: List[str] = []
+    in_string = escaped = False
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+            if not stack:
+                return text[:i + 1], stack, False
+    return text, stack, in_string
+
+
+def _close(text: str) -> str:
+    """Closes the strings and brackets a truncated reply left open."""
+    text, stack, in_string = _scan(text)
+    if in_string:
+        text += '"'
+    text = text.rstrip().rstrip(",")
+    if text.endswith(":"):
+        text += " null"
+    return _TRAILING_COMMA.sub(r"\1", text + "".join(reversed(stack)))
+
+
+def _repair(fragment: str) -> Dict:
+    """Parses an object that has trailing commas or was cut off, dropping its incomplete last items."""
+    for _ in range(MAX_REPAIR_CUTS):
+        try:
+            return json.loads(_close(fragment))
+        except json.JSONDecodeError:
+            cut = fragment.rfind(",")
+            if cut <= 0:
+                break
+            fragment = fragment[:cut]
+    raise ValueError("no parseable JSON object")
+
+
+def parse_json_object(text: str) -> Dict:
+    """
+    The JSON object in an LLM reply. Accepts a bare object, one inside a markdown
+    fence (closed or not, with any line endings), one surrounded by commentary,
+    and objects with trailing commas or cut off mid-way. Raises ValueError when
+    there is no object to recover.
+    """
+    text = (text or "").replace("\r\n", "\n").lstrip("\ufeff").strip()
+    if not text:
+        raise ValueError("the reply is empty")
+    candidates = [body.strip() for body in _FENCE.findall(text)] + [text]
+    decoder = json.JSONDecoder()
+    for candidate in candidates:
+        # Commentary may contain braces too, so each "{" in turn is tried until one holds an object
+        for start in (i for i, char in enumerate(candidate) if char == "{"):
+            try:
+                value, _ = decoder.raw_decode(candidate, start)
+            except json.JSONDecodeError:
+                try:
+                    value = _repair(candidate[start:])
+                except ValueError:
+                    continue
+            if isinstance(value, dict) and value:
+                return value
+    raise ValueError("the reply contains no JSON object")
+
+
+def validate_gap_report(data: Dict) -> GapReport:
+    """
+    Checks a parsed gap analysis against the GapReport schema: gaps without a
+    topic are dropped, a missing summary or description becomes "", unknown keys
+    are ignored. Raises ValueError when no gap is left.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("the gap report is not a JSON object")
+    items = data.get("gaps")
+    if isinstance(items, dict):
+        items = [items]
+    gaps: List[ContentGap] = []
+    for item in items if isinstance(items, list) else []:
+        if isinstance(item, str):
+            item = {"topic": item}
+        if not isinstance(item, dict) or not str(item.get("topic") or "").strip():
+            continue
+        gaps.append({"topic": str(item["topic"]).strip(), "description": str(item.get("description") or "").strip()})
+    if not gaps:
+        raise ValueError("the gap report lists no gaps")
+    return {"summary": str(data.get("summary") or "").strip(), "gaps": gaps}
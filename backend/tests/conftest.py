@@ -0,0 +1,76 @@
+# tests/conftest.py
+import os
+import sys
+import time
+import zlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# The backend modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """
+    Local stand-in for competitor pages: an article with navigation and a footer
+    (with an ETag) on any path, plus a few paths for the edge cases.
+    """
+    hits = {}
+
+    def do_GET(self):
+        PageHandler.hits[self.path] = PageHandler.hits.get(self.path, 0) + 1
+        if self.path == "/blocked":
+            self.send_error(503)
+            return
+        if self.path == "/report.pdf":
+            self._send_headers("application/pdf")
+            self.wfile.write(b"%PDF-1.4")
+        elif self.path == "/large":
+            self._send_headers("text/html; charset=utf-8")
+            self.wfile.write(b"<p>" + b"x" * 100_000 + b"</p>")
+        elif self.path == "/slow":
+            self._send_headers("text/html; charset=utf-8")
+            for _ in range(10):
+                self.wfile.write(b"<p>" + b"x" * 1000 + b"</p>")
+                time.sleep(0.2)
+        else:
+            self._send_article()
+
+    def _send_headers(self, content_type: str, etag: str = None):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+
+    def _send_article(self):
+        etag = f'"{zlib.crc32(self.path.encode())}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        paragraph = "Local writers compare notes on the story and what it means for readers in the region. " * 5
+        self._send_headers("text/html; charset=utf-8", etag)
+        self.wfile.write((
+            f"<html><head><title>Page {self.path}</title></head><body>"
+            "<nav><a href='/'>Home</a> <a href='/about'>About</a></nav>"
+            f"<article><h1>Page {self.path}</h1>" + f"<p>{paragraph}</p>" * 6 + "</article>"
+            "<footer>Copyright Test Media</footer></body></html>"
+        ).encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="session")
+def page_server():
+    """Base URL of the local page server; PageHandler.hits counts the requests per path."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
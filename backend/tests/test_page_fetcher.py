@@ -0,0 +1,82 @@
+# tests/test_page_fetcher.py
+import time
+
+import pytest
+
+import page_fetcher
+from cache_store import SQLiteCache
+from conftest import PageHandler
+from page_fetcher import PageFetcher
+
+
+@pytest.fixture
+def fetcher(tmp_path):
+    fetcher = PageFetcher(cache=SQLiteCache(str(tmp_path / "pages.sqlite3"), table="pages"),
+                          timeout=1.0, max_bytes=10_000, extract_workers=1, extract_timeout=60)
+    yield fetcher
+    fetcher.close()
+
+
+def test_large_page_is_cut_at_max_bytes(fetcher, page_server):
+    page = fetcher._download(f"{page_server}/large", None)
+    assert len(page["html"]) == 10_000
+
+
+def test_slow_page_fails_at_the_download_deadline(fetcher, page_server):
+    started = time.monotonic()
+    page = fetcher.fetch(f"{page_server}/slow")
+    assert page["status"] == "failed"
+    assert "longer than" in page["error"]
+    assert time.monotonic() - started < 1.8
+
+
+def test_non_html_page_is_rejected(fetcher, page_server):
+    page = fetcher.fetch(f"{page_server}/report.pdf")
+    assert page["status"] == "failed"
+    assert page["text"] == ""
+    assert "not an HTML page (application/pdf)" in page["error"]
+
+
+def test_failed_page_is_not_retried_before_the_backoff(fetcher, page_server, monkeypatch):
+    url = f"{page_server}/blocked"
+    PageHandler.hits.pop("/blocked", None)
+    assert fetcher.fetch(url)["status"] == "failed"
+    assert fetcher.fetch(url)["status"] == "failed"
+    assert PageHandler.hits["/blocked"] == 1
+
+    monkeypatch.setattr(page_fetcher, "PAGE_FAILURE_RETRY_SECONDS", 0)
+    assert fetcher.fetch(url)["status"] == "failed"
+    assert PageHandler.hits["/blocked"] == 2
+
+
+def test_cached_page_is_reused_then_revalidated_with_its_etag(fetcher, page_server, monkeypatch):
+    url = f"{page_server}/etag-article"
+    first = fetcher.fetch(url)
+    assert first["status"] == "fetched"
+    assert "Local writers compare notes" in first["text"]
+    assert "Copyright Test Media" not in first["text"]
+
+    again = fetcher.fetch(url)
+    assert again["status"] == "cached"
+    assert again["text"] == first["text"]
+    assert PageHandler.hits["/etag-article"] == 1
+
+    monkeypatch.setattr(page_fetcher, "PAGE_CACHE_FRESH_SECONDS", 0)
+    revalidated = fetcher.fetch(url)
+    assert revalidated["status"] == "not_modified"
+    assert revalidated["text"] == first["text"]
+    assert PageHandler.hits["/etag-article"] == 2
+    assert fetcher.stats()["results"] == {"cached": 1, "fetched": 1, "not_modified": 1, "failed": 0, "timed_out": 0}
+
+
+def test_pages_not_done_by_the_batch_deadline_come_back_empty(tmp_path, page_server):
+    fetcher = PageFetcher(cache=SQLiteCache(str(tmp_path / "pages.sqlite3"), table="pages"),
+                          timeout=5.0, extract_workers=1, extract_timeout=60, deadline=0.5)
+    try:
+        started = time.monotonic()
+        pages = fetcher.fetch_all([f"{page_server}/report.pdf", f"{page_server}/slow"])
+        assert time.monotonic() - started < 1.5
+        assert [page["status"] for page in pages] == ["failed", "timed_out"]
+        assert pages[1]["text"] == ""
+    finally:
+        fetcher.close()
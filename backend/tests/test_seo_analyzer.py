@@ -0,0 +1,50 @@
+# tests/test_seo_analyzer.py
+import re
+import random
+
+import seo_analyzer
+from seo_analyzer import KeywordMatcher, SEOAnalyzer
+
+KEYWORDS = ["apple announces", "Apple", "announces", "node.js tips", "new iPhone", "iPhone launch", "launch event"]
+TEXT = (
+    "Apple, announces it. Apple. Announces. apple-announces. apple  announces\n"
+    "Apple announces the new  iPhone; new iPhone launch event. APPLE ANNOUNCES\n"
+    "Node.js tips: node js tips, node.js  tips and Node.js tips.\n"
+    "apple announces apple announces announces\n"
+)
+
+
+def counts(keywords, text):
+    found = [0] * len(keywords)
+    for index, _ in KeywordMatcher(keywords).matches(text):
+        found[index] += 1
+    return found
+
+
+def regex_counts(keywords, text):
+    return [len(re.findall(r"\b" + re.escape(keyword) + r"\b", text, re.IGNORECASE)) for keyword in keywords]
+
+
+def test_automaton_matches_the_regex_path():
+    assert len(KEYWORDS) > seo_analyzer.REGEX_MAX_KEYWORDS
+    automaton = counts(KEYWORDS, TEXT)
+    single = [counts([keyword], TEXT)[0] for keyword in KEYWORDS]
+    assert automaton == single == regex_counts(KEYWORDS, TEXT)
+    assert automaton[0] == 4
+
+
+def test_automaton_matches_the_regex_path_on_random_text():
+    rng = random.Random(3)
+    words = ["apple", "Announces", "new", "iphone", "launch", "event", "node", "js", "tips"]
+    separators = [" ", " ", " ", "  ", ", ", ". ", "-", ".", "\n"]
+    for _ in range(50):
+        text = "".join(rng.choice(words) + rng.choice(separators) for _ in range(200))
+        assert counts(KEYWORDS, text) == regex_counts(KEYWORDS, text)
+
+
+def test_keyword_density_does_not_depend_on_the_keyword_count(monkeypatch):
+    monkeypatch.setattr(seo_analyzer, "syllables", lambda word: 1)
+    article = "# Apple announces\n\n" + TEXT
+    few = SEOAnalyzer().analyze(article, KEYWORDS[:2])["keyword_density"]
+    many = SEOAnalyzer().analyze(article, KEYWORDS)["keyword_density"]
+    assert few == {keyword: many[keyword] for keyword in KEYWORDS[:2]}
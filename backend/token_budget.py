@@ -0,0 +1,178 @@
+# token_budget.py
+import os
+import re
+import json
+import textwrap
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence
+
+# Word pieces, punctuation and whitespace runs roughly track how BPE tokenizers
+# split English prose (long words split into several pieces)
+TOKEN_PIECE_RE = re.compile(r"\w{1,8}|[^\w\s]|\s+")
+
+# Prompt ceilings per LLM stage, overridable with PROMPT_TOKEN_LIMITS="stage=tokens,..."
+DEFAULT_STAGE_LIMITS = {
+    "gap": 3000,
+    "briefing": 1200,
+    "outline": 2500,
+    "writing": 3000,
+    "transitions": 1500,
+    "seo": 6000,
+}
+
+
+def _stage_limits() -> Dict[str, int]:
+    limits = dict(DEFAULT_STAGE_LIMITS)
+    for entry in os.getenv("PROMPT_TOKEN_LIMITS", "").split(","):
+        stage, _, value = entry.partition("=")
+        if stage.strip() and value.strip():
+            limits[stage.strip()] = int(value)
+    return limits
+
+
+STAGE_TOKEN_LIMITS = _stage_limits()
+
+
+def count_tokens(text: str) -> int:
+    """Estimated token count of `text` (no tokenizer download needed)."""
+    return len(TOKEN_PIECE_RE.findall(text))
+
+
+def minify_json(value) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def dedent_template(template: str) -> str:
+    """Strips the code indentation from a prompt template, before any values are filled in."""
+    return textwrap.dedent(template).strip()
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cuts `text` to about `max_tokens`, preferring a paragraph, then a sentence, then a word boundary."""
+    if max_tokens <= 0:
+        return ""
+    pieces = TOKEN_PIECE_RE.findall(text)
+    if len(pieces) <= max_tokens:
+        return text
+    # Leave room for the " …" marker
+    head = "".join(pieces[:max(max_tokens - 2, 1)])
+    for boundary in ("\n\n", ". ", " "):
+        cut = head.rfind(boundary)
+        if cut > len(head) // 2:
+            head = head[:cut + (1 if boundary == ". " else 0)]
+            break
+    return head.rstrip() + " …"
+
+
+def condense_extract(text: str, max_tokens: int, min_words: int = 8) -> str:
+    """
+    The start of a page's extracted main text, within `max_tokens`. Lines shorter
+    than `min_words` (captions, bylines, leftover navigation) are dropped first.
+    """
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    kept = [line for line in lines if len(line.split()) >= min_words]
+    return truncate_to_tokens("\n".join(kept), max_tokens)
+
+
+def _normalize_snippet(snippet: str) -> str:
+    return " ".join(re.sub(r"\.\.\.|…", " ", snippet).lower().split())
+
+
+def _compact(items: List, get_snippet, max_tokens_each: int, stage: Optional[str]) -> List:
+    kept = []
+    seen: List[str] = []
+    before = after = 0
+    for item in items:
+        snippet = get_snippet(item)
+        if not snippet:
+            continue
+        before += count_tokens(snippet)
+        key = _normalize_snippet(snippet)
+        if not key or any(key in other or other in key for other in seen):
+            continue
+        seen.append(key)
+        snippet = truncate_to_tokens(" ".join(snippet.split()), max_tokens_each)
+        after += count_tokens(snippet)
+        kept.append((item, snippet))
+    if stage:
+        prompt_stats.record(stage, saved=before - after)
+    return kept
+
+
+def compact_snippets(snippets: Iterable[str], max_tokens_each: int = 80, stage: Optional[str] = None) -> List[str]:
+    """
+    Drops empty and duplicate search snippets (including ones contained in an
+    earlier snippet) and truncates the rest to `max_tokens_each`.
+    """
+    return [snippet for _, snippet in _compact(list(snippets), lambda s: s or "", max_tokens_each, stage)]
+
+
+def compact_search_results(results: List[Dict], max_tokens_each: int = 80, stage: Optional[str] = None) -> List[Dict]:
+    """compact_snippets for search result dicts: results with a repeated snippet are dropped, titles are kept."""
+    return [dict(result, snippet=snippet)
+            for result, snippet in _compact(results, lambda r: r.get('snippet') or "", max_tokens_each, stage)]
+
+
+class PromptStats:
+    """Per-stage totals of prompt tokens sent and saved by compaction, for logs and /api/token-budget."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict[str, int]] = {}
+
+    def record(self, stage: str, sent: int = 0, saved: int = 0, prompts: int = 0, truncated: int = 0):
+        with self._lock:
+            stats = self._stages.setdefault(stage, {"prompts": 0, "tokens_sent": 0, "tokens_saved": 0, "truncated": 0})
+            stats["prompts"] += prompts
+            stats["tokens_sent"] += sent
+            stats["tokens_saved"] += saved
+            stats["truncated"] += truncated
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {stage: dict(values, limit=STAGE_TOKEN_LIMITS.get(stage))
+                    for stage, values in self._stages.items()}
+
+
+prompt_stats = PromptStats()
+
+
+def render_prompt(stage: str, template: str, trim: Sequence[str] = (), **values) -> str:
+    """
+    Fills a prompt template within the stage's token limit:
+    - the template is dedented, and dict/list values are embedded as minified JSON;
+    - if the prompt is still over the limit, the `trim` fields are truncated, in order,
+      until it fits (fields that must stay whole, like a draft, are simply not listed);
+    - the tokens sent and saved (against the indented template, indented JSON and
+      untrimmed fields) are logged.
+    """
+    baseline_values = {key: json.dumps(value, indent=2) if isinstance(value, (dict, list)) else value
+                       for key, value in values.items()}
+    values = {key: minify_json(value) if isinstance(value, (dict, list)) else value
+              for key, value in values.items()}
+    compact_template = dedent_template(template)
+    prompt = compact_template.format(**values)
+    tokens = count_tokens(prompt)
+
+    limit = STAGE_TOKEN_LIMITS.get(stage)
+    truncated = 0
+    if limit and tokens > limit:
+        overflow = tokens - limit
+        for field in trim:
+            field_tokens = count_tokens(values[field])
+            cut = min(overflow, field_tokens)
+            if cut <= 0:
+                continue
+            values[field] = truncate_to_tokens(values[field], field_tokens - cut)
+            overflow -= cut
+            truncated += 1
+            if overflow <= 0:
+                break
+        prompt = compact_template.format(**values)
+        tokens = count_tokens(prompt)
+        if tokens > limit:
+            print(f"Prompt [{stage}] is {tokens} tokens, over its {limit} token limit.")
+
+    saved = count_tokens(template.format(**baseline_values)) - tokens
+    prompt_stats.record(stage, sent=tokens, saved=saved, prompts=1, truncated=truncated)
+    print(f"Prompt [{stage}]: {tokens} tokens (saved {saved}{', trimmed to fit' if truncated else ''})")
+    return prompt
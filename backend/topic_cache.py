@@ -0,0 +1,107 @@
+# topic_cache.py
+import os
+import time
+import asyncio
+from typing import Callable, Dict, List, Optional, Tuple
+
+from agent_executor import run_agent_call
+
+
+class TopicCache:
+    """
+    In-process, stale-while-revalidate cache for the ranked topic list.
+    Fresh entries are served directly, stale entries are served while a single
+    background refresh runs, and only an empty cache makes a request wait.
+    """
+    def __init__(self, fetch_topics: Callable[[], List[Dict]],
+                 ttl_seconds: Optional[float] = None,
+                 refresh_interval: Optional[float] = None):
+        self.fetch_topics = fetch_topics
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("TOPIC_CACHE_TTL", "300"))
+        self.refresh_interval = refresh_interval if refresh_interval is not None else float(
+            os.getenv("TOPIC_REFRESH_INTERVAL", "240"))
+
+        self._topics: Optional[List[Dict]] = None
+        self._fetched_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._background_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    def age_seconds(self) -> Optional[float]:
+        if self._fetched_at is None:
+            return None
+        return time.monotonic() - self._fetched_at
+
+    def is_fresh(self) -> bool:
+        age = self.age_seconds()
+        return age is not None and age < self.ttl_seconds
+
+    async def _do_refresh(self) -> List[Dict]:
+        topics = await run_agent_call(self.fetch_topics)
+        self._topics = topics
+        self._fetched_at = time.monotonic()
+        return topics
+
+    def refresh(self) -> asyncio.Task:
+        """Starts a refresh unless one is already in flight (single-flight) and returns its task."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._do_refresh())
+            self._refresh_task.add_done_callback(self._log_refresh_failure)
+        return self._refresh_task
+
+    @staticmethod
+    def _log_refresh_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Topic cache refresh failed: {task.exception()}")
+
+    async def get(self, limit: Optional[int] = None) -> Tuple[List[Dict], Dict]:
+        """Returns (topics, cache_info). Only waits on Reddit when nothing is cached yet."""
+        if self._topics is None:
+            self.misses += 1
+            hit = False
+            # shield() so a client disconnecting doesn't cancel a refresh other requests share
+            await asyncio.shield(self.refresh())
+        else:
+            self.hits += 1
+            hit = True
+            if not self.is_fresh():
+                self.refresh()
+
+        topics = self._topics if limit is None else self._topics[:limit]
+        cache_info = {
+            "hit": hit,
+            "age_seconds": round(self.age_seconds() or 0.0, 1),
+            "stale": not self.is_fresh(),
+            "refreshing": self._refresh_task is not None and not self._refresh_task.done(),
+        }
+        return topics, cache_info
+
+    async def _refresh_periodically(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                # Already logged by the done callback; keep serving whatever we have.
+                pass
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        """Starts the background refresh loop (call from the app's startup)."""
+        if self._background_task is None:
+            self._background_task = asyncio.create_task(self._refresh_periodically())
+
+    async def stop(self):
+        for task in (self._background_task, self._refresh_task):
+            if task is not None and not task.done():
+                task.cancel()
+        self._background_task = None
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            "age_seconds": self.age_seconds(),
+        }
@@ -0,0 +1,230 @@
+# topic_dedup.py
+import os
+import time
+import zlib
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+from cache_store import data_path
+from seo_analyzer import STOPWORDS, tokenize
+
+# MinHash signatures of 64 values, split into 16 LSH bands of 4: titles with
+# Jaccard similarity around 0.5 or more almost always share a band
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_SIZE = 4
+MERSENNE_PRIME = (1 << 31) - 1
+
+# Estimated Jaccard similarity (of title shingles) at which two titles are the same story
+DUPLICATE_THRESHOLD = float(os.getenv("TOPIC_DUPLICATE_THRESHOLD", "0.5"))
+# How long a generated topic keeps later near-duplicates out of the candidates
+COVERED_TOPIC_DAYS = float(os.getenv("COVERED_TOPIC_DAYS", "30"))
+
+_rng = np.random.default_rng(20240601)
+_PERM_A = _rng.integers(1, MERSENNE_PRIME, NUM_PERM, dtype=np.int64)
+_PERM_B = _rng.integers(0, MERSENNE_PRIME, NUM_PERM, dtype=np.int64)
+
+
+def normalize_title(title: str) -> str:
+    return " ".join(token for token in tokenize(title) if token not in STOPWORDS)
+
+
+def shingles(title: str) -> set:
+    """Character shingles of the normalized title, so rewordings and reorderings still overlap."""
+    text = normalize_title(title)
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash(title: str) -> Optional[np.ndarray]:
+    """MinHash signature of a title's shingles; None for a title with no words."""
+    grams = shingles(title)
+    if not grams:
+        return None
+    hashes = np.fromiter((zlib.crc32(gram.encode()) % MERSENNE_PRIME for gram in grams),
+                         dtype=np.int64, count=len(grams))
+    # (a * h + b) mod p for every permutation and shingle at once; values stay below 2**63
+    return ((_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % MERSENNE_PRIME).min(axis=1)
+
+
+def similarity(signature_a: np.ndarray, signature_b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(signature_a == signature_b))
+
+
+def cluster_topics(topics: List[Dict], threshold: Optional[float] = None) -> List[List[int]]:
+    """
+    Groups near-duplicate topic titles. Topics are taken in order (best-ranked
+    first) and join the first cluster whose leading topic is similar enough, so
+    clusters don't chain unrelated titles together through a middle one. Only
+    leaders sharing an LSH band are compared, which keeps this close to linear.
+    Returns clusters of indices into `topics`, in input order.
+    """
+    threshold = DUPLICATE_THRESHOLD if threshold is None else threshold
+    rows = NUM_PERM // BANDS
+    bands: List[Dict[bytes, List[int]]] = [{} for _ in range(BANDS)]
+    signatures: Dict[int, np.ndarray] = {}
+    clusters: List[List[int]] = []
+    cluster_of: Dict[int, int] = {}
+
+    for i, topic in enumerate(topics):
+        signature = minhash(topic.get('title') or "")
+        if signature is None:
+            clusters.append([i])
+            continue
+        keys = [signature[band * rows:(band + 1) * rows].tobytes() for band in range(BANDS)]
+        candidates = {leader for band, key in zip(bands, keys) for leader in band.get(key, ())}
+        # Leaders are indices, so the best-ranked similar leader is the smallest
+        leader = next((leader for leader in sorted(candidates)
+                       if similarity(signature, signatures[leader]) >= threshold), None)
+        if leader is not None:
+            clusters[cluster_of[leader]].append(i)
+            continue
+        signatures[i] = signature
+        cluster_of[i] = len(clusters)
+        clusters.append([i])
+        for band, key in zip(bands, keys):
+            band.setdefault(key, []).append(i)
+    return clusters
+
+
+def collapse_duplicates(ranked_topics: List[Dict], threshold: Optional[float] = None) -> List[Dict]:
+    """
+    Keeps the best-ranked topic of each near-duplicate cluster (e.g. one story
+    cross-posted to several subreddits) and lists the others under 'duplicates'.
+    """
+    collapsed = []
+    for members in cluster_topics(ranked_topics, threshold):
+        topic = ranked_topics[members[0]]
+        if len(members) > 1:
+            topic['duplicates'] = [
+                {key: ranked_topics[i].get(key) for key in ('id', 'title', 'subreddit', 'url')}
+                for i in members[1:]
+            ]
+        collapsed.append(topic)
+    return collapsed
+
+
+class CoveredTopicIndex:
+    """
+    Persistent index of topics that already have an article. Titles are matched by
+    MinHash similarity, so a reworded repost of a covered story counts as covered.
+    Signatures of the last `max_age_days` are kept in memory as one matrix and
+    compared against a candidate in a single vectorized pass.
+    """
+    def __init__(self, path: Optional[str] = None, max_age_days: Optional[float] = None,
+                 threshold: Optional[float] = None):
+        self.path = path or os.getenv("COVERED_TOPICS_DB_PATH") or data_path("covered_topics.sqlite3")
+        self.max_age_seconds = (max_age_days if max_age_days is not None else COVERED_TOPIC_DAYS) * 24 * 3600
+        self.threshold = DUPLICATE_THRESHOLD if threshold is None else threshold
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS covered_topics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                topic_id TEXT,
+                source TEXT,
+                signature BLOB NOT NULL,
+                covered_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS covered_topics_covered_at ON covered_topics(covered_at);
+        """)
+        self._conn.commit()
+        self._entries: List[Dict] = []
+        self._signatures = np.empty((0, NUM_PERM), dtype=np.int64)
+        self._covered_at = np.empty(0)
+        self._last_id = 0
+
+    def _sync(self):
+        """
+        Pulls in topics recorded since the last sync, including ones written by other
+        processes, and drops the ones that have aged out of the time window.
+        """
+        cutoff = time.time() - self.max_age_seconds
+        rows = self._conn.execute(
+            "SELECT id, title, topic_id, source, signature, covered_at FROM covered_topics "
+            "WHERE id > ? AND covered_at >= ? ORDER BY id", (self._last_id, cutoff)
+        ).fetchall()
+        if rows:
+            self._entries += [{"title": title, "topic_id": topic_id, "source": source, "covered_at": covered_at}
+                              for _, title, topic_id, source, _, covered_at in rows]
+            signatures = np.vstack([np.frombuffer(row[4], dtype=np.int64) for row in rows])
+            self._signatures = np.vstack([self._signatures, signatures])
+            self._covered_at = np.concatenate([self._covered_at, [row[5] for row in rows]])
+            self._last_id = rows[-1][0]
+        current = self._covered_at >= cutoff
+        if not current.all():
+            self._entries = [entry for entry, keep in zip(self._entries, current.tolist()) if keep]
+            self._signatures = self._signatures[current]
+            self._covered_at = self._covered_at[current]
+
+    def _match(self, signature: np.ndarray) -> Optional[Dict]:
+        """The most similar synced entry, if it is similar enough; the caller holds the lock."""
+        if not self._entries:
+            return None
+        similarities = (self._signatures == signature).mean(axis=1)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None
+        return dict(self._entries[best], similarity=round(float(similarities[best]), 3))
+
+    def add(self, topic: Dict, source: Optional[str] = None):
+        """Records that `topic` now has an article (`source` is the job or run that wrote it)."""
+        signature = minhash(topic.get('title') or "")
+        if signature is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO covered_topics (title, topic_id, source, signature, covered_at) VALUES (?, ?, ?, ?, ?)",
+                (topic['title'], topic.get('id'), source, signature.tobytes(), time.time()),
+            )
+            self._conn.commit()
+
+    def match(self, title: str) -> Optional[Dict]:
+        """The most similar covered topic within the time window, if it is similar enough."""
+        signature = minhash(title)
+        if signature is None:
+            return None
+        with self._lock:
+            self._sync()
+            return self._match(signature)
+
+    def filter_uncovered(self, topics: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """Splits topics into (not yet covered, already covered); covered ones get 'covered_by'."""
+        # Signatures are computed outside the lock; the index is synced once for the whole batch
+        signatures = [minhash(topic.get('title') or "") for topic in topics]
+        with self._lock:
+            self._sync()
+            matches = [self._match(signature) if signature is not None else None for signature in signatures]
+        uncovered, covered = [], []
+        for topic, match in zip(topics, matches):
+            if match is None:
+                uncovered.append(topic)
+            else:
+                topic['covered_by'] = match
+                covered.append(topic)
+        return uncovered, covered
+
+    def count(self) -> int:
+        with self._lock:
+            self._sync()
+            return len(self._entries)
+
+
+_shared_index: Optional[CoveredTopicIndex] = None
+_shared_lock = threading.Lock()
+
+
+def get_covered_index() -> CoveredTopicIndex:
+    """Returns the process-wide covered-topic index, creating it on first use."""
+    global _shared_index
+    with _shared_lock:
+        if _shared_index is None:
+            _shared_index = CoveredTopicIndex()
+        return _shared_index
@@ -0,0 +1,100 @@
+# topic_scoring.py
+from typing import Dict, List, Optional, Union
+import numpy as np
+
+# Named weight profiles for re-ranking the same candidate pool different ways
+WEIGHT_PROFILES = {
+    "default": {'engagement': 0.4, 'quality': 0.3, 'freshness': 0.2, 'discussion': 0.1},
+    "viral": {'engagement': 0.6, 'quality': 0.2, 'freshness': 0.1, 'discussion': 0.1},
+    "breaking": {'engagement': 0.25, 'quality': 0.2, 'freshness': 0.45, 'discussion': 0.1},
+    "debate": {'engagement': 0.25, 'quality': 0.2, 'freshness': 0.15, 'discussion': 0.4},
+}
+
+# Freshness is a step function of the post's age in hours
+FRESHNESS_STEPS_HOURS = (24, 72, 168)
+FRESHNESS_STEP_SCORES = (1.0, 0.7, 0.4)
+FRESHNESS_FLOOR = 0.1
+
+COLUMNS = ('score', 'num_comments', 'upvote_ratio', 'freshness')
+
+Weights = Union[str, Dict[str, float], None]
+
+
+class TopicScorer:
+    """
+    Batch version of TopicSearchAgent.calculate_topic_score. Candidates are held in
+    columnar NumPy arrays so all four component scores are computed in one pass,
+    and top-k selection uses a partial sort instead of sorting the whole pool.
+    """
+    def __init__(self, weights: Weights = None):
+        self.weights = self.resolve_weights(weights)
+
+    @staticmethod
+    def resolve_weights(weights: Weights) -> Dict[str, float]:
+        if weights is None:
+            return dict(WEIGHT_PROFILES["default"])
+        if isinstance(weights, str):
+            if weights not in WEIGHT_PROFILES:
+                raise ValueError(f"Unknown weight profile '{weights}'. Choose from: {', '.join(WEIGHT_PROFILES)}")
+            return dict(WEIGHT_PROFILES[weights])
+        return dict(weights)
+
+    @staticmethod
+    def to_columns(topics: List[Dict]) -> Dict[str, np.ndarray]:
+        """Converts topic dicts into one float array per scoring input."""
+        return {column: np.fromiter((topic[column] for topic in topics), dtype=np.float64, count=len(topics))
+                for column in COLUMNS}
+
+    def score_columns(self, columns: Dict[str, np.ndarray], weights: Weights = None) -> np.ndarray:
+        """Composite scores for columnar candidates, rounded like the per-topic scorer."""
+        weights = self.resolve_weights(weights) if weights is not None else self.weights
+        score = columns['score']
+        num_comments = columns['num_comments']
+
+        engagement = np.minimum((score + num_comments * 2) / 1000, 1.0)
+        quality = columns['upvote_ratio']
+        freshness = np.select(
+            [columns['freshness'] <= hours for hours in FRESHNESS_STEPS_HOURS],
+            FRESHNESS_STEP_SCORES,
+            default=FRESHNESS_FLOOR,
+        )
+        discussion_ratio = np.divide(num_comments, score, out=np.zeros_like(score), where=score > 0)
+        discussion = np.minimum(discussion_ratio / 0.5, 1.0)
+
+        composite = (
+            engagement * weights['engagement'] +
+            quality * weights['quality'] +
+            freshness * weights['freshness'] +
+            discussion * weights['discussion']
+        )
+        return np.round(composite, 3)
+
+    def score(self, topics: List[Dict], weights: Weights = None) -> np.ndarray:
+        if not topics:
+            return np.zeros(0)
+        return self.score_columns(self.to_columns(topics), weights)
+
+    @staticmethod
+    def top_k_indices(scores: np.ndarray, k: Optional[int]) -> np.ndarray:
+        """Indices of the k best scores, best first; ties keep the original order."""
+        n = len(scores)
+        if k is None or k >= n:
+            candidates = np.arange(n)
+        elif k <= 0:
+            return np.zeros(0, dtype=np.intp)
+        else:
+            # Partial selection is O(n); only the k survivors get sorted. Ties at the
+            # cut-off go to the earliest candidates, matching a stable full sort.
+            kth_best = -np.partition(-scores, k - 1)[k - 1]
+            better = np.flatnonzero(scores > kth_best)
+            tied = np.flatnonzero(scores == kth_best)[:k - len(better)]
+            candidates = np.concatenate([better, tied])
+        order = np.lexsort((candidates, -scores[candidates]))
+        return candidates[order]
+
+    def rank(self, topics: List[Dict], k: Optional[int] = None, weights: Weights = None) -> List[Dict]:
+        """Scores every topic (setting 'blog_score') and returns the top k, best first."""
+        scores = self.score(topics, weights)
+        for topic, blog_score in zip(topics, scores.tolist()):
+            topic['blog_score'] = blog_score
+        return [topics[i] for i in self.top_k_indices(scores, k)]
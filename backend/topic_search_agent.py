@@ -2,41 +2,79 @@
 
 import os
 import time
-from typing import List, Dict
-from dotenv import load_dotenv
-import praw # Import the PRAW library
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Dict, Optional
+from agent_registry import load_env
+from rate_limiter import get_rate_limiter
+from topic_scoring import TopicScorer
+from topic_dedup import DUPLICATE_THRESHOLD, collapse_duplicates, get_covered_index
+
+DEFAULT_SUBREDDITS = ['technology', 'finance', 'business', 'worldnews', 'sports']
+# With a limit, this many times as many candidates are ranked before deduplication
+TOPIC_RANK_MARGIN = 3
 
 class TopicSearchAgent:
     """
     This agent uses the official Reddit API via PRAW to find and rank trending topics,
     retaining the original scoring logic for robust analysis.
     """
-    def __init__(self):
-        load_dotenv()
+    def __init__(self, subreddits: Optional[List[str]] = None, posts_per_subreddit: Optional[int] = None,
+                 max_workers: Optional[int] = None, subreddit_timeout: Optional[float] = None,
+                 weight_profile: Optional[str] = None):
+        load_env()
+
+        # Which subreddits to track and how many hot posts to pull from each.
+        # Both can be set in .env (REDDIT_SUBREDDITS is a comma-separated list).
+        env_subreddits = os.getenv("REDDIT_SUBREDDITS")
+        if subreddits is None and env_subreddits:
+            subreddits = [name.strip() for name in env_subreddits.split(",") if name.strip()]
+        self.subreddits = subreddits or list(DEFAULT_SUBREDDITS)
+        self.posts_per_subreddit = posts_per_subreddit or int(os.getenv("REDDIT_POSTS_PER_SUBREDDIT", "15"))
+
+        # Subreddits are fetched concurrently, but with bounded parallelism and through
+        # the shared Reddit rate limiter so we stay under Reddit's rate limit.
+        self.max_workers = max_workers or int(os.getenv("REDDIT_FETCH_WORKERS", "4"))
+        self.subreddit_timeout = subreddit_timeout or float(os.getenv("REDDIT_SUBREDDIT_TIMEOUT", "10"))
+
+        self._reddit_credentials = {
+            "client_id": os.getenv("REDDIT_CLIENT_ID"),
+            "client_secret": os.getenv("REDDIT_CLIENT_SECRET"),
+            "user_agent": os.getenv("REDDIT_USER_AGENT", "BloggerAI/1.0 by PriyamG2508"),
+        }
+        # PRAW instances are not thread-safe, so each fetch thread gets its own. The
+        # threads (and with them the clients and their OAuth tokens) live as long as the agent.
+        self._thread_local = threading.local()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
 
         # Initialize the PRAW client with credentials from .env
         # This is the main change for reliable data fetching.
         try:
-            self.reddit = praw.Reddit(
-                client_id=os.getenv("REDDIT_CLIENT_ID"),
-                client_secret=os.getenv("REDDIT_CLIENT_SECRET"),
-                user_agent=os.getenv("REDDIT_USER_AGENT", "BloggerAI/1.0 by PriyamG2508"),
-            )
+            self.reddit = self._create_reddit_client()
         except Exception as e:
             raise ValueError(f"Failed to initialize PRAW. Check your REDDIT .env variables. Error: {e}")
 
-        # Your original scoring weights are preserved.
-        self.weights = {
-            'engagement': 0.4,
-            'quality': 0.3,
-            'freshness': 0.2,
-            'discussion': 0.1
-        }
+        # Per-subreddit outcome of the most recent fetch_trending_topics() call.
+        self.last_fetch_report: Dict = {"succeeded": [], "failed": {}, "near_duplicates": 0, "already_covered": [],
+                                        "elapsed_seconds": 0.0}
+
+        # Your original scoring weights are preserved as the "default" profile.
+        # Other profiles (see topic_scoring.WEIGHT_PROFILES) re-rank the same candidates.
+        self.weights = TopicScorer.resolve_weights(weight_profile or os.getenv("TOPIC_WEIGHT_PROFILE", "default"))
+        self.scorer = TopicScorer(self.weights)
+
+        # Cross-posts of one story are collapsed, and stories we already have an
+        # article for are dropped, before anything is spent on searches or the LLM.
+        self.duplicate_threshold = DUPLICATE_THRESHOLD
+        self.skip_covered = os.getenv("TOPIC_SKIP_COVERED", "1") != "0"
 
     def calculate_topic_score(self, topic: Dict) -> float:
         """
         Calculates a composite score for topic ranking. 
         This is your original scoring logic, now applied to data from PRAW.
+        fetch_trending_topics scores whole batches with TopicScorer, which mirrors it.
         """
         engagement_raw = topic['score'] + (topic['num_comments'] * 2)
         engagement_score = min(engagement_raw / 1000, 1.0)
@@ -67,58 +105,133 @@ class TopicSearchAgent:
 
         return round(composite_score, 3)
 
-    def fetch_trending_topics(self) -> List[Dict]:
-        """Fetches and ranks hot topics from a list of subreddits using PRAW."""
-        subreddits = ['technology', 'finance', 'business', 'worldnews', 'sports']
-        all_topics = []
-        seen_titles = set()
+    def _create_reddit_client(self):
+        # PRAW is slow to import, so it is only loaded once Reddit is actually queried
+        import praw
+        return praw.Reddit(timeout=self.subreddit_timeout, **self._reddit_credentials)
+
+    def _get_thread_reddit(self):
+        reddit = getattr(self._thread_local, "reddit", None)
+        if reddit is None:
+            reddit = self._create_reddit_client()
+            self._thread_local.reddit = reddit
+        return reddit
+
+    def fetch_subreddit_topics(self, subreddit_name: str) -> List[Dict]:
+        """Fetches and scores the hot, non-stickied posts of a single subreddit."""
+        subreddit = self._get_thread_reddit().subreddit(subreddit_name)
+        # Listings are lazy; materialise inside the limiter so the request itself is budgeted.
+        # prawcore already retries server errors and timeouts (and has no switch to stop it), so the limiter doesn't.
+        posts = get_rate_limiter("reddit").call(lambda: list(subreddit.hot(limit=self.posts_per_subreddit)),
+                                                max_retries=0)
+        topics = []
+        for post in posts:
+            if post.stickied:
+                continue
+
+            freshness_hours = (time.time() - post.created_utc) / 3600
 
-        print("Fetching trending topics from Reddit using PRAW...")
-        for subreddit_name in subreddits:
+            # Create a dictionary compatible with your scoring function
+            post_data = {
+                'id': post.id,
+                'title': post.title,
+                'subreddit': post.subreddit.display_name,
+                'url': post.url,
+                'is_self_post': post.is_self,
+                'created_utc': post.created_utc,
+                'freshness': freshness_hours,
+                'score': post.score,
+                'num_comments': post.num_comments,
+                'upvote_ratio': post.upvote_ratio
+            }
+            # Scored later, together with every other subreddit's posts
+            topics.append(post_data)
+        return topics
+
+    def _fetch_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="reddit")
+            return self._executor
+
+    def close(self):
+        """Stops the fetch threads; called when the app shuts down."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def fetch_trending_topics(self, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Fetches and ranks hot topics from the configured subreddits concurrently using PRAW.
+        With `limit`, only the best `limit` topics are selected and returned.
+        """
+        print(f"Fetching trending topics from {len(self.subreddits)} subreddits using PRAW...")
+        started = time.monotonic()
+        results: Dict[str, List[Dict]] = {}
+        failed: Dict[str, str] = {}
+
+        executor = self._fetch_executor()
+        futures = {executor.submit(contextvars.copy_context().run, self.fetch_subreddit_topics, name): name
+                   for name in self.subreddits}
+        # Every request is bounded by the PRAW timeout; this is the overall guard for queued subreddits.
+        batches = -(-len(self.subreddits) // self.max_workers)
+        done, not_done = wait(futures, timeout=self.subreddit_timeout * (batches + 1))
+
+        for future in done:
+            name = futures[future]
             try:
-                subreddit = self.reddit.subreddit(subreddit_name)
-                # Fetch top 15 hot posts, skipping stickied posts
-                for post in subreddit.hot(limit=15):
-                    if post.stickied or post.title in seen_titles:
-                        continue
-                    
-                    seen_titles.add(post.title)
-                    
-                    freshness_hours = (time.time() - post.created_utc) / 3600
-
-                    # Create a dictionary compatible with your scoring function
-                    post_data = {
-                        'id': post.id,
-                        'title': post.title,
-                        'subreddit': post.subreddit.display_name,
-                        'url': post.url,
-                        'is_self_post': post.is_self,
-                        'created_utc': post.created_utc,
-                        'freshness': freshness_hours,
-                        'score': post.score,
-                        'num_comments': post.num_comments,
-                        'upvote_ratio': post.upvote_ratio
-                    }
-                    
-                    # Calculate the score using your logic
-                    blog_score = self.calculate_topic_score(post_data)
-                    post_data['blog_score'] = blog_score
-                    
-                    all_topics.append(post_data)
-            
+                results[name] = future.result()
             except Exception as e:
-                print(f"Could not fetch topics from r/{subreddit_name}: {e}")
+                failed[name] = str(e) or type(e).__name__
+        for future in not_done:
+            # Queued ones are dropped; one already running finishes within its PRAW timeout
+            future.cancel()
+            failed[futures[future]] = f"Timed out after {self.subreddit_timeout}s"
 
-        # Sort by your custom score to find the best topics
-        all_topics.sort(key=lambda x: x['blog_score'], reverse=True)
-        
-        print(f"Successfully fetched and ranked {len(all_topics)} unique topics.")
+        # Merge in the configured order so deduplication is deterministic
+        all_topics = []
+        seen_titles = set()
+        for name in self.subreddits:
+            for topic in results.get(name, []):
+                if topic['title'] in seen_titles:
+                    continue
+                seen_titles.add(topic['title'])
+                all_topics.append(topic)
+
+        # Score every candidate in one vectorized pass, then keep the best-ranked copy
+        # of each near-duplicate story and drop the stories that were already covered.
+        # With a limit only the best few candidates are sorted (a partial selection),
+        # with a margin that is widened if duplicates and covered stories eat into it.
+        k = limit * TOPIC_RANK_MARGIN if limit else None
+        while True:
+            candidates = self.scorer.rank(all_topics, k)
+            ranked = collapse_duplicates(candidates, self.duplicate_threshold)
+            near_duplicates = len(candidates) - len(ranked)
+            covered = []
+            if self.skip_covered:
+                ranked, covered = get_covered_index().filter_uncovered(ranked)
+            if k is None or len(ranked) >= limit or k >= len(all_topics):
+                break
+            k *= 2
+        all_topics = ranked[:limit] if limit else ranked
+
+        self.last_fetch_report = {
+            "succeeded": [name for name in self.subreddits if name in results],
+            "failed": failed,
+            "near_duplicates": near_duplicates,
+            "already_covered": [topic['title'] for topic in covered],
+            "elapsed_seconds": round(time.monotonic() - started, 2),
+        }
+        if failed:
+            print(f"Could not fetch topics from {len(failed)} subreddit(s): {', '.join(failed)}")
+        print(f"Successfully fetched and ranked {len(ranked)} unique topics "
+              f"({near_duplicates} near-duplicates collapsed, {len(covered)} already covered).")
         return all_topics
 
     def get_top_topics(self, limit: int = 10) -> List[Dict]:
         """Gets the top N ranked topics."""
-        all_topics = self.fetch_trending_topics()
-        return all_topics[:limit]
+        return self.fetch_trending_topics(limit=limit)
 
     def filter_quality_topics(self, min_score: float = 0.5) -> List[Dict]:
         """Filter topics above a minimum quality threshold."""
@@ -1,19 +1,65 @@
 import os
-from groq import Groq
-from dotenv import load_dotenv
-from langchain.prompts import PromptTemplate
+import re
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+from llm_client import LLMClient
+from agent_registry import load_env
+from token_budget import render_prompt
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*$")
+# Outlines often label headings ("H1: ...", "H2: ...") for the writer
+HEADING_LABEL_RE = re.compile(r"^H[1-6]\s*:\s*", re.IGNORECASE)
+TRANSITION_LINE_RE = re.compile(r"^\s*(\d+)\s*[:.)-]\s*(.+?)\s*$")
+
+# Length target for the whole article, shared out between parallel sections
+ARTICLE_TARGET_WORDS = 1000
+MIN_SECTION_WORDS = 120
+
+
+def split_outline(outline: str) -> Tuple[str, List[Dict]]:
+    """
+    Splits a Markdown outline into its H1 title and one entry per H2 section (H3s
+    and bullets stay with their H2). Anything between the title and the first H2
+    becomes an introduction section without a heading.
+    """
+    title = ""
+    preamble: List[str] = []
+    sections: List[Dict] = []
+    for line in outline.splitlines():
+        heading = HEADING_RE.match(line.strip())
+        level = len(heading.group(1)) if heading else 0
+        if level == 1 and not title:
+            title = HEADING_LABEL_RE.sub("", heading.group(2))
+        elif level == 2:
+            sections.append({"heading": HEADING_LABEL_RE.sub("", heading.group(2)), "lines": [line]})
+        elif sections:
+            sections[-1]["lines"].append(line)
+        elif line.strip():
+            preamble.append(line)
+
+    if preamble:
+        sections.insert(0, {"heading": None, "lines": preamble})
+    for section in sections:
+        section["outline"] = "\n".join(section.pop("lines")).strip()
+    return title, sections
 
 class WritingAgent:
-    def __init__(self):
-        load_dotenv()
+    def __init__(self, use_llm_cache: bool = True, mode: Optional[str] = None):
+        load_env()
         groq_api_key = os.getenv('GROQ_API_KEY')
 
         if not groq_api_key:
             raise ValueError("GROQ_API_KEY not found in .env file.")
 
-        self.client = Groq(api_key=groq_api_key)
+        self.client = LLMClient(api_key=groq_api_key, use_cache=use_llm_cache)
+        # "parallel" writes the outline's sections concurrently; "single" writes the article in one completion
+        self.mode = mode or os.getenv("WRITING_MODE", "parallel")
+        self.min_sections = int(os.getenv("WRITING_MIN_SECTIONS", "3"))
+        self.section_workers = int(os.getenv("WRITING_SECTION_WORKERS", "4"))
 
-    def write_article(self, outline: str, factual_briefing: str = "") -> str:
+    def _build_prompt(self, outline: str, factual_briefing: str = "") -> str:
         template_string = """
         You are a world-class blog writer and storyteller, an expert in transforming structured outlines into compelling, narrative-driven articles. Your writing is known for its clarity, authority, and engaging, conversational tone.
 
@@ -37,19 +83,231 @@ class WritingAgent:
         {factual_briefing}
         ---
         """
-        prompt_template = PromptTemplate(template=template_string, input_variables=['outline', 'factual_briefing'])
-        final_prompt = prompt_template.format(outline=outline, factual_briefing=factual_briefing)
+        return render_prompt("writing", template_string, trim=['factual_briefing'],
+                             outline=outline, factual_briefing=factual_briefing)
+
+    def _build_section_prompt(self, title: str, sections: List[Dict], index: int, factual_briefing: str) -> str:
+        template_string = """
+        You are a world-class blog writer and storyteller. You are writing ONE section of a longer article; other writers are writing the other sections at the same time, so stay strictly within yours.
+
+        **Article Title:** {title}
+
+        **Article Structure:**
+        {structure}
+
+        **Your Section:** {position}
+
+        **Crucial Directives:**
+        1.  **Length and Format:** Write about {words} words in Markdown. {heading_rule} Use H3 sub-headings only where your blueprint has them. Keep paragraphs concise (2-4 sentences).
+        2.  **Do Not Be a Robot:** Interpret the blueprint and weave its points into a smooth, readable narrative. Provide rich context, explain the "why" behind the data, and use vivid analogies or real-world examples.
+        3.  **Adopt a Specific Voice:** Write in a clear, confident, and slightly informal voice, as if explaining this to an intelligent colleague over coffee. Use contractions naturally.
+        4.  **Stay in Your Lane:** {scope_rule}
+        5.  **Execute the Placeholders with REAL DATA:** Replace placeholders like `[Placeholder: ...]` with the relevant information from the **Factual Briefing** below. **DO NOT INVENT ANY INFORMATION. If a suitable fact is not in the briefing, omit the specific data point or quote.**
+        6.  **No Commentary:** Output only the section itself, with no preambles or postscripts.
+
+        ---
+        **YOUR SECTION'S BLUEPRINT:**
+        {section_outline}
+        ---
+        **FACTUAL BRIEFING (Source of Truth):**
+        {factual_briefing}
+        ---
+        """
+        section = sections[index]
+        headings = [s["heading"] or "Introduction" for s in sections]
+        structure = "\n".join(f"{i + 1}. {heading}" for i, heading in enumerate(headings))
+        position = f"Section {index + 1} of {len(sections)}: {headings[index]}"
+        if index > 0:
+            position += f" (follows \"{headings[index - 1]}\")"
+        if index < len(sections) - 1:
+            position += f" (followed by \"{headings[index + 1]}\")"
+
+        if section["heading"]:
+            heading_rule = f'Start with the H2 heading "## {section["heading"]}".'
+        else:
+            heading_rule = "This is the article's introduction: do not add any heading."
+        if index == 0:
+            scope_rule = "Open the article with a powerful hook, but do not write the conclusion."
+        elif index == len(sections) - 1:
+            scope_rule = "This is the final section: bring the article to a close. Do not re-introduce the topic."
+        else:
+            scope_rule = "Do not introduce the whole article and do not conclude it; the neighbouring sections cover that."
+
+        return render_prompt(
+            "writing", template_string, trim=['factual_briefing'],
+            title=title,
+            structure=structure,
+            position=position,
+            words=max(ARTICLE_TARGET_WORDS // len(sections), MIN_SECTION_WORDS),
+            heading_rule=heading_rule,
+            scope_rule=scope_rule,
+            section_outline=section["outline"],
+            factual_briefing=factual_briefing,
+        )
+
+    def _write_section(self, title: str, sections: List[Dict], index: int, factual_briefing: str) -> str:
+        prompt = self._build_section_prompt(title, sections, index, factual_briefing)
+        text = self.client.complete(
+            messages=[{"role": "user", "content": prompt}],
+            stage="writing"
+        )
+        if not text or not text.strip():
+            raise ValueError(f"Section {index + 1} came back empty.")
+        return text.strip()
+
+    def _write_transitions(self, sections: List[Dict], texts: List[str]) -> Dict[int, str]:
+        """
+        One short LLM call for every section boundary at once: only the end of each
+        section and the next heading are sent, not the whole article.
+        """
+        boundaries = []
+        for i in range(len(texts) - 1):
+            ending = texts[i][-400:].split("\n\n")[-1]
+            next_heading = sections[i + 1]["heading"] or "the next section"
+            boundaries.append(f"Boundary {i + 1}:\nEnd of section: {ending}\nNext heading: {next_heading}")
+
+        template_string = """
+        You are an editor joining sections of a blog post that were written by different writers. For each numbered boundary below, write ONE short transitional sentence that closes the section before it and leads naturally into the next heading. Do not repeat the heading. Reply with exactly {count} lines in the form "<number>: <sentence>" and nothing else.
+
+        {boundaries}
+        """
+        prompt = render_prompt("transitions", template_string, count=len(boundaries), boundaries="\n\n".join(boundaries))
+        reply = self.client.complete(
+            messages=[{"role": "user", "content": prompt}],
+            stage="transitions",
+            max_tokens=60 * len(boundaries)
+        )
+
+        transitions = {}
+        for line in reply.splitlines():
+            match = TRANSITION_LINE_RE.match(line)
+            if match and 1 <= int(match.group(1)) <= len(boundaries):
+                transitions[int(match.group(1)) - 1] = match.group(2)
+        return transitions
+
+    def _write_parallel(self, title: str, sections: List[Dict], factual_briefing: str) -> str:
+        """Writes every section concurrently, then stitches them with transitional sentences."""
+        with ThreadPoolExecutor(max_workers=min(self.section_workers, len(sections))) as executor:
+            # Each section runs in a copy of this context so its LLM calls land in the writing stage's trace
+            futures = [executor.submit(contextvars.copy_context().run, self._write_section, title, sections, i,
+                                       factual_briefing)
+                       for i in range(len(sections))]
+            texts = [future.result() for future in futures]
+
+        try:
+            transitions = self._write_transitions(sections, texts)
+        except Exception as e:
+            # Transitions are polish; the sections stand on their own without them
+            print(f"Error writing transitions, stitching without them: {e}")
+            transitions = {}
+
+        parts = [f"# {title}"]
+        for i, text in enumerate(texts):
+            parts.append(f"{text}\n\n{transitions[i]}" if i in transitions else text)
+        return "\n\n".join(parts)
+
+    def _parallel_sections(self, outline: str) -> Optional[Tuple[str, List[Dict]]]:
+        """The split outline when parallel mode applies to it, else None (short or unstructured outlines)."""
+        if self.mode != "parallel":
+            return None
+        title, sections = split_outline(outline)
+        if not title or len(sections) < self.min_sections:
+            return None
+        return title, sections
+
+    def write_article(self, outline: str, factual_briefing: str = "") -> str:
+        parallel = self._parallel_sections(outline)
+        if parallel:
+            try:
+                return self._write_parallel(*parallel, factual_briefing)
+            except Exception as e:
+                print(f"Error writing sections in parallel, falling back to a single pass: {e}")
+
+        final_prompt = self._build_prompt(outline, factual_briefing)
 
         try:
-            response = self.client.chat.completions.create(
+            return self.client.complete(
                 messages=[{"role": "user","content": final_prompt,}],
-                model="llama-3.1-8b-instant"
+                stage="writing"
             )
+        except Exception as e:
+            # Retryable errors were already retried by the shared Groq rate limiter
+            print(f"Error writing article: {e}")
+            return ""
 
-            if response.choices and response.choices[0].message.content:
-                return response.choices[0].message.content
-            else:
-                return ""
+    def _transition(self, sections: List[Dict], index: int, text: str) -> str:
+        """The transitional sentence closing section `index` (its text) into the next one, or "" on failure."""
+        try:
+            return self._write_transitions(sections[index:index + 2], [text, ""]).get(0, "")
         except Exception as e:
-            # In a production environment, you might want to log this exception.
-            return ""
\ No newline at end of file
+            print(f"Error writing transition {index + 1}, stitching without it: {e}")
+            return ""
+
+    def _section_and_transition(self, title: str, sections: List[Dict], index: int, factual_briefing: str,
+                                stopped: threading.Event) -> Tuple[str, str]:
+        """Section `index` and, unless it is the last, the transition out of it, written as soon as the section is."""
+        text = self._write_section(title, sections, index, factual_briefing)
+        if index + 1 == len(sections) or stopped.is_set():
+            return text, ""
+        return text, self._transition(sections, index, text)
+
+    def _stream_parallel(self, title: str, sections: List[Dict], factual_briefing: str) -> Iterator[str]:
+        """
+        Parallel mode for streaming: the first section streams token by token while
+        the others are written concurrently, and each later section is yielded as
+        soon as it and every section before it are done. Each transition is written
+        as soon as the section before its boundary is, alongside the other sections.
+        """
+        executor = ThreadPoolExecutor(max_workers=min(self.section_workers, len(sections) - 1))
+        stopped = threading.Event()
+        try:
+            futures = [executor.submit(contextvars.copy_context().run, self._section_and_transition, title,
+                                       sections, i, factual_briefing, stopped)
+                       for i in range(1, len(sections))]
+            prompt = self._build_section_prompt(title, sections, 0, factual_briefing)
+            parts = []
+            for delta in self.client.stream(messages=[{"role": "user", "content": prompt}], stage="writing"):
+                if not parts:
+                    yield f"# {title}\n\n"
+                parts.append(delta)
+                yield delta
+            text = "".join(parts).strip()
+            if not text:
+                raise ValueError("Section 1 came back empty.")
+
+            # Written while the other sections are still being written
+            transition = self._transition(sections, 0, text)
+            for future in futures:
+                text, next_transition = future.result()
+                yield "\n\n" + (f"{transition}\n\n" if transition else "") + text
+                transition = next_transition
+        finally:
+            # Nothing waits for sections still being written when the stream failed, so a
+            # fallback to a single pass starts right away; queued sections are dropped
+            stopped.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stream_article(self, outline: str, factual_briefing: str = "") -> Iterator[str]:
+        """
+        Same as write_article, but yields the draft as it is produced: token by token
+        in single mode, and in parallel mode the first section token by token and
+        each later section as soon as it and the ones before it are written.
+        """
+        parallel = self._parallel_sections(outline)
+        if parallel:
+            streamed = False
+            try:
+                for delta in self._stream_parallel(*parallel, factual_briefing):
+                    streamed = True
+                    yield delta
+                return
+            except Exception as e:
+                if streamed:
+                    raise
+                print(f"Error writing sections in parallel, falling back to a single pass: {e}")
+
+        final_prompt = self._build_prompt(outline, factual_briefing)
+        yield from self.client.stream(
+            messages=[{"role": "user", "content": final_prompt}],
+            stage="writing"
+        )
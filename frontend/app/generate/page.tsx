@@ -25,17 +25,23 @@ interface GenerationStep {
   progress: number
 }
 
+// Which token stream is being shown while the article is generated
+type StreamName = "draft" | "final"
+
 export default function GeneratePage() {
   const [appState, setAppState] = useState<AppState>("topic-selection")
   const [topics, setTopics] = useState<Topic[]>([])
   const [selectedTopic, setSelectedTopic] = useState<Topic | null>(null)
   const [currentStep, setCurrentStep] = useState<GenerationStep>({ text: "", progress: 0 })
   const [finalArticle, setFinalArticle] = useState<string>("")
+  const [liveStream, setLiveStream] = useState<StreamName | null>(null)
+  const [liveText, setLiveText] = useState<string>("")
   const [loading, setLoading] = useState(true)
   const [errorMessage, setErrorMessage] = useState<string>("")
   
   // Use a ref for the WebSocket to persist across re-renders
   const ws = useRef<WebSocket | null>(null)
+  const liveStreamRef = useRef<StreamName | null>(null)
 
   // Fetch topics from the backend when the component mounts
   useEffect(() => {
@@ -95,6 +101,18 @@ export default function GeneratePage() {
         return
       }
       
+      // Token frames: append to the live preview, restarting it when the stream switches or a new pass begins
+      if (data.stream) {
+        if (liveStreamRef.current !== data.stream || data.restart) {
+          liveStreamRef.current = data.stream
+          setLiveStream(data.stream)
+          setLiveText(data.delta ?? "")
+        } else {
+          setLiveText((text) => text + (data.delta ?? ""))
+        }
+        return
+      }
+
       // Update progress
       setCurrentStep({ text: data.text, progress: data.progress })
 
@@ -143,6 +161,9 @@ export default function GeneratePage() {
     setSelectedTopic(null)
     setCurrentStep({ text: "", progress: 0 })
     setFinalArticle("")
+    setLiveStream(null)
+    setLiveText("")
+    liveStreamRef.current = null
     setErrorMessage("")
     fetchTopics() 
   }
@@ -212,6 +233,19 @@ export default function GeneratePage() {
               <p className="text-lg text-slate-600 mb-4">{currentStep.text}</p>
               <div className="text-sm text-slate-500">{currentStep.progress}% complete</div>
             </div>
+
+            {liveStream && (
+              <Card className="border-slate-200 mt-6 text-left">
+                <CardContent className="p-6">
+                  <p className="text-xs uppercase tracking-wide text-blue-600 mb-3">
+                    {liveStream === "draft" ? "Live draft" : "Final article"}
+                  </p>
+                  <div className="prose prose-slate max-w-none max-h-96 overflow-y-auto">
+                    <ReactMarkdown>{liveText}</ReactMarkdown>
+                  </div>
+                </CardContent>
+              </Card>
+            )}
           </div>
         )}
 